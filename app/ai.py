@@ -1,20 +1,171 @@
 import asyncio
+import logging
+import os
+import time
 from fastmcp import Client
+from fastmcp.exceptions import ToolError
 
-# Initialize FastMCP client
-mcp_client = Client("http://mcp:8002/mcp")
+from app import metrics
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "remote")  # remote or inprocess
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://mcp:8002/mcp")
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "32"))
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "30"))
+
+
+class MCPClientPool:
+    """
+    A few long-lived MCP sessions shared by every request, opened at application startup.
+
+    Calls are spread round-robin over the sessions and several calls run concurrently on
+    each one (MCP multiplexes requests over a session by JSON-RPC id), bounded overall by
+    max_concurrency. Every call has a timeout, and a session that times out or fails with a
+    transport error is dropped and reopened on its next use.
+    """
+
+    def __init__(self, transport, size: int = MCP_POOL_SIZE, max_concurrency: int = MCP_MAX_CONCURRENCY, timeout: float = MCP_CALL_TIMEOUT):
+        self.transport = transport
+        self.size = size
+        self.timeout = timeout
+        self._clients = [None] * size
+        self._opened = [False] * size  # whether the slot has had a session, so reopening it counts as a reconnect
+        self._locks = [asyncio.Lock() for _ in range(size)]
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._next = 0
+        self._stats = {
+            "sessions": size,
+            "max_concurrency": max_concurrency,
+            "in_flight": 0,
+            "calls": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "latency_seconds_total": 0.0,
+            "latency_seconds_max": 0.0,
+        }
+
+    async def start(self):
+        for slot in range(self.size):
+            try:
+                await self._session(slot)
+            except Exception:
+                logger.warning("Could not open MCP session %s; it will be retried on first use", slot, exc_info=True)
+
+    async def close(self):
+        for slot in range(self.size):
+            await self._drop(slot)
+        self._opened = [False] * self.size
+
+    async def _session(self, slot: int) -> Client:
+        async with self._locks[slot]:
+            client = self._clients[slot]
+            if client is None or not client.is_connected():
+                if self._opened[slot]:
+                    self._stats["reconnects"] += 1
+                client = Client(self.transport)
+                await client.__aenter__()
+                self._clients[slot] = client
+                self._opened[slot] = True
+            return client
+
+    async def _drop(self, slot: int):
+        async with self._locks[slot]:
+            client, self._clients[slot] = self._clients[slot], None
+        if client is not None:
+            try:
+                await client.__aexit__(None, None, None)
+            except Exception:
+                logger.debug("Error while closing MCP session %s", slot, exc_info=True)
+
+    async def call_tool(self, name: str, arguments: dict):
+        slot = self._next % self.size
+        self._next += 1
+        async with self._semaphore:
+            client = await self._session(slot)
+            self._stats["in_flight"] += 1
+            started_at = time.perf_counter()
+            try:
+                return await asyncio.wait_for(client.call_tool(name, arguments), self.timeout)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                await self._drop(slot)
+                raise
+            except ToolError:
+                self._stats["errors"] += 1
+                raise
+            except Exception:
+                self._stats["errors"] += 1
+                await self._drop(slot)
+                raise
+            finally:
+                latency = time.perf_counter() - started_at
+                self._stats["in_flight"] -= 1
+                self._stats["calls"] += 1
+                self._stats["latency_seconds_total"] += latency
+                self._stats["latency_seconds_max"] = max(self._stats["latency_seconds_max"], latency)
+
+    def stats(self) -> dict:
+        return dict(self._stats, connected=sum(1 for client in self._clients if client is not None and client.is_connected()))
+
+
+def _mcp_transport():
+    """
+    The MCP server app.ai talks to: the standalone server over HTTP (`remote`), or, when the web app and the
+    tools are deployed together, the tool server from tools/ai_tools.py over an in-memory transport
+    (`inprocess`), which skips the HTTP hop and runs on this process's event loop.
+    """
+    if MCP_TRANSPORT == "inprocess":
+        from tools.ai_tools import tools_server
+        return tools_server
+    if MCP_TRANSPORT == "remote":
+        return MCP_SERVER_URL
+    raise ValueError(f"Unknown MCP_TRANSPORT {MCP_TRANSPORT!r}; expected 'remote' or 'inprocess'")
+
+def _tool_name(name: str) -> str:
+    # mcp_server.py prefixes every tool with the name of the module it comes from.
+    return name if MCP_TRANSPORT == "inprocess" else f"ai_tools_{name}"
+
+mcp_pool = MCPClientPool(_mcp_transport())
+metrics.register("mcp_client", mcp_pool.stats)
+
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "10000"))
+
+# Forecasts keyed by (kind, company_id, product_id, sales version). The version is the latest
+# order ID for the product, so a new sale makes the old entry unreachable and LRU drops it.
+_forecast_cache = LRUCache(maxsize=FORECAST_CACHE_SIZE)
+metrics.register("forecast_cache", _forecast_cache.stats)
+
+def get_cached_forecast(kind: str, company_id: int, product_id: int, version):
+    return _forecast_cache.get((kind, company_id, product_id, version))
+
+def cache_forecast(kind: str, company_id: int, product_id: int, version, predicted_stock: float):
+    _forecast_cache.set((kind, company_id, product_id, version), predicted_stock)
 
 async def train_and_predict_stock_via_mcp(product_id: int, company_id: int, sales_data: list) -> float:
     """
     Calls the FastMCP server to predict next month's sales based on historical sales data.
     """
-    async with mcp_client:
-        result = await mcp_client.call_tool(
-            "ai_tools_predict_stock",
-            {"product_id": product_id, "company_id": company_id, "sales_data": sales_data}
-        )
-        if "error" in result:
-            # Handle error from MCP server
-            print(f"Error from MCP server: {result['error']}")
-            return 0.0 # Or raise an exception
-        return result.get("predicted_stock_next_month", 0.0)
+    result = await mcp_pool.call_tool(
+        _tool_name("predict_stock"),
+        {"product_id": product_id, "company_id": company_id, "sales_data": sales_data}
+    )
+    data = result.data or {}
+    if "error" in data:
+        # Handle error from MCP server
+        print(f"Error from MCP server: {data['error']}")
+        return 0.0 # Or raise an exception
+    return data.get("predicted_stock_next_month", 0.0)
+
+async def predict_stock_batch_via_mcp(company_id: int, product_ids: list = None) -> list:
+    """
+    Calls the FastMCP server to forecast next month's sales for many products (the whole catalog if product_ids is None) in one pass.
+    """
+    result = await mcp_pool.call_tool(
+        _tool_name("predict_stock_batch"),
+        {"company_id": company_id, "product_ids": product_ids}
+    )
+    return (result.data or {}).get("forecasts", [])
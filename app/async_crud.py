@@ -0,0 +1,120 @@
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from datetime import datetime
+
+from . import crud, data_version, models, schemas
+from .utils import pagination
+
+# Async counterparts of the app.crud functions used on an event loop. They take an AsyncSession
+# (app.database.AsyncSessionLocal) and behave like their app.crud namesakes.
+
+# User
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).filter(models.User.username == username))
+
+# Product
+async def get_product(db: AsyncSession, product_id: int, company_id: int):
+    return await db.scalar(select(models.Product).filter(models.Product.id == product_id, models.Product.company_id == company_id))
+
+async def get_products(db: AsyncSession, company_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = select(models.Product).filter(models.Product.company_id == company_id)
+    return (await db.scalars(pagination.keyset_page(query, crud.PRODUCT_KEYSET, limit, skip=skip, cursor=cursor))).all()
+
+async def create_product(db: AsyncSession, product: schemas.ProductCreate, company_id: int):
+    db_product = models.Product(**product.dict(), company_id=company_id)
+    db.add(db_product)
+    await db.commit()
+    await data_version.bump_async(company_id)
+    await db.refresh(db_product)
+    return db_product
+
+async def update_product(db: AsyncSession, product_id: int, product: schemas.ProductUpdate, company_id: int):
+    db_product = await get_product(db, product_id, company_id)
+    if db_product:
+        update_data = product.dict(exclude_unset=True)
+        for key, value in update_data.items():
+            setattr(db_product, key, value)
+        await db.commit()
+        await data_version.bump_async(company_id)
+        await db.refresh(db_product)
+    return db_product
+
+async def delete_product(db: AsyncSession, product_id: int, company_id: int):
+    db_product = await get_product(db, product_id, company_id)
+    if db_product:
+        await db.delete(db_product)
+        await db.commit()
+        await data_version.bump_async(company_id)
+    return db_product
+
+# Customer
+async def get_customer(db: AsyncSession, customer_id: int, company_id: int):
+    return await db.scalar(select(models.Customer).filter(models.Customer.id == customer_id, models.Customer.company_id == company_id))
+
+async def get_customers(db: AsyncSession, company_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = select(models.Customer).filter(models.Customer.company_id == company_id)
+    return (await db.scalars(pagination.keyset_page(query, crud.CUSTOMER_KEYSET, limit, skip=skip, cursor=cursor))).all()
+
+async def create_customer(db: AsyncSession, customer: schemas.CustomerCreate, company_id: int):
+    db_customer = models.Customer(**customer.dict(), company_id=company_id)
+    db.add(db_customer)
+    await db.commit()
+    await data_version.bump_async(company_id)
+    await db.refresh(db_customer)
+    return db_customer
+
+async def update_customer(db: AsyncSession, customer_id: int, customer: schemas.CustomerUpdate, company_id: int):
+    db_customer = await get_customer(db, customer_id, company_id)
+    if db_customer:
+        update_data = customer.dict(exclude_unset=True)
+        for key, value in update_data.items():
+            setattr(db_customer, key, value)
+        await db.commit()
+        await data_version.bump_async(company_id)
+        await db.refresh(db_customer)
+    return db_customer
+
+async def delete_customer(db: AsyncSession, customer_id: int, company_id: int):
+    db_customer = await get_customer(db, customer_id, company_id)
+    if db_customer:
+        await db.delete(db_customer)
+        await db.commit()
+        await data_version.bump_async(company_id)
+    return db_customer
+
+# Order
+async def get_order(db: AsyncSession, order_id: int, company_id: int):
+    # selectinload rather than joinedload: async sessions cannot lazy-load, and the eager loads run as two small IN queries.
+    return await db.scalar(select(models.Order).options(selectinload(models.Order.items).selectinload(models.OrderItem.product), selectinload(models.Order.customer)).filter(models.Order.id == order_id, models.Order.company_id == company_id))
+
+async def get_orders(db: AsyncSession, company_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = select(models.Order).options(selectinload(models.Order.items)).filter(models.Order.company_id == company_id)
+    return (await db.scalars(pagination.keyset_page(query, crud.ORDER_KEYSET, limit, skip=skip, cursor=cursor))).all()
+
+# Reporting
+async def get_sales_by_date(db: AsyncSession, start_date: datetime, end_date: datetime, company_id: int):
+    return (await db.scalars(select(models.Order).filter(models.Order.date.between(start_date, end_date), models.Order.company_id == company_id))).all()
+
+async def get_low_stock_products(db: AsyncSession, company_id: int, limit: int = 10):
+    return (await db.scalars(select(models.Product).filter(models.Product.stock < limit, models.Product.company_id == company_id))).all()
+
+async def get_top_selling_products(db: AsyncSession, company_id: int, limit: int = 10):
+    total_quantity = func.sum(models.DailyProductSales.quantity)
+    return (await db.execute(select(models.Product, total_quantity.label('total_quantity')).join(models.DailyProductSales, models.DailyProductSales.product_id == models.Product.id).filter(models.DailyProductSales.company_id == company_id).group_by(models.Product.id).order_by(total_quantity.desc()).limit(limit))).all()
+
+async def get_daily_sales(db: AsyncSession, start_date: datetime, end_date: datetime, company_id: int):
+    """
+    Per-day (day, quantity, revenue) totals for orders in [start_date, end_date). Day-aligned ranges are summed from
+    the daily sales rollup (the table crud.get_daily_sales_history reads); other ranges are aggregated from the orders.
+    """
+    if crud.is_day_aligned(start_date, end_date):
+        rollup = models.DailyProductSales
+        query = select(rollup.day, func.sum(rollup.quantity).label('quantity'), func.sum(rollup.revenue).label('revenue')).filter(rollup.company_id == company_id, rollup.day >= start_date.date(), rollup.day < end_date.date()).group_by(rollup.day).order_by(rollup.day)
+    else:
+        day = func.date(models.Order.date)
+        query = select(day.label('day'), func.sum(models.OrderItem.quantity).label('quantity'), func.sum(models.OrderItem.quantity * models.OrderItem.price).label('revenue')).join(models.OrderItem, models.OrderItem.order_id == models.Order.id).filter(models.Order.company_id == company_id, models.Order.date >= start_date, models.Order.date < end_date).group_by(day).order_by(day)
+    return (await db.execute(query)).all()
+
+async def get_total_revenue(db: AsyncSession, company_id: int):
+    return await db.scalar(select(func.sum(models.DailyProductSales.revenue)).filter(models.DailyProductSales.company_id == company_id))
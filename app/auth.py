@@ -1,14 +1,20 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import crud, models
-from app.database import get_db
+from app import async_crud, principal_cache
+from app.database import get_async_db
+from app.principal_cache import Principal
 from app.utils import jwt_handler
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    # A cached principal was built from this exact token after it was verified, and is never kept past the token's expiry.
+    principal = await principal_cache.get_async(token)
+    if principal is not None:
+        return principal
+
     token_data = jwt_handler.decode_access_token(token)
     if not token_data:
         raise HTTPException(
@@ -16,16 +22,18 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = crud.get_user_by_username(db, username=token_data.username)
+    user = await async_crud.get_user_by_username(db, username=token_data.username)
     if user is None or user.company_id != token_data.company_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return user
+    principal = Principal.from_user(user)
+    await principal_cache.put_async(token, principal, expires_at=token_data.exp)
+    return principal
 
-def get_current_active_user(current_user: models.User = Depends(get_current_user)) -> models.User:
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
@@ -1,28 +1,206 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
-from app import crud, schemas
+from pydantic import ValidationError
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app import crud, models, schemas
+from app.database import SessionLocal
 from app.utils.pdf_generator import generate_invoice_pdf
+import logging
+import multiprocessing
 import os
+import threading
+
+logger = logging.getLogger(__name__)
 
 UPLOADS_DIR = "uploads"
+INVOICE_WORKERS = int(os.getenv("INVOICE_WORKERS", "2"))
+INVOICE_RENDER_PROCESSES = int(os.getenv("INVOICE_RENDER_PROCESSES", "0"))
+BULK_ORDER_CHUNK_SIZE = int(os.getenv("BULK_ORDER_CHUNK_SIZE", "500"))
+BULK_ORDER_MAX_LINE_BYTES = int(os.getenv("BULK_ORDER_MAX_LINE_BYTES", str(1024 * 1024)))
+
+INVOICE_PENDING = "pending"
+INVOICE_READY = "ready"
+INVOICE_FAILED = "failed"
+
+# Invoices are rendered off the request path on a small, fixed-size pool. With INVOICE_RENDER_PROCESSES set,
+# the pool threads only load snapshots and write files, and the PDFs are drawn in worker processes.
+_invoice_executor = ThreadPoolExecutor(max_workers=INVOICE_WORKERS, thread_name_prefix="invoice")
+_render_process_pool = None
+
+def _get_render_process_pool() -> ProcessPoolExecutor:
+    global _render_process_pool
+    if _render_process_pool is None:
+        _render_process_pool = ProcessPoolExecutor(max_workers=INVOICE_RENDER_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _render_process_pool
+
+def _render_invoice_bytes(invoice: dict) -> bytes:
+    return generate_invoice_pdf(invoice).getvalue()
+
+def render_invoice(db: Session, order_id: int, company_id: int):
+    """
+    Renders the invoice PDF for an order from its snapshot, stores it under uploads/invoices and marks the
+    order's invoice as ready. Returns the invoice path, or None if the order does not exist.
+    """
+    invoice = crud.get_invoice_snapshot(db, order_id=order_id, company_id=company_id)
+    if invoice is None:
+        return None
+    if INVOICE_RENDER_PROCESSES > 0:
+        pdf_bytes = _get_render_process_pool().submit(_render_invoice_bytes, invoice).result()
+    else:
+        pdf_bytes = _render_invoice_bytes(invoice)
+
+    invoice_dir = os.path.join(UPLOADS_DIR, "invoices", str(company_id))
+    os.makedirs(invoice_dir, exist_ok=True)
+
+    invoice_path = os.path.join(invoice_dir, f"invoice_{order_id}.pdf")
+
+    # The worker and an on-demand request may render the same invoice concurrently,
+    # so write to a private file and atomically move it into place.
+    tmp_path = f"{invoice_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp_path, invoice_path)
+
+    db.query(models.Order).filter(models.Order.id == order_id, models.Order.company_id == company_id).update({"pdf_invoice_path": invoice_path, "invoice_status": INVOICE_READY})
+    db.commit()
+    return invoice_path
+
+def _render_invoice_job(order_id: int, company_id: int):
+    db = SessionLocal()
+    try:
+        invoice_status = db.query(models.Order.invoice_status).filter(models.Order.id == order_id, models.Order.company_id == company_id).scalar()
+        if invoice_status is None or invoice_status == INVOICE_READY:
+            return
+        render_invoice(db, order_id, company_id)
+    except Exception:
+        logger.exception("Rendering invoice for order %s failed", order_id)
+        db.rollback()
+        db.query(models.Order).filter(models.Order.id == order_id).update({"invoice_status": INVOICE_FAILED})
+        db.commit()
+    finally:
+        db.close()
+
+def enqueue_invoice(order_id: int, company_id: int):
+    """
+    Schedules invoice rendering for a committed order on the invoice worker pool.
+    """
+    return _invoice_executor.submit(_render_invoice_job, order_id, company_id)
 
 def create_order_and_invoice(db: Session, order: schemas.OrderCreate, user_id: int, company_id: int):
     db_order = crud.create_order(db, order=order, user_id=user_id, company_id=company_id)
     if not db_order:
         raise HTTPException(status_code=400, detail="Not enough stock or product not found")
 
-    pdf_buffer = generate_invoice_pdf(db_order)
-    
-    invoice_dir = os.path.join(UPLOADS_DIR, "invoices", str(company_id))
-    os.makedirs(invoice_dir, exist_ok=True)
-    
-    invoice_path = os.path.join(invoice_dir, f"invoice_{db_order.id}.pdf")
-    
-    with open(invoice_path, "wb") as f:
-        f.write(pdf_buffer.getvalue())
-        
-    db_order.pdf_invoice_path = invoice_path
-    db.commit()
-    db.refresh(db_order)
-    
+    enqueue_invoice(db_order.id, company_id)
     return db_order
+
+def get_invoice_path(db: Session, order_id: int, company_id: int):
+    """
+    Returns the path of an order's invoice PDF, rendering it on demand if the worker has not produced it yet.
+    """
+    db_order = crud.get_order(db, order_id=order_id, company_id=company_id)
+    if db_order is None:
+        return None
+    if db_order.invoice_status == INVOICE_READY and db_order.pdf_invoice_path and os.path.exists(db_order.pdf_invoice_path):
+        return db_order.pdf_invoice_path
+    return render_invoice(db, order_id, company_id)
+
+def iter_ndjson_chunks(lines, chunk_size: int = BULK_ORDER_CHUNK_SIZE):
+    """
+    Groups NDJSON lines into chunks of (line_number, raw_line) pairs, skipping blank lines.
+    Lines longer than BULK_ORDER_MAX_LINE_BYTES are passed on as None.
+    """
+    chunk = []
+    for line_number, raw_line in enumerate(lines, start=1):
+        if raw_line is not None and len(raw_line) > BULK_ORDER_MAX_LINE_BYTES:
+            raw_line = None
+        if raw_line is None or raw_line.strip():
+            chunk.append((line_number, raw_line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+async def _aiter_lines(stream):
+    """
+    Splits a streamed body into lines. Only the current partial line is buffered, and only up to
+    BULK_ORDER_MAX_LINE_BYTES: the rest of a longer line is skipped and the line is yielded as None.
+    """
+    buffer = bytearray()
+    too_long = False
+    async for data in stream:
+        start = 0
+        while (end := data.find(b"\n", start)) != -1:
+            if too_long or len(buffer) + end - start > BULK_ORDER_MAX_LINE_BYTES:
+                yield None
+            else:
+                buffer += data[start:end]
+                yield bytes(buffer)
+            buffer.clear()
+            too_long = False
+            start = end + 1
+        if not too_long:
+            if len(buffer) + len(data) - start > BULK_ORDER_MAX_LINE_BYTES:
+                buffer.clear()
+                too_long = True
+            else:
+                buffer += data[start:]
+    if too_long:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+async def aiter_ndjson_chunks(stream, chunk_size: int = BULK_ORDER_CHUNK_SIZE):
+    """
+    Async counterpart of iter_ndjson_chunks for a streamed request body; only the current
+    partial line and the current chunk are held in memory.
+    """
+    chunk = []
+    line_number = 0
+    async for raw_line in _aiter_lines(stream):
+        line_number += 1
+        if raw_line is None or raw_line.strip():
+            chunk.append((line_number, raw_line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+def create_orders_chunk(db: Session, chunk: list, user_id: int, company_id: int, generate_invoices: bool = False) -> list:
+    """
+    Validates and creates one chunk of NDJSON orders. Returns one result per line, in input order.
+    Invoices are only scheduled when generate_invoices is set; otherwise they are rendered on demand.
+    """
+    results = {}
+    parsed = []
+    for line_number, raw_line in chunk:
+        if raw_line is None:
+            results[line_number] = {"line": line_number, "error": f"Line longer than {BULK_ORDER_MAX_LINE_BYTES} bytes"}
+            continue
+        try:
+            parsed.append((line_number, schemas.OrderCreate.model_validate_json(raw_line)))
+        except ValidationError as e:
+            results[line_number] = {"line": line_number, "error": f"Invalid order: {e.errors()[0]['msg']}"}
+
+    if parsed:
+        try:
+            order_ids = crud.create_orders_bulk(db, [order for _, order in parsed], user_id=user_id, company_id=company_id)
+        except SQLAlchemyError:
+            logger.exception("Bulk order chunk starting at line %s failed", chunk[0][0])
+            db.rollback()
+            order_ids = [None] * len(parsed)
+            for line_number, _ in parsed:
+                results[line_number] = {"line": line_number, "error": "Order batch rejected by the database"}
+        else:
+            for (line_number, _), order_id in zip(parsed, order_ids):
+                if order_id is None:
+                    results[line_number] = {"line": line_number, "error": "Not enough stock or product not found"}
+                    continue
+                results[line_number] = {"line": line_number, "order_id": order_id}
+                if generate_invoices:
+                    enqueue_invoice(order_id, company_id)
+
+    return [results[line_number] for line_number, _ in chunk]
@@ -1,9 +1,16 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from datetime import datetime
+from sqlalchemy import func, case, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, time
 
-from . import models, schemas
-from .utils import jwt_handler
+from . import data_version, models, principal_cache, schemas
+from .utils import jwt_handler, pagination
+
+# Keyset columns used for cursor pagination; company_id is always an equality filter in front of them.
+USER_KEYSET = (models.User.id,)
+PRODUCT_KEYSET = (models.Product.id,)
+CUSTOMER_KEYSET = (models.Customer.id,)
+ORDER_KEYSET = (models.Order.date, models.Order.id)
 
 # Company
 def get_company(db: Session, company_id: int):
@@ -26,14 +33,17 @@ def create_company(db: Session, company: schemas.CompanyCreate):
 def get_user(db: Session, user_id: int):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
+def get_company_user(db: Session, user_id: int, company_id: int):
+    return db.query(models.User).filter(models.User.id == user_id, models.User.company_id == company_id).first()
+
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def get_users(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.User).filter(models.User.company_id == company_id).offset(skip).limit(limit).all()
+def get_users(db: Session, company_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    return pagination.paginate(db.query(models.User).filter(models.User.company_id == company_id), USER_KEYSET, limit, skip=skip, cursor=cursor)
 
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = jwt_handler.get_password_hash(user.password)
@@ -48,17 +58,44 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
+def update_user(db: Session, user_id: int, user: schemas.UserUpdate):
+    db_user = get_user(db, user_id)
+    if db_user:
+        update_data = user.dict(exclude_unset=True)
+        if "password" in update_data:
+            db_user.hashed_password = jwt_handler.get_password_hash(update_data.pop("password"))
+        for key, value in update_data.items():
+            setattr(db_user, key, value)
+        db.commit()
+        db.refresh(db_user)
+        principal_cache.invalidate_user(user_id)
+    return db_user
+
+def update_user_password_hash(db: Session, db_user: models.User, hashed_password: str):
+    db_user.hashed_password = hashed_password
+    db.commit()
+    return db_user
+
+def delete_user(db: Session, user_id: int):
+    db_user = get_user(db, user_id)
+    if db_user:
+        db.delete(db_user)
+        db.commit()
+        principal_cache.invalidate_user(user_id)
+    return db_user
+
 # Product
 def get_product(db: Session, product_id: int, company_id: int):
     return db.query(models.Product).filter(models.Product.id == product_id, models.Product.company_id == company_id).first()
 
-def get_products(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Product).filter(models.Product.company_id == company_id).offset(skip).limit(limit).all()
+def get_products(db: Session, company_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    return pagination.paginate(db.query(models.Product).filter(models.Product.company_id == company_id), PRODUCT_KEYSET, limit, skip=skip, cursor=cursor)
 
 def create_product(db: Session, product: schemas.ProductCreate, company_id: int):
     db_product = models.Product(**product.dict(), company_id=company_id)
     db.add(db_product)
     db.commit()
+    data_version.bump(company_id)
     db.refresh(db_product)
     return db_product
 
@@ -69,6 +106,7 @@ def update_product(db: Session, product_id: int, product: schemas.ProductUpdate,
         for key, value in update_data.items():
             setattr(db_product, key, value)
         db.commit()
+        data_version.bump(company_id)
         db.refresh(db_product)
     return db_product
 
@@ -77,19 +115,21 @@ def delete_product(db: Session, product_id: int, company_id: int):
     if db_product:
         db.delete(db_product)
         db.commit()
+        data_version.bump(company_id)
     return db_product
 
 # Customer
 def get_customer(db: Session, customer_id: int, company_id: int):
     return db.query(models.Customer).filter(models.Customer.id == customer_id, models.Customer.company_id == company_id).first()
 
-def get_customers(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Customer).filter(models.Customer.company_id == company_id).offset(skip).limit(limit).all()
+def get_customers(db: Session, company_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    return pagination.paginate(db.query(models.Customer).filter(models.Customer.company_id == company_id), CUSTOMER_KEYSET, limit, skip=skip, cursor=cursor)
 
 def create_customer(db: Session, customer: schemas.CustomerCreate, company_id: int):
     db_customer = models.Customer(**customer.dict(), company_id=company_id)
     db.add(db_customer)
     db.commit()
+    data_version.bump(company_id)
     db.refresh(db_customer)
     return db_customer
 
@@ -100,6 +140,7 @@ def update_customer(db: Session, customer_id: int, customer: schemas.CustomerUpd
         for key, value in update_data.items():
             setattr(db_customer, key, value)
         db.commit()
+        data_version.bump(company_id)
         db.refresh(db_customer)
     return db_customer
 
@@ -108,48 +149,197 @@ def delete_customer(db: Session, customer_id: int, company_id: int):
     if db_customer:
         db.delete(db_customer)
         db.commit()
+        data_version.bump(company_id)
     return db_customer
 
 # Order
 def get_order(db: Session, order_id: int, company_id: int):
     return db.query(models.Order).options(joinedload(models.Order.items).joinedload(models.OrderItem.product), joinedload(models.Order.customer)).filter(models.Order.id == order_id, models.Order.company_id == company_id).first()
 
-def get_orders(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Order).filter(models.Order.company_id == company_id).offset(skip).limit(limit).all()
+def get_invoice_snapshot(db: Session, order_id: int, company_id: int):
+    """
+    Everything an invoice shows, as a plain dict, read in a single query (order, company, customer and
+    item lines with their product names), so rendering needs no session and can run in another process.
+    Returns None if the order does not exist.
+    """
+    rows = db.query(
+        models.Order.id, models.Order.company_id, models.Order.date, models.Order.total_price,
+        models.Company.name.label("company_name"), models.Customer.name.label("customer_name"), models.Customer.contact,
+        models.Product.name.label("product_name"), models.OrderItem.quantity, models.OrderItem.price,
+    ).join(models.Company, models.Company.id == models.Order.company_id).outerjoin(models.Customer, models.Customer.id == models.Order.customer_id).outerjoin(models.OrderItem, models.OrderItem.order_id == models.Order.id).outerjoin(models.Product, models.Product.id == models.OrderItem.product_id).filter(models.Order.id == order_id, models.Order.company_id == company_id).order_by(models.OrderItem.id).all()
+    if not rows:
+        return None
+    order = rows[0]
+    return {
+        "order_id": order.id,
+        "company_id": order.company_id,
+        "company_name": order.company_name,
+        "customer_name": order.customer_name,
+        "customer_contact": order.contact,
+        "date": order.date,
+        "total_price": order.total_price,
+        "items": [{"product_name": row.product_name, "quantity": row.quantity, "price": row.price} for row in rows if row.quantity is not None],
+    }
 
-def create_order(db: Session, order: schemas.OrderCreate, user_id: int, company_id: int):
-    total_price = 0
+def get_orders(db: Session, company_id: int, skip: int = 0, limit: int = 100, cursor: str = None):
+    return pagination.paginate(db.query(models.Order).filter(models.Order.company_id == company_id), ORDER_KEYSET, limit, skip=skip, cursor=cursor)
+
+def _lock_products(db: Session, product_ids, company_id: int):
+    """
+    Loads (id, price, stock) for every referenced product in one query, row-locking them
+    in id order so concurrent orders for the same products queue instead of deadlocking.
+    """
+    rows = db.query(models.Product.id, models.Product.price, models.Product.stock).filter(models.Product.id.in_(product_ids), models.Product.company_id == company_id).order_by(models.Product.id).with_for_update().all()
+    return {row.id: row for row in rows}
+
+def _decrement_stock(db: Session, quantities: dict, company_id: int) -> bool:
+    """
+    Decrements stock for all products in a single guarded UPDATE. Returns False if any
+    product no longer has enough stock, in which case the caller must roll back.
+    """
+    quantity = case(quantities, value=models.Product.id)
+    result = db.execute(
+        update(models.Product)
+        .where(models.Product.id.in_(quantities), models.Product.company_id == company_id, models.Product.stock >= quantity)
+        .values(stock=models.Product.stock - quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(quantities)
+
+def _order_quantities(order: schemas.OrderCreate) -> dict:
+    quantities = {}
     for item in order.items:
-        product = get_product(db, item.product_id, company_id)
-        if not product or product.stock < item.quantity:
-            return None
-        total_price += product.price * item.quantity
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+def _add_daily_product_sales(db: Session, company_id: int, orders: list):
+    """
+    Adds new orders to the daily_product_sales rollup with a single upsert. `orders` holds
+    (order_date, item_rows) pairs, where item_rows are the order_items rows just inserted.
+    The caller holds the product row locks, so concurrent upserts of the same rows queue.
+    """
+    totals = {}
+    for order_date, items in orders:
+        day = order_date.date()
+        for product_id in {item["product_id"] for item in items}:
+            totals.setdefault((product_id, day), [0, 0.0, 0, 0])[2] += 1
+        for item in items:
+            entry = totals[(item["product_id"], day)]
+            entry[0] += item["quantity"]
+            entry[1] += item["quantity"] * item["price"]
+            entry[3] += 1
+    if not totals:
+        return
+
+    table = models.DailyProductSales.__table__
+    dialect_insert = sqlite.insert if db.get_bind().dialect.name == "sqlite" else postgresql.insert
+    stmt = dialect_insert(table).values([
+        {"company_id": company_id, "product_id": product_id, "day": day, "quantity": quantity, "revenue": revenue, "order_count": order_count, "line_count": line_count}
+        for (product_id, day), (quantity, revenue, order_count, line_count) in sorted(totals.items())
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.company_id, table.c.product_id, table.c.day],
+        set_={
+            "quantity": table.c.quantity + stmt.excluded.quantity,
+            "revenue": table.c.revenue + stmt.excluded.revenue,
+            "order_count": table.c.order_count + stmt.excluded.order_count,
+            "line_count": table.c.line_count + stmt.excluded.line_count,
+        },
+    ))
+
+def create_order(db: Session, order: schemas.OrderCreate, user_id: int, company_id: int):
+    quantities = _order_quantities(order)
+    products = _lock_products(db, quantities, company_id)
+    if len(products) != len(quantities) or any(products[product_id].stock < quantity for product_id, quantity in quantities.items()):
+        db.rollback()
+        return None
 
     db_order = models.Order(
         customer_id=order.customer_id,
         user_id=user_id,
-        total_price=total_price,
+        total_price=sum(products[item.product_id].price * item.quantity for item in order.items),
         company_id=company_id
     )
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db.flush()
+
+    if order.items:
+        if not _decrement_stock(db, quantities, company_id):
+            db.rollback()
+            return None
+        items = [
+            {"order_id": db_order.id, "product_id": item.product_id, "quantity": item.quantity, "price": products[item.product_id].price}
+            for item in order.items
+        ]
+        db.execute(insert(models.OrderItem), items)
+        _add_daily_product_sales(db, company_id, [(db_order.date, items)])
 
-    for item in order.items:
-        product = get_product(db, item.product_id, company_id)
-        product.stock -= item.quantity
-        db_item = models.OrderItem(
-            order_id=db_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=product.price
-        )
-        db.add(db_item)
-    
     db.commit()
+    data_version.bump(company_id)
     db.refresh(db_order)
     return db_order
 
+def create_orders_bulk(db: Session, orders: list, user_id: int, company_id: int) -> list:
+    """
+    Creates a batch of orders in one transaction. All referenced products are locked and
+    loaded once, each order is validated against the running stock of that product map,
+    and the accepted orders and their items are written with batched inserts.
+    Returns the new order ID for each input order, or None where the order was rejected.
+    """
+    products = _lock_products(db, {item.product_id for order in orders for item in order.items}, company_id)
+    stock = {product_id: product.stock for product_id, product in products.items()}
+
+    accepted = []
+    quantities = {}
+    for index, order in enumerate(orders):
+        needed = _order_quantities(order)
+        if any(product_id not in stock or stock[product_id] < quantity for product_id, quantity in needed.items()):
+            continue
+        for product_id, quantity in needed.items():
+            stock[product_id] -= quantity
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        accepted.append(index)
+
+    order_ids = [None] * len(orders)
+    if not accepted:
+        db.rollback()
+        return order_ids
+
+    new_orders = db.execute(
+        insert(models.Order).returning(models.Order.id, models.Order.date, sort_by_parameter_order=True),
+        [
+            {
+                "customer_id": orders[index].customer_id,
+                "user_id": user_id,
+                "total_price": sum(products[item.product_id].price * item.quantity for item in orders[index].items),
+                "company_id": company_id,
+            }
+            for index in accepted
+        ],
+    ).all()
+
+    items = []
+    rollup = []
+    for index, (order_id, order_date) in zip(accepted, new_orders):
+        order_ids[index] = order_id
+        order_items = [
+            {"order_id": order_id, "product_id": item.product_id, "quantity": item.quantity, "price": products[item.product_id].price}
+            for item in orders[index].items
+        ]
+        items.extend(order_items)
+        rollup.append((order_date, order_items))
+
+    if items:
+        if not _decrement_stock(db, quantities, company_id):
+            db.rollback()
+            return [None] * len(orders)
+        db.execute(insert(models.OrderItem), items)
+        _add_daily_product_sales(db, company_id, rollup)
+
+    db.commit()
+    data_version.bump(company_id)
+    return order_ids
+
 # Reporting
 def get_sales_by_date(db: Session, start_date: datetime, end_date: datetime, company_id: int):
     return db.query(models.Order).filter(models.Order.date.between(start_date, end_date), models.Order.company_id == company_id).all()
@@ -158,11 +348,72 @@ def get_low_stock_products(db: Session, company_id: int, limit: int = 10):
     return db.query(models.Product).filter(models.Product.stock < limit, models.Product.company_id == company_id).all()
 
 def get_top_selling_products(db: Session, company_id: int, limit: int = 10):
-    return db.query(models.Product, func.sum(models.OrderItem.quantity).label('total_quantity')).join(models.OrderItem, models.OrderItem.product_id == models.Product.id).filter(models.Product.company_id == company_id).group_by(models.Product.id).order_by(func.sum(models.OrderItem.quantity).desc()).limit(limit).all()
+    total_quantity = func.sum(models.DailyProductSales.quantity)
+    return db.query(models.Product, total_quantity.label('total_quantity')).join(models.DailyProductSales, models.DailyProductSales.product_id == models.Product.id).filter(models.DailyProductSales.company_id == company_id).group_by(models.Product.id).order_by(total_quantity.desc()).limit(limit).all()
+
+def is_day_aligned(start_date: datetime, end_date: datetime) -> bool:
+    """
+    Whether [start_date, end_date) covers whole days, so it can be answered from the daily rollup.
+    """
+    return all(value.tzinfo is None and value.time() == time(0) for value in (start_date, end_date))
+
+def iter_sales_rows(db: Session, start_date: datetime, end_date: datetime, company_id: int, batch_size: int = 1000):
+    """
+    Sales as plain (order_id, customer_id, total_price, date) tuples, streamed from a server-side cursor in batches.
+    """
+    return db.query(models.Order.id, models.Order.customer_id, models.Order.total_price, models.Order.date).filter(models.Order.date.between(start_date, end_date), models.Order.company_id == company_id).order_by(models.Order.id).yield_per(batch_size)
+
+def iter_order_item_rows(db: Session, start_date: datetime, end_date: datetime, company_id: int, batch_size: int = 1000):
+    """
+    Order lines as plain (order_item_id, order_id, date, customer_id, product_id, quantity, price) tuples,
+    streamed from a server-side cursor in batches.
+    """
+    return db.query(models.OrderItem.id, models.OrderItem.order_id, models.Order.date, models.Order.customer_id, models.OrderItem.product_id, models.OrderItem.quantity, models.OrderItem.price).join(models.Order, models.Order.id == models.OrderItem.order_id).filter(models.Order.date.between(start_date, end_date), models.Order.company_id == company_id).order_by(models.OrderItem.id).yield_per(batch_size)
+
+def iter_low_stock_rows(db: Session, company_id: int, limit: int = 10, batch_size: int = 1000):
+    """
+    Low-stock products as plain (product_id, name, stock) tuples, streamed from a server-side cursor in batches.
+    """
+    return db.query(models.Product.id, models.Product.name, models.Product.stock).filter(models.Product.stock < limit, models.Product.company_id == company_id).order_by(models.Product.id).yield_per(batch_size)
+
+def iter_top_selling_rows(db: Session, company_id: int, limit: int = 10, batch_size: int = 1000):
+    """
+    Top-selling products as plain (product_id, name, total_quantity) tuples, streamed from a server-side cursor in batches.
+    """
+    total_quantity = func.sum(models.DailyProductSales.quantity)
+    return db.query(models.Product.id, models.Product.name, total_quantity.label('total_quantity')).join(models.DailyProductSales, models.DailyProductSales.product_id == models.Product.id).filter(models.DailyProductSales.company_id == company_id).group_by(models.Product.id, models.Product.name).order_by(total_quantity.desc()).limit(limit).yield_per(batch_size)
 
 def get_total_revenue(db: Session, company_id: int):
-    return db.query(func.sum(models.Order.total_price)).filter(models.Order.company_id == company_id).scalar()
+    return db.query(func.sum(models.DailyProductSales.revenue)).filter(models.DailyProductSales.company_id == company_id).scalar()
 
 # AI
 def get_product_sales_history(db: Session, product_id: int, company_id: int):
-    return db.query(models.Order.date, models.OrderItem.quantity).join(models.OrderItem).filter(models.OrderItem.product_id == product_id, models.Order.company_id == company_id).all()
\ No newline at end of file
+    return db.query(models.Order.date, models.OrderItem.quantity).join(models.OrderItem).filter(models.OrderItem.product_id == product_id, models.Order.company_id == company_id).all()
+
+def get_product_sales_version(db: Session, product_id: int, company_id: int):
+    """
+    The ID of the latest order containing the product, or None if it has never sold. Forecasts
+    for the product only change when this does; it is an index-only lookup on order_items.
+    """
+    return db.query(func.max(models.OrderItem.order_id)).join(models.Product, models.Product.id == models.OrderItem.product_id).filter(models.OrderItem.product_id == product_id, models.Product.company_id == company_id).scalar()
+
+def get_product_sales_versions(db: Session, company_id: int, product_ids: list = None) -> dict:
+    """
+    get_product_sales_version for every product of the company (or the given ones), in one query.
+    """
+    query = db.query(models.Product.id, func.max(models.OrderItem.order_id)).outerjoin(models.OrderItem, models.OrderItem.product_id == models.Product.id).filter(models.Product.company_id == company_id)
+    if product_ids is not None:
+        query = query.filter(models.Product.id.in_(product_ids))
+    return dict(query.group_by(models.Product.id).all())
+
+def get_daily_sales_history(db: Session, company_id: int, product_ids: list = None):
+    """
+    (product_id, day, quantity, order_count, line_count) for every product of the company (or the given ones),
+    in one query over the daily sales rollup. Products without sales appear once with day None.
+    """
+    rollup = models.DailyProductSales
+    query = db.query(models.Product.id.label('product_id'), rollup.day, rollup.quantity, rollup.order_count, rollup.line_count).outerjoin(rollup, (rollup.product_id == models.Product.id) & (rollup.company_id == models.Product.company_id)).filter(models.Product.company_id == company_id)
+    if product_ids is not None:
+        query = query.filter(models.Product.id.in_(product_ids))
+    return query.order_by(models.Product.id, rollup.day).all()
+
@@ -0,0 +1,136 @@
+"""
+A per-company data version: a counter bumped after every committed write to a company's products,
+customers or orders. Anything derived from that data (e.g. cached reports) is current as long as
+the version it was computed at is still the company's version.
+"""
+from typing import Optional
+import asyncio
+import logging
+import os
+import threading
+import uuid
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# memory or redis; versions must be shared whenever more than one process serves or writes a company's data,
+# so Redis is the default as soon as one is configured.
+DATA_VERSION_BACKEND = os.getenv("DATA_VERSION_BACKEND", "redis" if os.getenv("REDIS_URL") else "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+EPOCH_KEY = "data_version_epoch"
+
+
+class _MemoryBackend:
+    """
+    Versions of this process only. They start over with a new epoch on every restart, so a version
+    (or an ETag derived from it) handed out before the restart never matches again.
+    """
+    blocking = False
+
+    def __init__(self):
+        self._epoch = uuid.uuid4().hex[:8]
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, company_id: int) -> Optional[str]:
+        return f"{self._epoch}.{self._versions.get(company_id, 0)}"
+
+    def bump(self, company_id: int):
+        with self._lock:
+            self._versions[company_id] = self._versions.get(company_id, 0) + 1
+
+    def bump_all(self):
+        with self._lock:
+            self._epoch = uuid.uuid4().hex[:8]
+
+
+class _RedisBackend:
+    """
+    Shares versions between uvicorn workers, so a write in one worker invalidates what the others have cached.
+
+    Counters are prefixed with an epoch kept in Redis too. If Redis loses its data the counters restart
+    from zero, but under a new epoch, so an old version can never be handed out again.
+    """
+    blocking = True  # network round trips: keep them off the event loop
+
+    def __init__(self, url: str):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+
+    def get(self, company_id: int) -> Optional[str]:
+        try:
+            epoch, version = self._redis.mget(EPOCH_KEY, f"data_version:{company_id}")
+            if epoch is None:
+                self._redis.set(EPOCH_KEY, uuid.uuid4().hex[:8], nx=True)
+                epoch, version = self._redis.mget(EPOCH_KEY, f"data_version:{company_id}")
+        except self._errors:
+            logger.warning("Data version lookup failed", exc_info=True)
+            return None
+        if epoch is None:
+            return None
+        return f"{epoch.decode()}.{version.decode() if version else 0}"
+
+    def bump(self, company_id: int):
+        try:
+            self._redis.incr(f"data_version:{company_id}")
+        except self._errors:
+            logger.warning("Data version bump failed", exc_info=True)
+
+    def bump_all(self):
+        try:
+            self._redis.set(EPOCH_KEY, uuid.uuid4().hex[:8])
+        except self._errors:
+            logger.warning("Data version bump failed", exc_info=True)
+
+
+def _make_backend():
+    if DATA_VERSION_BACKEND == "redis":
+        return _RedisBackend(REDIS_URL)
+    return _MemoryBackend()
+
+
+_backend = _make_backend()
+_bumps = 0
+
+def get(company_id: int) -> Optional[str]:
+    """
+    The company's current data version, or None if it cannot be determined (nothing derived should be cached then).
+    """
+    return _backend.get(company_id)
+
+def bump(company_id: int):
+    """
+    Marks the company's data as changed. Call it after the write has been committed.
+    """
+    global _bumps
+    _backend.bump(company_id)
+    _bumps += 1
+
+def bump_all():
+    """
+    Marks every company's data as changed, e.g. after a maintenance job rewrote data for all of them.
+    """
+    global _bumps
+    _backend.bump_all()
+    _bumps += 1
+
+async def get_async(company_id: int) -> Optional[str]:
+    """
+    get() for code on the event loop; a Redis lookup runs in a worker thread.
+    """
+    if _backend.blocking:
+        return await asyncio.to_thread(get, company_id)
+    return get(company_id)
+
+async def bump_async(company_id: int):
+    """
+    bump() for code on the event loop; a Redis increment runs in a worker thread.
+    """
+    if _backend.blocking:
+        await asyncio.to_thread(bump, company_id)
+    else:
+        bump(company_id)
+
+metrics.register("data_version", lambda: {"backend": DATA_VERSION_BACKEND, "bumps": _bumps})
@@ -1,14 +1,110 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import time
+import uuid
 from dotenv import load_dotenv
+
+from app import metrics
+
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 SQLALCHEMY_DATABASE_URL = DATABASE_URL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+# Pool settings apply to each engine in each process: every web worker and the MCP server have a sync
+# and an async engine, each holding up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"  # connecting through PgBouncer in transaction pooling mode
+
+
+class _InstrumentedPoolMixin:
+    """
+    Times every checkout, including the wait for a free connection when the pool is exhausted.
+    """
+
+    def _do_get(self):
+        stats = self.__dict__.setdefault("_checkout_stats", {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0})
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            stats["timeouts"] += 1
+            raise
+        finally:
+            wait = time.perf_counter() - started_at
+            stats["checkouts"] += 1
+            stats["wait_seconds_total"] += wait
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], wait)
+
+    def stats(self) -> dict:
+        checkout_stats = self.__dict__.get("_checkout_stats", {"checkouts": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0})
+        return dict(
+            checkout_stats,
+            pool_size=self.size(),
+            max_overflow=self._max_overflow,
+            in_use=self.checkedout(),
+            idle=self.checkedin(),
+            overflow=max(self.overflow(), 0),
+        )
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options(poolclass) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_pool_options(InstrumentedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the same database, used by code running on an event loop (async routes and MCP tools).
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def _async_database_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+def _async_connect_args(url) -> dict:
+    # psycopg2 never prepares statements server-side, but asyncpg does, and PgBouncer in transaction mode can
+    # hand the next transaction to a different server connection. Turn off asyncpg's statement caches and give
+    # every prepared statement a unique name so they can never collide across clients.
+    if DB_PGBOUNCER and make_url(url).get_driver_name() == "asyncpg":
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {}
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=_async_connect_args(ASYNC_DATABASE_URL), **_pool_options(InstrumentedAsyncQueuePool))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# engine.pool is read on every call because dispose() replaces the pool object.
+metrics.register("db_pool", lambda: engine.pool.stats())
+metrics.register("db_pool_async", lambda: async_engine.sync_engine.pool.stats())
+
 Base = declarative_base()
 
 def get_db():
@@ -16,4 +112,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,101 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+FORECAST_HORIZON_DAYS = 30
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+
+_process_pool = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn rather than fork: the parent is an event loop with threads and open DB connections.
+        _process_pool = ProcessPoolExecutor(max_workers=FORECAST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+
+async def run_in_process(fn, *args):
+    """
+    Runs a CPU-bound forecast function in the worker process pool, so model fitting never blocks the event loop
+    (in-process MCP tools share it with the web app). `fn` and its arguments must be picklable.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_get_process_pool(), fn, *args)
+
+
+def forecast_next_month(sales_data: list, horizon: int = FORECAST_HORIZON_DAYS) -> float:
+    """
+    Fits a LinearRegression of quantity on calendar days since the first sale and sums its prediction over the
+    next `horizon` days. `sales_data` is a list of {'date', 'quantity'} dicts; fewer than two sales forecast 0.
+    """
+    if not sales_data or len(sales_data) < 2:
+        return 0.0
+
+    df = pd.DataFrame(sales_data, columns=['date', 'quantity'])
+    # Calendar days, as in the daily sales rollup, so forecast_next_month_batch gives the same result.
+    df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    df['days_since_start'] = (df['date'] - df['date'].min()).dt.days
+
+    X = df[['days_since_start']]
+    y = df['quantity']
+
+    model = LinearRegression()
+    model.fit(X, y)
+
+    last_day = df['days_since_start'].max()
+    next_month_days = pd.DataFrame({'days_since_start': range(last_day + 1, last_day + horizon + 1)})
+    predicted_sales = model.predict(next_month_days)
+
+    return float(max(0, sum(predicted_sales)))
+
+
+def forecast_next_month_batch(product_ids, days, quantities, sale_counts, horizon: int = FORECAST_HORIZON_DAYS) -> dict:
+    """
+    Fits a least-squares sales trend for every product at once and sums it over the next `horizon` days.
+
+    The inputs are parallel sequences with one entry per (product, day) that had sales: the product ID,
+    the day as an ordinal, the units sold that day and the number of sales (order lines) that day. This is
+    the same model as forecast_next_month on the product's individual sales (x = calendar days since the
+    first sale, y = quantity): each day contributes `sale_count` points at the same x, and the sums the
+    fit needs only depend on the per-day totals. Products with fewer than two sales forecast 0.
+
+    Returns a dict of product ID to predicted units for the horizon.
+    """
+    if len(product_ids) == 0:
+        return {}
+
+    product_ids = np.asarray(product_ids)
+    days = np.asarray(days, dtype=float)
+    quantities = np.asarray(quantities, dtype=float)
+    sale_counts = np.asarray(sale_counts, dtype=float)
+
+    products, index = np.unique(product_ids, return_inverse=True)
+    size = len(products)
+
+    first_day = np.full(size, np.inf)
+    np.minimum.at(first_day, index, days)
+    x = days - first_day[index]
+    last_day = np.zeros(size)
+    np.maximum.at(last_day, index, x)
+
+    n = np.bincount(index, weights=sale_counts, minlength=size)
+    mean_x = np.bincount(index, weights=sale_counts * x, minlength=size) / n
+    mean_y = np.bincount(index, weights=quantities, minlength=size) / n
+
+    # Centered sums keep the fit numerically stable for long histories.
+    dx = x - mean_x[index]
+    sxx = np.bincount(index, weights=sale_counts * dx * dx, minlength=size)
+    sxy = np.bincount(index, weights=dx * quantities, minlength=size)
+    slope = np.divide(sxy, sxx, out=np.zeros(size), where=sxx > 0)
+    intercept = mean_y - slope * mean_x
+
+    # sum(intercept + slope * t) for t = last_day + 1 .. last_day + horizon
+    predicted = horizon * intercept + slope * (horizon * last_day + horizon * (horizon + 1) / 2)
+    predicted = np.where(n >= 2, np.maximum(predicted, 0.0), 0.0)
+    return dict(zip(products.tolist(), predicted.tolist()))
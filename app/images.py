@@ -0,0 +1,92 @@
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+import logging
+import os
+import threading
+
+from app import storage
+
+logger = logging.getLogger(__name__)
+
+# Longest side, in pixels, of each pre-generated variant; "full" serves the stored original.
+IMAGE_VARIANTS = {"thumb": 200, "medium": 800}
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "2"))
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+IMAGE_VARIANT_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+
+MEDIA_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+# Variants are generated after upload on a small, fixed-size pool (Pillow releases the GIL while resizing).
+_variant_executor = ThreadPoolExecutor(max_workers=IMAGE_VARIANT_WORKERS, thread_name_prefix="image-variant")
+
+def variant_path(source_path: str, size: str) -> str:
+    """
+    Where the variant of an image is cached: next to the original, so variants of a content-addressed
+    blob are shared by every product using it.
+    """
+    return f"{os.path.splitext(source_path)[0]}.{size}.{IMAGE_VARIANT_FORMAT.lower()}"
+
+def generate_variant(source_path: str, size: str) -> str:
+    """
+    Renders one variant of an image (orientation applied, fitted within the variant's size) and stores it atomically.
+    """
+    path = variant_path(source_path, size)
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((IMAGE_VARIANTS[size], IMAGE_VARIANTS[size]), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA") or (IMAGE_VARIANT_FORMAT == "JPEG" and image.mode == "RGBA"):
+            image = image.convert("RGB")
+        # A request may generate a missing variant while the upload's job does, so write privately and move into place.
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, IMAGE_VARIANT_FORMAT, quality=IMAGE_VARIANT_QUALITY)
+    os.replace(tmp_path, path)
+    return path
+
+def _generate_variants_job(source_path: str):
+    for size in IMAGE_VARIANTS:
+        try:
+            if not os.path.exists(variant_path(source_path, size)):
+                generate_variant(source_path, size)
+        except UnidentifiedImageError:
+            # Not an image Pillow can read (the image route answers 415 for it): no variant can be made.
+            logger.warning("%s is not a readable image; no variants generated", source_path)
+            return
+        except Exception:
+            logger.exception("Generating the %s variant of %s failed", size, source_path)
+
+def enqueue_variants(source_path: str):
+    """
+    Schedules generation of every variant of a newly stored image on the variant worker pool.
+    """
+    return _variant_executor.submit(_generate_variants_job, source_path)
+
+async def get_variant(source_path: str, size: str) -> str:
+    """
+    The path of an image's variant, generated now (off the event loop) if it is not on disk yet.
+    """
+    if size == "full":
+        return source_path
+    path = variant_path(source_path, size)
+    if not os.path.exists(path):
+        path = await run_in_threadpool(generate_variant, source_path, size)
+    return path
+
+def media_type(source_path: str, size: str):
+    if size != "full":
+        return MEDIA_TYPES[IMAGE_VARIANT_FORMAT]
+    return None  # FileResponse guesses it from the original's extension
+
+def etag(source_path: str, size: str) -> str:
+    """
+    A strong ETag for a variant. Blobs are named by the SHA-256 of their content; other (legacy) images fall
+    back to their modification time and size.
+    """
+    if os.path.dirname(os.path.dirname(source_path)) == storage.BLOBS_DIR:
+        version = os.path.splitext(os.path.basename(source_path))[0]
+    else:
+        stat = os.stat(source_path)
+        version = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    if size == "full":
+        return f'"{version}"'
+    return f'"{version}-{size}-{IMAGE_VARIANT_FORMAT.lower()}{IMAGE_VARIANT_QUALITY}"'
@@ -1,19 +1,36 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse # Added
+from fastapi.responses import FileResponse, JSONResponse # Added
+from app import ai, metrics
+from app.storage import UploadSizeLimitMiddleware
 from app.database import engine, Base
+from app.utils.pagination import InvalidCursor
 from app.routes import auth_routes, product_routes, customer_routes, order_routes, report_routes, ai_routes, user_routes
 
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ai.mcp_pool.start()
+    yield
+    await ai.mcp_pool.close()
+
 app = FastAPI(
     title="AI-Powered Inventory & Billing + Stock Prediction System",
     description="This is a production-ready FastAPI project with a lot of features.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Mount static files (like favicon.ico)
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": "Invalid cursor"})
+
 
 app.include_router(auth_routes.router, prefix="/auth", tags=["Authentication"])
 app.include_router(product_routes.router, prefix="/products", tags=["Products"])
@@ -27,4 +44,8 @@ app.include_router(user_routes.router, prefix="/users", tags=["Users"])
 
 @app.get("/", tags=["Root"])
 async def read_root():
-    return {"message": "Welcome to the AI-Powered Inventory & Billing + Stock Prediction System!"}
\ No newline at end of file
+    return {"message": "Welcome to the AI-Powered Inventory & Billing + Stock Prediction System!"}
+
+@app.get("/metrics", tags=["Root"])
+def read_metrics():
+    return metrics.collect()
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""
+A small in-process registry of runtime metrics. Components register a provider that
+returns a JSON-serializable snapshot, and GET /metrics reports all of them.
+"""
+
+_providers = {}
+
+def register(name: str, provider):
+    _providers[name] = provider
+
+def collect() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
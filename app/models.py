@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -16,6 +16,7 @@ class Company(Base):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_company_id_id", "company_id", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
@@ -28,6 +29,10 @@ class User(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_company_id_stock", "company_id", "stock"),
+        Index("ix_products_company_id_id", "company_id", "id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     price = Column(Float)
@@ -40,6 +45,7 @@ class Product(Base):
 
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = (Index("ix_customers_company_id_id", "company_id", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     contact = Column(String)
@@ -50,6 +56,9 @@ class Customer(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (Index("ix_orders_company_id_date_id", "company_id", "date", "id"),)
+    # Fetch the server-generated date on flush; the daily sales rollup needs it in the same transaction.
+    __mapper_args__ = {"eager_defaults": True}
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -57,6 +66,7 @@ class Order(Base):
     date = Column(DateTime(timezone=True), server_default=func.now())
     company_id = Column(Integer, ForeignKey("companies.id"))
     pdf_invoice_path = Column(String, nullable=True)
+    invoice_status = Column(String, default="pending")
     company = relationship("Company", back_populates="orders")
     customer = relationship("Customer", back_populates="orders")
     user = relationship("User", back_populates="orders")
@@ -65,10 +75,30 @@ class Order(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index("ix_order_items_product_id_order_id", "product_id", "order_id"),
+        Index("ix_order_items_order_id", "order_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
     price = Column(Float)
     order = relationship("Order", back_populates="items")
-    product = relationship("Product", back_populates="order_items")
\ No newline at end of file
+    product = relationship("Product", back_populates="order_items")
+
+
+class DailyProductSales(Base):
+    """
+    Per-day sales rollup, maintained in the same transaction as order creation
+    (see crud._add_daily_product_sales) and rebuildable with `python -m app.rollups`.
+    """
+    __tablename__ = "daily_product_sales"
+    __table_args__ = (Index("ix_daily_product_sales_company_id_day", "company_id", "day"),)
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    order_count = Column(Integer, nullable=False, default=0)
+    line_count = Column(Integer, nullable=False, default=0)  # order_items rows, i.e. individual sales
@@ -1,14 +1,75 @@
 import pytesseract
-from PIL import Image
+from PIL import Image, ImageOps
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import hashlib
 import io
+import multiprocessing
+import os
 
-def extract_text_from_image(image_bytes: bytes) -> str:
+from app import metrics
+from app.utils.cache import LRUCache
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "1024"))
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2500"))  # pixels, for images without DPI information
+
+# Extracted text keyed by the SHA-256 of the image bytes, so re-uploading the same label is free.
+_text_cache = LRUCache(maxsize=OCR_CACHE_SIZE)
+_process_pool = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+def preprocess_image(image: Image.Image) -> Image.Image:
     """
-    Extracts text from an image using pytesseract.
+    Prepares an image for Tesseract: applies the EXIF orientation, converts to grayscale and
+    downscales to about OCR_TARGET_DPI (or to OCR_MAX_SIDE pixels on the long side when the
+    image has no DPI), which keeps accuracy while cutting OCR time on large photos.
     """
+    image = ImageOps.exif_transpose(image).convert("L")
+    scale = 1.0
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > OCR_TARGET_DPI:
+        scale = OCR_TARGET_DPI / float(dpi[0])
+    elif max(image.size) > OCR_MAX_SIDE:
+        scale = OCR_MAX_SIDE / max(image.size)
+    if scale < 1.0:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+    return image
+
+def _run_ocr(image) -> str:
     try:
-        image = Image.open(io.BytesIO(image_bytes))
-        text = pytesseract.image_to_string(image)
+        image = Image.open(io.BytesIO(image) if isinstance(image, bytes) else image)
+        text = pytesseract.image_to_string(preprocess_image(image))
         return text
     except Exception as e:
         return f"Error during OCR: {str(e)}"
+
+def _is_error(text: str) -> bool:
+    return text.startswith("Error during OCR: ")
+
+def image_digest(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+async def extract_text_async(image, digest: str = None) -> str:
+    """
+    Extracts text from an image in the OCR process pool, so the event loop never runs Tesseract.
+    `image` is either the image bytes or the path of a stored image, in which case `digest` (its
+    SHA-256) must be given; the worker then reads the file itself instead of receiving the bytes.
+    """
+    if digest is None:
+        digest = image_digest(image)
+    text = _text_cache.get(digest)
+    if text is None:
+        text = await asyncio.get_running_loop().run_in_executor(_get_process_pool(), _run_ocr, image)
+        if not _is_error(text):
+            _text_cache.set(digest, text)
+    return text
+
+metrics.register("ocr", lambda: dict(_text_cache.stats(), workers=OCR_WORKERS))
@@ -0,0 +1,178 @@
+from typing import NamedTuple, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from app import metrics
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_BACKEND = os.getenv("PRINCIPAL_CACHE_BACKEND", "memory")  # memory, redis or none
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+
+class Principal(NamedTuple):
+    """
+    The authenticated caller, as much of the user row as request handlers need.
+    """
+    id: int
+    username: str
+    company_id: int
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, username=user.username, company_id=user.company_id, is_active=user.is_active)
+
+
+class _MemoryBackend:
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, key: str) -> Optional[Principal]:
+        return self._cache.get(key)
+
+    def set(self, key: str, principal: Principal, ttl: float):
+        self._cache.set(key, principal, ttl=ttl)
+
+    def invalidate_user(self, user_id: int):
+        self._cache.discard_where(lambda principal: principal.id == user_id)
+
+    def size(self) -> int:
+        return len(self._cache)
+
+
+class _RedisBackend:
+    """
+    Shares cached principals between uvicorn workers. Each user also has a set of the
+    token keys cached for them, so invalidation reaches every worker.
+    """
+    blocking = True  # network round trips: keep them off the event loop
+
+    def __init__(self, url: str):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._errors = redis.RedisError
+
+    def get(self, key: str) -> Optional[Principal]:
+        try:
+            raw = self._redis.get(f"principal:{key}")
+        except self._errors:
+            logger.warning("Principal cache lookup failed", exc_info=True)
+            return None
+        return Principal(**json.loads(raw)) if raw else None
+
+    def set(self, key: str, principal: Principal, ttl: float):
+        user_key = f"principal_user:{principal.id}"
+        try:
+            pipe = self._redis.pipeline()
+            pipe.setex(f"principal:{key}", max(1, int(ttl)), json.dumps(principal._asdict()))
+            pipe.sadd(user_key, key)
+            pipe.expire(user_key, PRINCIPAL_CACHE_TTL)
+            pipe.execute()
+        except self._errors:
+            logger.warning("Principal cache store failed", exc_info=True)
+
+    def invalidate_user(self, user_id: int):
+        # Called after the user's change is committed, so a failure is logged rather than failing the request;
+        # the cached principals then expire within PRINCIPAL_CACHE_TTL.
+        user_key = f"principal_user:{user_id}"
+        try:
+            keys = self._redis.smembers(user_key)
+            self._redis.delete(user_key, *[f"principal:{key.decode()}" for key in keys])
+        except self._errors:
+            logger.warning("Principal cache invalidation failed", exc_info=True)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class _NullBackend:
+    blocking = False
+
+    def get(self, key: str):
+        return None
+
+    def set(self, key: str, principal: Principal, ttl: float):
+        pass
+
+    def invalidate_user(self, user_id: int):
+        pass
+
+    def size(self) -> int:
+        return 0
+
+
+def _make_backend():
+    if PRINCIPAL_CACHE_BACKEND == "redis":
+        return _RedisBackend(REDIS_URL)
+    if PRINCIPAL_CACHE_BACKEND == "none":
+        return _NullBackend()
+    return _MemoryBackend(PRINCIPAL_CACHE_SIZE)
+
+
+_backend = _make_backend()
+_hits = 0
+_misses = 0
+
+def _key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def get(token: str) -> Optional[Principal]:
+    global _hits, _misses
+    principal = _backend.get(_key(token))
+    if principal is None:
+        _misses += 1
+    else:
+        _hits += 1
+    return principal
+
+def put(token: str, principal: Principal, expires_at: Optional[int] = None):
+    """
+    Caches the principal for a token, for at most PRINCIPAL_CACHE_TTL seconds and never past the token's expiry.
+    """
+    ttl = PRINCIPAL_CACHE_TTL
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        _backend.set(_key(token), principal, ttl)
+
+async def get_async(token: str) -> Optional[Principal]:
+    """
+    get() for code on the event loop; a Redis lookup runs in a worker thread.
+    """
+    if _backend.blocking:
+        return await asyncio.to_thread(get, token)
+    return get(token)
+
+async def put_async(token: str, principal: Principal, expires_at: Optional[int] = None):
+    """
+    put() for code on the event loop; a Redis store runs in a worker thread.
+    """
+    if _backend.blocking:
+        await asyncio.to_thread(put, token, principal, expires_at)
+    else:
+        put(token, principal, expires_at)
+
+def invalidate_user(user_id: int):
+    _backend.invalidate_user(user_id)
+
+def stats() -> dict:
+    lookups = _hits + _misses
+    return {
+        "backend": PRINCIPAL_CACHE_BACKEND,
+        "size": _backend.size(),
+        "hits": _hits,
+        "misses": _misses,
+        "hit_rate": _hits / lookups if lookups else 0.0,
+    }
+
+metrics.register("principal_cache", stats)
@@ -0,0 +1,184 @@
+"""
+Background report jobs. A job renders a report (CSV or PDF) into uploads/reports/<company>/ on a
+small worker pool and records its status and progress in a JSON file next to it.
+
+Jobs are content-addressed: the job ID is a hash of the company, report, parameters, format and
+the company's data version, so submitting a report that is already done (and still current) or
+in flight returns the existing job instead of rendering it again.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from app import crud, data_version, metrics, schemas
+from app.database import SessionLocal
+from app.utils.pdf_generator import generate_sales_report_pdf, generate_low_stock_report_pdf, generate_top_selling_report_pdf
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = os.path.join("uploads", "reports")
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+REPORT_JOB_PROGRESS_ROWS = int(os.getenv("REPORT_JOB_PROGRESS_ROWS", "1000"))
+# A job still marked queued or running whose status has not been touched for this long is presumed
+# lost (e.g. its worker process was restarted) and is started again when it is next submitted.
+REPORT_JOB_STALE_SECONDS = int(os.getenv("REPORT_JOB_STALE_SECONDS", "300"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_READY = "ready"
+JOB_FAILED = "failed"
+
+
+class InvalidReportJob(ValueError):
+    pass
+
+
+class ReportType(NamedTuple):
+    rows_query: object
+    csv_header: list
+    generate_pdf: object
+    params: tuple  # the ReportJobCreate fields the report uses
+
+
+REPORT_TYPES = {
+    "sales": ReportType(crud.iter_sales_rows, ["order_id", "customer_id", "total_price", "date"], generate_sales_report_pdf, ("start_date", "end_date")),
+    "low_stock": ReportType(crud.iter_low_stock_rows, ["product_id", "name", "stock"], generate_low_stock_report_pdf, ("limit",)),
+    "top_selling": ReportType(crud.iter_top_selling_rows, ["product_id", "name", "total_quantity"], generate_top_selling_report_pdf, ("limit",)),
+}
+
+_job_executor = ThreadPoolExecutor(max_workers=REPORT_JOB_WORKERS, thread_name_prefix="report-job")
+_submit_lock = threading.Lock()
+_submitted = 0
+_reused = 0
+
+def _job_dir(company_id: int) -> str:
+    return os.path.join(REPORTS_DIR, str(company_id), "jobs")
+
+def _status_path(company_id: int, job_id: str) -> str:
+    return os.path.join(_job_dir(company_id), f"{job_id}.json")
+
+def artifact_path(company_id: int, job_id: str, format: str) -> str:
+    return os.path.join(REPORTS_DIR, str(company_id), f"{job_id}.{format}")
+
+def _write_status(company_id: int, status: dict):
+    status["updated_at"] = time.time()
+    path = _status_path(company_id, status["job_id"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+
+def get_job(company_id: int, job_id: str) -> Optional[dict]:
+    """
+    The job's status, or None if the company has no such job.
+    """
+    if not all(c in "0123456789abcdef" for c in job_id):
+        return None
+    try:
+        with open(_status_path(company_id, job_id)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def _query_args(report: ReportType, job: schemas.ReportJobCreate) -> dict:
+    args = {name: getattr(job, name) for name in report.params}
+    if job.type == "sales" and (job.start_date is None or job.end_date is None):
+        raise InvalidReportJob("Sales report jobs need start_date and end_date")
+    return args
+
+def _job_id(company_id: int, job: schemas.ReportJobCreate, query_args: dict) -> str:
+    version = data_version.get(company_id) or uuid.uuid4().hex  # no version: never reuse
+    key = {"company_id": company_id, "type": job.type, "format": job.format, "params": {name: str(value) for name, value in query_args.items()}, "version": version}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:32]
+
+def _is_current(status: Optional[dict]) -> bool:
+    if status is None or status["status"] == JOB_FAILED:
+        return False
+    if status["status"] == JOB_READY:
+        return os.path.exists(status["artifact"])
+    return time.time() - status["updated_at"] < REPORT_JOB_STALE_SECONDS
+
+def submit_job(company_id: int, job: schemas.ReportJobCreate) -> dict:
+    """
+    Queues a report job, or returns the existing job for an identical request that is done or in flight.
+    Raises InvalidReportJob if the report's parameters are missing.
+    """
+    global _submitted, _reused
+    report = REPORT_TYPES[job.type]
+    query_args = _query_args(report, job)
+    job_id = _job_id(company_id, job, query_args)
+    with _submit_lock:
+        status = get_job(company_id, job_id)
+        if _is_current(status):
+            _reused += 1
+            return status
+        status = {
+            "job_id": job_id,
+            "type": job.type,
+            "format": job.format,
+            "params": {name: str(value) for name, value in query_args.items()},
+            "status": JOB_QUEUED,
+            "rows_done": 0,
+            "rows_total": None,
+            "artifact": None,
+            "error": None,
+            "created_at": time.time(),
+        }
+        _write_status(company_id, status)
+        _submitted += 1
+    _job_executor.submit(_run_job, company_id, job_id, job.type, job.format, query_args)
+    return status
+
+def _counted(rows, status: dict, company_id: int):
+    """
+    Passes the rows through, recording progress in the job's status every REPORT_JOB_PROGRESS_ROWS rows.
+    """
+    for count, row in enumerate(rows, start=1):
+        if count % REPORT_JOB_PROGRESS_ROWS == 0:
+            status["rows_done"] = count
+            _write_status(company_id, status)
+        yield row
+        status["rows_done"] = count
+
+def _render(report: ReportType, format: str, query_args: dict, rows, output_path: str):
+    if format == "csv":
+        with open(output_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(report.csv_header)
+            writer.writerows(rows)
+    else:
+        pdf_args = (query_args["start_date"], query_args["end_date"]) if "start_date" in query_args else ()
+        with open(output_path, "wb") as f:
+            report.generate_pdf(rows, *pdf_args, output=f)
+
+def _run_job(company_id: int, job_id: str, report_type: str, format: str, query_args: dict):
+    report = REPORT_TYPES[report_type]
+    status = get_job(company_id, job_id)
+    path = artifact_path(company_id, job_id, format)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    db = SessionLocal()
+    try:
+        # The rows are read once, off a server-side cursor; the total is only known (and recorded) when they run out.
+        status.update(status=JOB_RUNNING)
+        _write_status(company_id, status)
+        _render(report, format, query_args, _counted(report.rows_query(db, company_id=company_id, **query_args), status, company_id), tmp_path)
+        os.replace(tmp_path, path)
+        status.update(status=JOB_READY, artifact=path, rows_total=status["rows_done"], finished_at=time.time())
+    except Exception as e:
+        logger.exception("Report job %s failed", job_id)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        status.update(status=JOB_FAILED, error=str(e), finished_at=time.time())
+    finally:
+        db.close()
+    _write_status(company_id, status)
+
+metrics.register("report_jobs", lambda: {"workers": REPORT_JOB_WORKERS, "submitted": _submitted, "reused": _reused})
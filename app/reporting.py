@@ -1,69 +1,232 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from typing import NamedTuple, Optional
+import hashlib
 import io
 import csv
-from fastapi.responses import StreamingResponse
-
-from app import crud
+import os
+import tempfile
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app import async_crud, columnar, crud, data_version, metrics
+from app.database import SessionLocal
+from app.utils.cache import LRUCache
 from app.utils.pdf_generator import generate_sales_report_pdf, generate_low_stock_report_pdf, generate_top_selling_report_pdf, generate_total_revenue_report_pdf
 
-def get_sales_report(db: Session, start_date: datetime, end_date: datetime, company_id: int, format: str = "json"):
-    sales = crud.get_sales_by_date(db, start_date=start_date, end_date=end_date, company_id=company_id)
-    if format == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["order_id", "customer_id", "total_price", "date"])
-        for sale in sales:
-            writer.writerow([sale.id, sale.customer_id, sale.total_price, sale.date])
-        return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=sales_report.csv"})
-    elif format == "pdf":
-        pdf_buffer = generate_sales_report_pdf(sales, start_date, end_date)
-        return StreamingResponse(iter([pdf_buffer.getvalue()]), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=sales_report.pdf"})
-    return sales
-
-def get_low_stock_report(db: Session, company_id: int, limit: int, format: str = "json"):
-    products = crud.get_low_stock_products(db, company_id=company_id, limit=limit)
-    if format == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["product_id", "name", "stock"])
-        for product in products:
-            writer.writerow([product.id, product.name, product.stock])
-        return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=low_stock_report.csv"})
-    elif format == "pdf":
-        pdf_buffer = generate_low_stock_report_pdf(products)
-        return StreamingResponse(iter([pdf_buffer.getvalue()]), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=low_stock_report.pdf"})
-    return products
-
-def get_top_selling_report(db: Session, company_id: int, limit: int, format: str = "json"):
-
-    products = crud.get_top_selling_products(db, company_id=company_id, limit=limit)
-
-    if format == "csv":
-
-        output = io.StringIO()
-
-        writer = csv.writer(output)
-
-        writer.writerow(["product_id", "name", "total_quantity"])
-
-        for product, total_quantity in products:
+CSV_CHUNK_ROWS = 1000
+PDF_STREAM_CHUNK_SIZE = 64 * 1024
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "1024"))
+REPORT_CACHE_BYTES = int(os.getenv("REPORT_CACHE_BYTES", str(64 * 1024 * 1024)))
+# Larger reports are streamed from a temporary file and only their ETag is cached.
+REPORT_CACHE_MAX_ENTRY_BYTES = int(os.getenv("REPORT_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
 
-            writer.writerow([product.id, product.name, total_quantity])
+MEDIA_TYPES = {"json": "application/json", "csv": "text/csv", "pdf": "application/pdf"}
 
-        return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=top_selling_report.csv"})
 
-    elif format == "pdf":
+class CachedReport(NamedTuple):
+    body: Optional[bytes]  # None for reports too large to keep in memory
+    etag: str
+    media_type: str
 
-        pdf_buffer = generate_top_selling_report_pdf(products)
 
-        return StreamingResponse(iter([pdf_buffer.getvalue()]), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=top_selling_report.pdf"})
+# Rendered reports keyed by (company, report, params, format, data version): a write to the company's
+# data bumps its version, so stale entries are never looked up again and age out of the LRU.
+_report_cache = LRUCache(maxsize=REPORT_CACHE_SIZE, maxbytes=REPORT_CACHE_BYTES, sizeof=lambda report: len(report.body or b""))
+_not_modified = 0
 
-    return [{"product": product, "total_quantity": total_quantity} for product, total_quantity in products]
-
-def get_total_revenue_report(db: Session, company_id: int, format: str = "json"):
-    total_revenue = crud.get_total_revenue(db, company_id=company_id)
+def _stream_csv(header: list, rows_query, *args, **kwargs):
+    """
+    Yields the CSV encoded in chunks of CSV_CHUNK_ROWS rows, so memory stays flat however many rows the query returns.
+    The query runs on the generator's own session because the body is produced after the request's session is closed.
+    """
+    db = SessionLocal()
+    try:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        for count, row in enumerate(rows_query(db, *args, **kwargs), start=1):
+            writer.writerow(row)
+            if count % CSV_CHUNK_ROWS == 0:
+                yield output.getvalue().encode()
+                output.seek(0)
+                output.truncate(0)
+        yield output.getvalue().encode()
+    finally:
+        db.close()
+
+def _csv_response(filename: str, header: list, rows_query, *args, **kwargs) -> StreamingResponse:
+    return StreamingResponse(_stream_csv(header, rows_query, *args, **kwargs), media_type="text/csv", headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+def render_pdf(generate_pdf, rows_query, query_args: dict, *args, output=None):
+    """
+    Renders a tabular report PDF from rows streamed off a server-side cursor, on a session of its own
+    so it can run in a worker thread. Returns the (temporary, unless `output` is given) file.
+    """
+    db = SessionLocal()
+    try:
+        return generate_pdf(rows_query(db, **query_args), *args, output=output)
+    finally:
+        db.close()
+
+def _stream_file(file):
+    try:
+        while chunk := file.read(PDF_STREAM_CHUNK_SIZE):
+            yield chunk
+    finally:
+        file.close()
+
+def _pdf_file_response(filename: str, pdf_file) -> StreamingResponse:
+    return StreamingResponse(_stream_file(pdf_file), media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+def render_export(export: str, format: str, query_args: dict, output=None):
+    """
+    Writes a columnar export (see app.columnar) from rows streamed off a server-side cursor, on a session of
+    its own, into `output` or a temporary file. Returns the file, rewound.
+    """
+    if output is None:
+        output = tempfile.TemporaryFile()
+    db = SessionLocal()
+    try:
+        columnar.write_export(columnar.EXPORTS[export].rows_query(db, **query_args), columnar.EXPORTS[export].schema, format, output)
+    finally:
+        db.close()
+    output.seek(0)
+    return output
+
+def _export_file_response(filename: str, format: str, export_file) -> StreamingResponse:
+    media_type, extension = columnar.FORMATS[format]
+    return StreamingResponse(_stream_file(export_file), media_type=media_type, headers={"Content-Disposition": f"attachment; filename={filename}.{extension}"})
+
+# Reports for the async routes: queries run on the AsyncSession, PDFs and CSV files render in the threadpool.
+
+async def _pdf_response(filename: str, generate_pdf, *args) -> StreamingResponse:
+    return _pdf_file_response(filename, await run_in_threadpool(generate_pdf, *args))
+
+def _csv_file(header: list, rows_query, **kwargs):
+    """
+    Writes the CSV into a temporary file and returns it, rewound.
+    """
+    output = tempfile.TemporaryFile()
+    for chunk in _stream_csv(header, rows_query, **kwargs):
+        output.write(chunk)
+    output.seek(0)
+    return output
+
+def _json_file(content):
+    return io.BytesIO(JSONResponse(jsonable_encoder(content)).body)
+
+def _read_report(report_file, format: str) -> CachedReport:
+    """
+    Hashes the rendered report for its ETag and reads it into memory if it is small enough to cache.
+    Returns the report with body None (leaving the file rewound) otherwise.
+    """
+    digest = hashlib.sha256()
+    while chunk := report_file.read(PDF_STREAM_CHUNK_SIZE):
+        digest.update(chunk)
+    size = report_file.tell()
+    report_file.seek(0)
+    body = report_file.read() if size <= REPORT_CACHE_MAX_ENTRY_BYTES else None
+    report_file.seek(0)
+    return CachedReport(body, f'"{digest.hexdigest()[:32]}"', MEDIA_TYPES[format])
+
+async def _cached_report(company_id: int, report: str, params: dict, format: str, render, if_none_match: str = None) -> Response:
+    """
+    Serves a report from the report cache, calling `render` (which returns the rendered file) on a miss. Responses
+    carry a strong ETag, the hash of the body, and a request whose If-None-Match has it gets a 304 instead.
+    Reports over REPORT_CACHE_MAX_ENTRY_BYTES are streamed from the file, and only their ETag is cached.
+    """
+    global _not_modified
+    format = format if format in MEDIA_TYPES else "json"
+    version = await data_version.get_async(company_id)
+    key = (company_id, report, tuple(sorted(params.items())), format, version)
+    cached = _report_cache.get(key) if version is not None else None
+    headers = {"Cache-Control": "private, no-cache"}
+    if cached is not None and if_none_match and cached.etag in if_none_match:
+        _not_modified += 1
+        return Response(status_code=304, headers=dict(headers, ETag=cached.etag))
+
+    report_file = None
+    if cached is None or cached.body is None:
+        report_file = await render()
+        cached = await run_in_threadpool(_read_report, report_file, format)
+        if cached.body is not None:
+            report_file.close()
+        if version is not None:
+            _report_cache.set(key, cached)
+
+    headers["ETag"] = cached.etag
+    if if_none_match and cached.etag in if_none_match:
+        _not_modified += 1
+        if report_file is not None:
+            report_file.close()
+        return Response(status_code=304, headers=headers)
+    if format != "json":
+        headers["Content-Disposition"] = f"attachment; filename={report}_report.{format}"
+    if cached.body is None:
+        return StreamingResponse(_stream_file(report_file), media_type=cached.media_type, headers=headers)
+    return Response(cached.body, media_type=cached.media_type, headers=headers)
+
+async def get_sales_report_async(db: AsyncSession, start_date: datetime, end_date: datetime, company_id: int, format: str = "json"):
+    if format == "csv":
+        return _csv_response("sales_report.csv", ["order_id", "customer_id", "total_price", "date"], crud.iter_sales_rows, start_date=start_date, end_date=end_date, company_id=company_id)
     if format == "pdf":
-        pdf_buffer = generate_total_revenue_report_pdf(total_revenue)
-        return StreamingResponse(iter([pdf_buffer.getvalue()]), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=total_revenue_report.pdf"})
-    return {"total_revenue": total_revenue or 0}
+        return await _pdf_response("sales_report.pdf", render_pdf, generate_sales_report_pdf, crud.iter_sales_rows, dict(start_date=start_date, end_date=end_date, company_id=company_id), start_date, end_date)
+    if format in columnar.FORMATS:
+        return _export_file_response("sales_report", format, await run_in_threadpool(render_export, "sales", format, dict(start_date=start_date, end_date=end_date, company_id=company_id)))
+    return await async_crud.get_sales_by_date(db, start_date=start_date, end_date=end_date, company_id=company_id)
+
+async def get_order_items_export_async(start_date: datetime, end_date: datetime, company_id: int, format: str = "parquet"):
+    """
+    The order-item fact table (one row per order line) for orders in [start_date, end_date], as Parquet, Arrow or CSV.
+    """
+    if format == "csv":
+        return _csv_response("order_items.csv", [field.name for field in columnar.EXPORTS["order_items"].schema], crud.iter_order_item_rows, start_date=start_date, end_date=end_date, company_id=company_id)
+    return _export_file_response("order_items", format, await run_in_threadpool(render_export, "order_items", format, dict(start_date=start_date, end_date=end_date, company_id=company_id)))
+
+async def get_daily_sales_report_async(db: AsyncSession, start_date: datetime, end_date: datetime, company_id: int, format: str = "json"):
+    days = await async_crud.get_daily_sales(db, start_date=start_date, end_date=end_date, company_id=company_id)
+    if format == "csv":
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["day", "quantity", "revenue"])
+        for day in days:
+            writer.writerow([day.day, day.quantity, day.revenue])
+        return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=daily_sales_report.csv"})
+    return [{"day": str(day.day), "quantity": day.quantity, "revenue": day.revenue} for day in days]
+
+async def get_low_stock_report_async(db: AsyncSession, company_id: int, limit: int, format: str = "json", if_none_match: str = None):
+    async def render():
+        if format == "csv":
+            return await run_in_threadpool(_csv_file, ["product_id", "name", "stock"], crud.iter_low_stock_rows, company_id=company_id, limit=limit)
+        if format == "pdf":
+            return await run_in_threadpool(render_pdf, generate_low_stock_report_pdf, crud.iter_low_stock_rows, dict(company_id=company_id, limit=limit))
+        return _json_file(await async_crud.get_low_stock_products(db, company_id=company_id, limit=limit))
+
+    return await _cached_report(company_id, "low_stock", dict(limit=limit), format, render, if_none_match)
+
+async def get_top_selling_report_async(db: AsyncSession, company_id: int, limit: int, format: str = "json", if_none_match: str = None):
+    async def render():
+        if format == "csv":
+            return await run_in_threadpool(_csv_file, ["product_id", "name", "total_quantity"], crud.iter_top_selling_rows, company_id=company_id, limit=limit)
+        if format == "pdf":
+            return await run_in_threadpool(render_pdf, generate_top_selling_report_pdf, crud.iter_top_selling_rows, dict(company_id=company_id, limit=limit))
+        products = await async_crud.get_top_selling_products(db, company_id=company_id, limit=limit)
+        return _json_file([{"product": product, "total_quantity": total_quantity} for product, total_quantity in products])
+
+    return await _cached_report(company_id, "top_selling", dict(limit=limit), format, render, if_none_match)
+
+async def get_total_revenue_report_async(db: AsyncSession, company_id: int, format: str = "json", if_none_match: str = None):
+    format = "pdf" if format == "pdf" else "json"
+
+    async def render():
+        total_revenue = await async_crud.get_total_revenue(db, company_id=company_id)
+        if format == "pdf":
+            return await run_in_threadpool(generate_total_revenue_report_pdf, total_revenue or 0)
+        return _json_file({"total_revenue": total_revenue or 0})
+
+    return await _cached_report(company_id, "total_revenue", {}, format, render, if_none_match)
+
+metrics.register("report_cache", lambda: dict(_report_cache.stats(), not_modified=_not_modified))
@@ -0,0 +1,80 @@
+"""
+Maintenance for the daily_product_sales rollup.
+
+Rebuild it from order history with:
+
+    python -m app.rollups rebuild [--company-id ID]
+"""
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+import argparse
+
+from app import data_version, models
+from app.database import SessionLocal
+
+
+def daily_product_sales_select(company_id: int = None):
+    """
+    The rollup rows as an aggregate over orders and order_items.
+    """
+    day = func.date(models.Order.date)
+    query = (
+        select(
+            models.Order.company_id,
+            models.OrderItem.product_id,
+            day,
+            func.sum(models.OrderItem.quantity),
+            func.sum(models.OrderItem.quantity * models.OrderItem.price),
+            func.count(func.distinct(models.OrderItem.order_id)),
+            func.count(models.OrderItem.id),
+        )
+        .join(models.OrderItem, models.OrderItem.order_id == models.Order.id)
+        .group_by(models.Order.company_id, models.OrderItem.product_id, day)
+    )
+    if company_id is not None:
+        query = query.where(models.Order.company_id == company_id)
+    return query
+
+
+def rebuild_daily_product_sales(db: Session, company_id: int = None) -> int:
+    """
+    Recomputes the rollup (for one company, or all of them) in a single transaction and returns the number of rows written.
+    """
+    rollup = models.DailyProductSales
+    if db.get_bind().dialect.name == "postgresql":
+        # Readers keep working; order transactions wait and apply their own increments after the rebuild commits.
+        db.execute(text("LOCK TABLE daily_product_sales IN EXCLUSIVE MODE"))
+    clear = delete(rollup)
+    if company_id is not None:
+        clear = clear.where(rollup.company_id == company_id)
+    db.execute(clear)
+    result = db.execute(insert(rollup).from_select(
+        ["company_id", "product_id", "day", "quantity", "revenue", "order_count", "line_count"],
+        daily_product_sales_select(company_id),
+    ))
+    db.commit()
+    # Reports read the rollup, so whatever was cached from the old rows is stale now.
+    if company_id is not None:
+        data_version.bump(company_id)
+    else:
+        data_version.bump_all()
+    return result.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the daily_product_sales rollup.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Rebuild the rollup from order history.")
+    rebuild.add_argument("--company-id", type=int, default=None, help="Only rebuild this company's rows.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = rebuild_daily_product_sales(db, company_id=args.company_id)
+        print(f"Rebuilt daily_product_sales: {count} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
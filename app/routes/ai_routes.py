@@ -1,28 +1,66 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from app import crud, models, ai
+from app import crud, schemas, ai
 from app.database import get_db
-from app.auth import get_current_active_user
+from app.auth import Principal, get_current_active_user
 
 router = APIRouter()
 
 @router.get("/predict-stock/{product_id}")
 async def predict_stock(
     product_id: int,
+    refresh: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     """
     Predicts the stock needed for a product for the next month based on historical sales data.
+    The forecast is reused until the product sells again; pass refresh=true to recompute it anyway.
     """
-    sales_history = crud.get_product_sales_history(db, product_id=product_id, company_id=current_user.company_id)
-    if not sales_history:
+    company_id = current_user.company_id
+    version = await run_in_threadpool(crud.get_product_sales_version, db, product_id=product_id, company_id=company_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="No sales history found for this product.")
 
-    predicted_stock = await ai.train_and_predict_stock_via_mcp(
-        product_id=product_id,
-        company_id=current_user.company_id,
-        sales_data=[{"date": str(s.date), "quantity": s.quantity} for s in sales_history]
-    )
+    predicted_stock = None if refresh else ai.get_cached_forecast("single", company_id, product_id, version)
+    if predicted_stock is None:
+        sales_history = await run_in_threadpool(crud.get_product_sales_history, db, product_id=product_id, company_id=company_id)
+        predicted_stock = await ai.train_and_predict_stock_via_mcp(
+            product_id=product_id,
+            company_id=company_id,
+            sales_data=[{"date": str(s.date), "quantity": s.quantity} for s in sales_history]
+        )
+        ai.cache_forecast("single", company_id, product_id, version, predicted_stock)
     return {"product_id": product_id, "predicted_stock_next_month": predicted_stock}
+
+@router.post("/predict-stock/batch")
+async def predict_stock_batch(
+    request: schemas.StockForecastBatchRequest,
+    refresh: bool = False,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+):
+    """
+    Predicts next month's stock needs for many products (the whole catalog if product_ids is omitted) in one pass.
+    Only products that sold since their cached forecast are recomputed, unless refresh=true.
+    """
+    company_id = current_user.company_id
+    versions = await run_in_threadpool(crud.get_product_sales_versions, db, company_id=company_id, product_ids=request.product_ids)
+
+    predicted = {}
+    if not refresh:
+        for product_id, version in versions.items():
+            cached = ai.get_cached_forecast("batch", company_id, product_id, version)
+            if cached is not None:
+                predicted[product_id] = cached
+
+    stale = [product_id for product_id in versions if product_id not in predicted]
+    if stale:
+        for forecast in await ai.predict_stock_batch_via_mcp(company_id=company_id, product_ids=stale):
+            product_id = forecast["product_id"]
+            predicted[product_id] = forecast["predicted_stock_next_month"]
+            ai.cache_forecast("batch", company_id, product_id, versions[product_id], predicted[product_id])
+
+    return {"forecasts": [{"product_id": product_id, "predicted_stock_next_month": predicted[product_id]} for product_id in sorted(versions)]}
@@ -1,60 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app import crud, models, schemas
-from app.database import get_db
-from app.auth import get_current_active_user
+from app import async_crud, crud, schemas
+from app.database import get_async_db
+from app.utils import pagination
+from app.auth import Principal, get_current_active_user
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Customer)
-def create_customer(
+async def create_customer(
     customer: schemas.CustomerCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return crud.create_customer(db=db, customer=customer, company_id=current_user.company_id)
+    return await async_crud.create_customer(db=db, customer=customer, company_id=current_user.company_id)
 
 @router.get("/", response_model=List[schemas.Customer])
-def read_customers(
+async def read_customers(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return crud.get_customers(db, company_id=current_user.company_id, skip=skip, limit=limit)
+    """
+    Lists customers. Pass the X-Next-Cursor header of a response as `cursor` to fetch the next page; `skip` is kept for backward compatibility.
+    """
+    customers = await async_crud.get_customers(db, company_id=current_user.company_id, skip=skip, limit=limit, cursor=cursor)
+    next_cursor = pagination.next_cursor(customers, limit, crud.CUSTOMER_KEYSET)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return customers
 
 @router.get("/{customer_id}", response_model=schemas.Customer)
-def read_customer(
+async def read_customer(
     customer_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_customer = crud.get_customer(db, customer_id=customer_id, company_id=current_user.company_id)
+    db_customer = await async_crud.get_customer(db, customer_id=customer_id, company_id=current_user.company_id)
     if db_customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     return db_customer
 
 @router.put("/{customer_id}", response_model=schemas.Customer)
-def update_customer(
+async def update_customer(
     customer_id: int,
     customer: schemas.CustomerUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_customer = crud.update_customer(db, customer_id=customer_id, customer=customer, company_id=current_user.company_id)
+    db_customer = await async_crud.update_customer(db, customer_id=customer_id, customer=customer, company_id=current_user.company_id)
     if db_customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     return db_customer
 
 @router.delete("/{customer_id}", response_model=schemas.Customer)
-def delete_customer(
+async def delete_customer(
     customer_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_customer = crud.delete_customer(db, customer_id=customer_id, company_id=current_user.company_id)
+    db_customer = await async_crud.delete_customer(db, customer_id=customer_id, company_id=current_user.company_id)
     if db_customer is None:
         raise HTTPException(status_code=404, detail="Customer not found")
     return db_customer
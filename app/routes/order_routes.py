@@ -1,46 +1,108 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import json
 
-from app import crud, models, schemas, billing
-from app.database import get_db
-from app.auth import get_current_active_user
+from app import async_crud, crud, schemas, billing
+from app.database import SessionLocal, get_db, get_async_db
+from app.utils import pagination
+from app.auth import Principal, get_current_active_user
 
 router = APIRouter()
 
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    A streaming response whose body is produced while the request body is still being read. It must not
+    listen for the client disconnecting, as that would consume the request body messages; the request
+    stream raises ClientDisconnect instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
 @router.post("/", response_model=schemas.Order)
 def create_order(
     order: schemas.OrderCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     return billing.create_order_and_invoice(db, order=order, user_id=current_user.id, company_id=current_user.company_id)
 
+@router.post("/bulk")
+async def create_orders_bulk(
+    request: Request,
+    generate_invoices: bool = False,
+    current_user: Principal = Depends(get_current_active_user),
+):
+    """
+    Creates orders from an NDJSON request body (one OrderCreate object per line) and returns
+    one NDJSON result per input line, either {"line", "order_id"} or {"line", "error"}.
+    Results are streamed back as each chunk of lines is committed, while the rest of the body is still being read.
+    """
+    async def results():
+        # The body is produced after the endpoint returns, so it uses a session of its own.
+        db = SessionLocal()
+        try:
+            async for chunk in billing.aiter_ndjson_chunks(request.stream()):
+                for result in await run_in_threadpool(
+                    billing.create_orders_chunk, db, chunk, current_user.id, current_user.company_id, generate_invoices
+                ):
+                    yield json.dumps(result) + "\n"
+        finally:
+            db.close()
+
+    return _DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.get("/", response_model=List[schemas.Order])
-def read_orders(
+async def read_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return crud.get_orders(db, company_id=current_user.company_id, skip=skip, limit=limit)
+    """
+    Lists orders. Pass the X-Next-Cursor header of a response as `cursor` to fetch the next page; `skip` is kept for backward compatibility.
+    """
+    orders = await async_crud.get_orders(db, company_id=current_user.company_id, skip=skip, limit=limit, cursor=cursor)
+    next_cursor = pagination.next_cursor(orders, limit, crud.ORDER_KEYSET)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return orders
 
 @router.get("/{order_id}", response_model=schemas.Order)
-def read_order(
+async def read_order(
     order_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_order = crud.get_order(db, order_id=order_id, company_id=current_user.company_id)
+    db_order = await async_crud.get_order(db, order_id=order_id, company_id=current_user.company_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     return db_order
 
+@router.get("/{order_id}/invoice")
+def read_order_invoice(
+    order_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+):
+    invoice_path = billing.get_invoice_path(db, order_id=order_id, company_id=current_user.company_id)
+    if invoice_path is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return FileResponse(invoice_path, media_type="application/pdf", filename=f"invoice_{order_id}.pdf")
+
 @router.delete("/{order_id}", response_model=schemas.Order)
 def delete_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     db_order = crud.delete_order(db, order_id=order_id, company_id=current_user.company_id)
     if db_order is None:
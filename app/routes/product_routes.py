@@ -1,63 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List, Optional
-
-from app import crud, models, schemas, ocr
-from app.database import get_db
-from app.auth import get_current_active_user
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 import os
 
-router = APIRouter()
+from app import async_crud, crud, data_version, images, schemas, ocr, storage
+from app.database import get_async_db
+from app.utils import pagination
+from app.auth import Principal, get_current_active_user
 
-UPLOADS_DIR = "uploads"
+router = APIRouter()
 
 @router.post("/", response_model=schemas.Product)
-def create_product(
+async def create_product(
     product: schemas.ProductCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return crud.create_product(db=db, product=product, company_id=current_user.company_id)
+    return await async_crud.create_product(db=db, product=product, company_id=current_user.company_id)
 
 @router.get("/", response_model=List[schemas.Product])
-def read_products(
+async def read_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return crud.get_products(db, company_id=current_user.company_id, skip=skip, limit=limit)
+    """
+    Lists products. Pass the X-Next-Cursor header of a response as `cursor` to fetch the next page; `skip` is kept for backward compatibility.
+    """
+    products = await async_crud.get_products(db, company_id=current_user.company_id, skip=skip, limit=limit, cursor=cursor)
+    next_cursor = pagination.next_cursor(products, limit, crud.PRODUCT_KEYSET)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return products
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def read_product(
+async def read_product(
     product_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_product = crud.get_product(db, product_id=product_id, company_id=current_user.company_id)
+    db_product = await async_crud.get_product(db, product_id=product_id, company_id=current_user.company_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return db_product
 
 @router.put("/{product_id}", response_model=schemas.Product)
-def update_product(
+async def update_product(
     product_id: int,
     product: schemas.ProductUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_product = crud.update_product(db, product_id=product_id, product=product, company_id=current_user.company_id)
+    db_product = await async_crud.update_product(db, product_id=product_id, product=product, company_id=current_user.company_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return db_product
 
 @router.delete("/{product_id}", response_model=schemas.Product)
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_product = crud.delete_product(db, product_id=product_id, company_id=current_user.company_id)
+    db_product = await async_crud.delete_product(db, product_id=product_id, company_id=current_user.company_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return db_product
@@ -67,29 +76,55 @@ async def upload_product_image(
     product_id: int,
     file: UploadFile = File(...),
     extract_text: bool = False,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    db_product = crud.get_product(db, product_id=product_id, company_id=current_user.company_id)
+    db_product = await async_crud.get_product(db, product_id=product_id, company_id=current_user.company_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    image_dir = os.path.join(UPLOADS_DIR, "products", str(current_user.company_id))
-    os.makedirs(image_dir, exist_ok=True)
-    
-    file_path = os.path.join(image_dir, f"{product_id}_{file.filename}")
-    
-    image_bytes = await file.read()
-    with open(file_path, "wb") as buffer:
-        buffer.write(image_bytes)
+    try:
+        blob = await storage.save_upload(file)
+    except storage.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    db_product.image = file_path
-    db.commit()
-    db.refresh(db_product)
+    db_product.image = blob.path
+    await db.commit()
+    await data_version.bump_async(current_user.company_id)
+    images.enqueue_variants(blob.path)
 
-    response = {"info": f"file '{file.filename}' saved at '{file_path}'"}
+    response = {"info": f"file '{file.filename}' saved at '{blob.path}'"}
     if extract_text:
-        text = ocr.extract_text_from_image(image_bytes)
+        text = await ocr.extract_text_async(blob.path, digest=blob.digest)
         response["extracted_text"] = text
 
     return response
+
+@router.get("/{product_id}/image")
+async def read_product_image(
+    product_id: int,
+    request: Request,
+    size: Literal["thumb", "medium", "full"] = "full",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
+):
+    """
+    Serves the product's image: `thumb` and `medium` are resized WebP (or JPEG) variants, `full` is the original.
+    Supports If-None-Match (304) and Range requests.
+    """
+    db_product = await async_crud.get_product(db, product_id=product_id, company_id=current_user.company_id)
+    if db_product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if not db_product.image or not os.path.exists(db_product.image):
+        raise HTTPException(status_code=404, detail="Product has no image")
+
+    etag = images.etag(db_product.image, size)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path = await images.get_variant(db_product.image, size)
+    except OSError:
+        raise HTTPException(status_code=415, detail="Product image is not a readable image")
+    return FileResponse(path, media_type=images.media_type(db_product.image, size), headers=headers)
@@ -1,81 +1,146 @@
-from fastapi import APIRouter, Depends, Response
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
-from app import reporting, models
-from app.database import get_db
-from app.auth import get_current_active_user
+from app import report_jobs, reporting, schemas
+from app.database import get_async_db
+from app.auth import Principal, get_current_active_user
 
 router = APIRouter()
 
 @router.get("/sales")
-def get_sales_report(
+async def get_sales_report(
     start_date: datetime,
     end_date: datetime,
     format: Optional[str] = "json",
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return reporting.get_sales_report(db, start_date=start_date, end_date=end_date, company_id=current_user.company_id, format=format)
+    return await reporting.get_sales_report_async(db, start_date=start_date, end_date=end_date, company_id=current_user.company_id, format=format)
 
 @router.get("/sales/pdf")
-def get_sales_report_pdf(
+async def get_sales_report_pdf(
     start_date: datetime,
     end_date: datetime,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    pdf_content = reporting.get_sales_report(db, start_date=start_date, end_date=end_date, company_id=current_user.company_id, format="pdf")
-    return Response(content=pdf_content, media_type="application/pdf")
+    return await reporting.get_sales_report_async(db, start_date=start_date, end_date=end_date, company_id=current_user.company_id, format="pdf")
+
+@router.get("/order-items")
+async def get_order_items_export(
+    start_date: datetime,
+    end_date: datetime,
+    format: Literal["parquet", "arrow", "csv"] = "parquet",
+    current_user: Principal = Depends(get_current_active_user),
+):
+    """
+    Exports every order line in [start_date, end_date] with typed columns (Parquet or Arrow IPC, compressed), for analytics.
+    """
+    return await reporting.get_order_items_export_async(start_date=start_date, end_date=end_date, company_id=current_user.company_id, format=format)
+
+@router.get("/sales/daily")
+async def get_daily_sales_report(
+    start_date: datetime,
+    end_date: datetime,
+    format: Optional[str] = "json",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
+):
+    """
+    Per-day quantity and revenue for orders in [start_date, end_date). Ranges on whole days
+    (midnight to midnight) are served from the daily sales rollup.
+    """
+    return await reporting.get_daily_sales_report_async(db, start_date=start_date, end_date=end_date, company_id=current_user.company_id, format=format)
 
 @router.get("/low-stock")
-def get_low_stock_report(
+async def get_low_stock_report(
+    request: Request,
     limit: int = 10,
     format: Optional[str] = "json",
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return reporting.get_low_stock_report(db, company_id=current_user.company_id, limit=limit, format=format)
+    return await reporting.get_low_stock_report_async(db, company_id=current_user.company_id, limit=limit, format=format, if_none_match=request.headers.get("if-none-match"))
 
 @router.get("/low-stock/pdf")
-def get_low_stock_report_pdf(
+async def get_low_stock_report_pdf(
+    request: Request,
     limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    pdf_content = reporting.get_low_stock_report(db, company_id=current_user.company_id, limit=limit, format="pdf")
-    return Response(content=pdf_content, media_type="application/pdf")
+    return await reporting.get_low_stock_report_async(db, company_id=current_user.company_id, limit=limit, format="pdf", if_none_match=request.headers.get("if-none-match"))
 
 @router.get("/top-selling")
-def get_top_selling_report(
+async def get_top_selling_report(
+    request: Request,
     limit: int = 10,
     format: Optional[str] = "json",
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return reporting.get_top_selling_report(db, company_id=current_user.company_id, limit=limit, format=format)
+    return await reporting.get_top_selling_report_async(db, company_id=current_user.company_id, limit=limit, format=format, if_none_match=request.headers.get("if-none-match"))
 
 @router.get("/top-selling/pdf")
-def get_top_selling_report_pdf(
+async def get_top_selling_report_pdf(
+    request: Request,
     limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    pdf_content = reporting.get_top_selling_report(db, company_id=current_user.company_id, limit=limit, format="pdf")
-    return Response(content=pdf_content, media_type="application/pdf")
+    return await reporting.get_top_selling_report_async(db, company_id=current_user.company_id, limit=limit, format="pdf", if_none_match=request.headers.get("if-none-match"))
 
 @router.get("/total-revenue")
-def get_total_revenue_report(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+async def get_total_revenue_report(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return reporting.get_total_revenue_report(db, company_id=current_user.company_id)
+    return await reporting.get_total_revenue_report_async(db, company_id=current_user.company_id, if_none_match=request.headers.get("if-none-match"))
 
 @router.get("/total-revenue/pdf")
-def get_total_revenue_report_pdf(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user),
+async def get_total_revenue_report_pdf(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
+):
+    return await reporting.get_total_revenue_report_async(db, company_id=current_user.company_id, format="pdf", if_none_match=request.headers.get("if-none-match"))
+
+@router.post("/jobs", status_code=202)
+def create_report_job(
+    job: schemas.ReportJobCreate,
+    current_user: Principal = Depends(get_current_active_user),
+):
+    """
+    Renders a report in the background. Poll the returned job until its status is `ready`, then fetch it
+    from /reports/jobs/{job_id}/download. Submitting an identical report again returns the same job.
+    """
+    try:
+        return report_jobs.submit_job(current_user.company_id, job)
+    except report_jobs.InvalidReportJob as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/jobs/{job_id}")
+def read_report_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_active_user),
+):
+    status = report_jobs.get_job(current_user.company_id, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return status
+
+@router.get("/jobs/{job_id}/download")
+def download_report_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    pdf_content = reporting.get_total_revenue_report(db, company_id=current_user.company_id, format="pdf")
-    return Response(content=pdf_content, media_type="application/pdf")
+    status = report_jobs.get_job(current_user.company_id, job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    if status["status"] != report_jobs.JOB_READY:
+        raise HTTPException(status_code=409, detail=f"Report job is {status['status']}")
+    return FileResponse(status["artifact"], media_type=reporting.MEDIA_TYPES[status["format"]], filename=f"{status['type']}_report.{status['format']}")
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
+from typing import Optional
 from app import crud, models, schemas
 from app.database import get_db
+from app.utils import pagination
+from app.auth import Principal, get_current_active_user
 
 router = APIRouter()
 
@@ -13,8 +16,21 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return crud.create_user(db=db, user=user)
 
 @router.get("/users/", response_model=list[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
+def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+):
+    """
+    Lists the users of the caller's company. Pass the X-Next-Cursor header of a response as `cursor` to fetch the next page; `skip` is kept for backward compatibility.
+    """
+    users = crud.get_users(db, company_id=current_user.company_id, skip=skip, limit=limit, cursor=cursor)
+    next_cursor = pagination.next_cursor(users, limit, crud.USER_KEYSET)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return users
 
 @router.get("/users/{user_id}", response_model=schemas.User)
@@ -24,16 +40,26 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
-@router.put("/users/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+def _own_user(db: Session, user_id: int, current_user: Principal) -> models.User:
+    # Users are not shared between companies, and there are no admin accounts: a user may only change or delete themself.
+    db_user = crud.get_company_user(db, user_id=user_id, company_id=current_user.company_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    if db_user.id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not allowed to modify this user")
+    return db_user
+
+@router.put("/users/{user_id}", response_model=schemas.User)
+def update_user(
+    user_id: int,
+    user: schemas.UserUpdate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+):
+    _own_user(db, user_id, current_user)
     return crud.update_user(db=db, user_id=user_id, user=user)
 
 @router.delete("/users/{user_id}", response_model=schemas.User)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
-    if db_user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+def delete_user(user_id: int, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+    _own_user(db, user_id, current_user)
     return crud.delete_user(db=db, user_id=user_id)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class CompanyBase(BaseModel):
@@ -108,12 +108,17 @@ class Order(OrderBase):
     date: datetime
     company_id: int
     pdf_invoice_path: Optional[str] = None
+    invoice_status: Optional[str] = None
     items: List[OrderItem] = []
     model_config = {
         "from_attributes": True
     }
 
 
+class StockForecastBatchRequest(BaseModel):
+    product_ids: Optional[List[int]] = None
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -121,3 +126,12 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
     company_id: Optional[int] = None
+    exp: Optional[int] = None
+
+
+class ReportJobCreate(BaseModel):
+    type: Literal["sales", "low_stock", "top_selling"]
+    format: Literal["csv", "pdf"] = "csv"
+    start_date: Optional[datetime] = None  # sales
+    end_date: Optional[datetime] = None  # sales
+    limit: int = 10  # low_stock, top_selling
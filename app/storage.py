@@ -0,0 +1,144 @@
+"""
+Content-addressed storage for uploaded files.
+
+Blobs are stored once under uploads/blobs/<first two hex digits>/<sha256><ext>, however many products
+(or tenants) use the same image. Uploads are streamed to a temporary file in fixed-size chunks while
+being hashed, so memory per upload stays constant, and then moved into place atomically.
+"""
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from typing import NamedTuple
+import contextlib
+import hashlib
+import os
+import re
+import tempfile
+
+UPLOADS_DIR = "uploads"
+BLOBS_DIR = os.path.join(UPLOADS_DIR, "blobs")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# Allowance for the multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class StoredBlob(NamedTuple):
+    path: str
+    digest: str
+    size: int
+
+
+def _extension(filename: str) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if re.fullmatch(r"\.[a-z0-9]{1,10}", extension) else ""
+
+def blob_path(digest: str, extension: str = "") -> str:
+    return os.path.join(BLOBS_DIR, digest[:2], f"{digest}{extension}")
+
+def _open_temp_file():
+    os.makedirs(BLOBS_DIR, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=BLOBS_DIR, prefix=".upload-", delete=False)
+
+def _commit(temp_path: str, digest: str, extension: str) -> str:
+    path = blob_path(digest, extension)
+    if os.path.exists(path):
+        os.remove(temp_path)  # already stored
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+    return path
+
+async def save_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredBlob:
+    """
+    Streams an upload into the blob store in UPLOAD_CHUNK_SIZE chunks, hashing as it goes.
+    Raises UploadTooLarge as soon as more than max_bytes have been read.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    temp_file = await run_in_threadpool(_open_temp_file)
+    try:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            await run_in_threadpool(temp_file.write, chunk)
+        await run_in_threadpool(temp_file.close)
+        return StoredBlob(await run_in_threadpool(_commit, temp_file.name, digest.hexdigest(), _extension(upload.filename)), digest.hexdigest(), size)
+    except BaseException:
+        temp_file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_file.name)
+        raise
+
+def save_bytes(data: bytes, filename: str, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredBlob:
+    """
+    Stores content that is already in memory (e.g. an MCP tool argument) in the blob store.
+    """
+    if len(data) > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(digest, _extension(filename))
+    if not os.path.exists(path):
+        with _open_temp_file() as temp_file:
+            temp_file.write(data)
+        path = _commit(temp_file.name, digest, _extension(filename))
+    return StoredBlob(path, digest, len(data))
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects multipart uploads larger than max_bytes with 413 before the body is parsed: up front
+    from Content-Length when it is declared, otherwise as soon as the streamed body exceeds it.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/"):
+            return await self.app(scope, receive, send)
+
+        too_large = JSONResponse(status_code=413, content={"detail": f"Upload exceeds {MAX_UPLOAD_BYTES} bytes"})
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            return await too_large(scope, receive, send)
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            # Once the limit is hit, whatever the app answers (e.g. a form parsing error) is replaced by the 413.
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        if exceeded:
+            await too_large(scope, receive, send)
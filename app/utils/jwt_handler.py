@@ -1,26 +1,126 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import asyncio
+import os
+import threading
+import time
 
+from app import metrics
 from app.schemas import TokenData
 
 SECRET_KEY = "your-secret-key"  # Change this to a secure key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def _truncate_password(password: str) -> str:
+    # bcrypt has a maximum password length of 72 bytes.
+    # Truncate the password if it's longer than 72 bytes to avoid ValueError.
+    return password.encode('utf-8')[:72].decode('utf-8', 'ignore')
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context.verify(_truncate_password(plain_password), hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    # bcrypt has a maximum password length of 72 bytes.
-    # Truncate the password if it's longer than 72 bytes to avoid ValueError.
-    truncated_password = password.encode('utf-8')[:72].decode('utf-8', 'ignore')
-    return pwd_context.hash(truncated_password)
+    return pwd_context.hash(_truncate_password(password))
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Whether a stored hash uses a different bcrypt cost than BCRYPT_ROUNDS (or a deprecated scheme).
+    """
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != BCRYPT_ROUNDS or pwd_context.needs_update(hashed_password)
+
+
+class PasswordQueueFull(Exception):
+    """
+    Raised when more than PASSWORD_HASH_MAX_QUEUE password checks are already waiting.
+    """
+
+
+# bcrypt releases the GIL, so a dedicated pool sized to the cores runs checks in parallel
+# without tying up the threads that serve every other endpoint.
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_stats_lock = threading.Lock()
+_password_stats = {
+    "workers": PASSWORD_HASH_WORKERS,
+    "rounds": BCRYPT_ROUNDS,
+    "queued": 0,
+    "running": 0,
+    "completed": 0,
+    "rejected": 0,
+    "rehashed": 0,
+    "queue_wait_seconds_total": 0.0,
+    "queue_wait_seconds_max": 0.0,
+    "verify_seconds_total": 0.0,
+}
+
+
+def _verify_and_update(plain_password: str, hashed_password: str, submitted_at: float):
+    started_at = time.perf_counter()
+    wait = started_at - submitted_at
+    with _password_stats_lock:
+        _password_stats["queued"] -= 1
+        _password_stats["running"] += 1
+        _password_stats["queue_wait_seconds_total"] += wait
+        _password_stats["queue_wait_seconds_max"] = max(_password_stats["queue_wait_seconds_max"], wait)
+    new_hash = None
+    try:
+        valid = verify_password(plain_password, hashed_password)
+        if valid and needs_rehash(hashed_password):
+            new_hash = get_password_hash(plain_password)
+        return valid, new_hash
+    finally:
+        with _password_stats_lock:
+            _password_stats["running"] -= 1
+            _password_stats["completed"] += 1
+            _password_stats["rehashed"] += new_hash is not None
+            _password_stats["verify_seconds_total"] += time.perf_counter() - started_at
+
+
+def _dequeue_cancelled(future):
+    # A check cancelled while still queued (its request was cancelled) never runs, so it never leaves the queue itself.
+    if future.cancelled():
+        with _password_stats_lock:
+            _password_stats["queued"] -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    """
+    Verifies a password on the bcrypt executor. Returns (valid, new_hash), where new_hash is set
+    when the stored hash should be replaced because it was made with a different cost.
+    """
+    with _password_stats_lock:
+        if _password_stats["queued"] >= PASSWORD_HASH_MAX_QUEUE:
+            _password_stats["rejected"] += 1
+            raise PasswordQueueFull()
+        _password_stats["queued"] += 1
+    future = _password_executor.submit(_verify_and_update, plain_password, hashed_password, time.perf_counter())
+    future.add_done_callback(_dequeue_cancelled)
+    return await asyncio.wrap_future(future)
+
+
+def password_executor_stats() -> dict:
+    with _password_stats_lock:
+        return dict(_password_stats)
+
+
+metrics.register("password_executor", password_executor_stats)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -41,6 +141,6 @@ def decode_access_token(token: str) -> TokenData:
         company_id: int = payload.get("company_id")
         if username is None or company_id is None:
             return None
-        return TokenData(username=username, company_id=company_id)
+        return TokenData(username=username, company_id=company_id, exp=payload.get("exp"))
     except JWTError:
         return None
@@ -0,0 +1,99 @@
+from sqlalchemy import DateTime, func, literal, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from datetime import datetime
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values: list) -> str:
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_value(column, value):
+    """
+    Coerces a cursor value to the keyset column's type, so a tampered cursor is rejected instead of reaching the query.
+    """
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    python_type = column.type.python_type
+    if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, bool) or not isinstance(value, python_type):
+        raise TypeError(f"{column.key} cursor value must be {python_type.__name__}")
+    return value
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise InvalidCursor(cursor)
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+class _keyset_datetime(FunctionElement):
+    """
+    A DateTime keyset column or cursor value. SQLite stores datetimes as text, in one format for values
+    written by SQLAlchemy and another for CURRENT_TIMESTAMP defaults, so there both sides are compared
+    (and sorted) in one normalized format, to the millisecond; other databases compare the column itself.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(_keyset_datetime)
+def _compile_keyset_datetime(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(_keyset_datetime, "sqlite")
+def _compile_keyset_datetime_sqlite(element, compiler, **kw):
+    return compiler.process(func.strftime("%Y-%m-%d %H:%M:%f", *element.clauses), **kw)
+
+
+def _keyset_key(expression):
+    return _keyset_datetime(expression) if isinstance(expression.type, DateTime) else expression
+
+
+def keyset_page(query, columns, limit: int, skip: int = 0, cursor: str = None):
+    """
+    Restricts a Query or select() to one page ordered by the keyset columns. With a cursor, the page
+    starts right after the row the cursor was made from (an index seek, so deep pages cost the same as
+    the first); without one, skip is applied as a plain offset for backward compatibility.
+    """
+    keys = [_keyset_key(column) for column in columns]
+    query = query.order_by(*keys)
+    if cursor is not None:
+        values = [_keyset_key(literal(value, column.type)) for column, value in zip(columns, decode_cursor(cursor, columns))]
+        if len(columns) == 1:
+            query = query.filter(keys[0] > values[0])
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(*values))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def paginate(query, columns, limit: int, skip: int = 0, cursor: str = None):
+    """
+    Returns one page of the query, as restricted by keyset_page.
+    """
+    return keyset_page(query, columns, limit, skip=skip, cursor=cursor).all()
+
+
+def next_cursor(rows: list, limit: int, columns):
+    """
+    The cursor for the page after rows, or None when rows is the last page.
+    """
+    if not rows or len(rows) < limit:
+        return None
+    return encode_cursor([getattr(rows[-1], column.key) for column in columns])
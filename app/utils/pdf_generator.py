@@ -4,30 +4,46 @@ from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
+from itertools import chain, islice
 import io
+import os
+import tempfile
 from datetime import datetime
 
-from app import models
+# Rows per report table: about one letter page, so a table never has to be split and only one page of rows
+# is laid out at a time however long the report is.
+PDF_CHUNK_ROWS = int(os.getenv("PDF_CHUNK_ROWS", "25"))
 
-def generate_invoice_pdf(order: models.Order):
+# Report tables are laid out chunk by chunk, so their columns get fixed widths (fractions of the
+# frame width) instead of being sized from every row.
+FRAME_WIDTH = letter[0] - 2 * inch
+
+def generate_invoice_pdf(invoice: dict):
+    """
+    Renders an invoice from a snapshot (see crud.get_invoice_snapshot).
+    """
     buffer = io.BytesIO()
     c = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
 
+    # Letterhead, above the title
+    c.setFont("Helvetica", 12)
+    c.drawRightString(width - inch, height - 0.6 * inch, invoice["company_name"] or "")
+
     # Title
     c.setFont("Helvetica-Bold", 18)
-    c.drawString(inch, height - inch, f"Invoice for Order #{order.id}")
+    c.drawString(inch, height - inch, f"Invoice for Order #{invoice['order_id']}")
 
     # Customer Info
     c.setFont("Helvetica", 12)
     c.drawString(inch, height - 1.5 * inch, "Customer Information:")
-    c.drawString(1.2 * inch, height - 1.75 * inch, f"Name: {order.customer.name}")
-    c.drawString(1.2 * inch, height - 2.0 * inch, f"Contact: {order.customer.contact}")
+    c.drawString(1.2 * inch, height - 1.75 * inch, f"Name: {invoice['customer_name']}")
+    c.drawString(1.2 * inch, height - 2.0 * inch, f"Contact: {invoice['customer_contact']}")
 
     # Order Info
     c.drawString(inch, height - 2.5 * inch, "Order Details:")
-    c.drawString(1.2 * inch, height - 2.75 * inch, f"Order Date: {order.date.strftime('%Y-%m-%d %H:%M:%S')}")
-    c.drawString(1.2 * inch, height - 3.0 * inch, f"Total Price: ${order.total_price:.2f}")
+    c.drawString(1.2 * inch, height - 2.75 * inch, f"Order Date: {invoice['date'].strftime('%Y-%m-%d %H:%M:%S')}")
+    c.drawString(1.2 * inch, height - 3.0 * inch, f"Total Price: ${invoice['total_price']:.2f}")
 
     # Order Items
     c.drawString(inch, height - 3.5 * inch, "Order Items:")
@@ -38,10 +54,10 @@ def generate_invoice_pdf(order: models.Order):
     c.setFont("Helvetica", 10)
 
     y = height - 4.0 * inch
-    for item in order.items:
-        c.drawString(1.2 * inch, y, item.product.name)
-        c.drawString(3.5 * inch, y, str(item.quantity))
-        c.drawString(4.5 * inch, y, f"${item.price:.2f}")
+    for item in invoice["items"]:
+        c.drawString(1.2 * inch, y, item["product_name"])
+        c.drawString(3.5 * inch, y, str(item["quantity"]))
+        c.drawString(4.5 * inch, y, f"${item['price']:.2f}")
         y -= 0.25 * inch
 
     c.showPage()
@@ -51,75 +67,28 @@ def generate_invoice_pdf(order: models.Order):
     return buffer
 
 
-def generate_sales_report_pdf(sales_data: list, start_date: datetime, end_date: datetime):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
+class _FlowableStream(list):
+    """
+    A story that is filled from an iterator as the document template consumes it, so only the
+    flowables about to be laid out exist at any time. Two are kept buffered so keepWithNext still works.
+    """
 
-    # Title
-    title_text = f"Sales Report from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-    story.append(Paragraph(title_text, styles['h1']))
-    story.append(Paragraph(" ", styles['Normal'])) # Add some space
-
-    # Table Header
-    data = [["Order ID", "Customer ID", "Total Price", "Date"]]
-
-    # Table Data
-    for sale in sales_data:
-        data.append([
-            str(sale.id),
-            str(sale.customer_id),
-            f"${sale.total_price:.2f}",
-            sale.date.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')), # Green header
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f0f0')), # Lighter background for rows
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0,0), (-1,-1), 6),
-        ('RIGHTPADDING', (0,0), (-1,-1), 6),
-        ('TOPPADDING', (0,0), (-1,-1), 6),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-    ]))
-    story.append(table)
+    def __init__(self, flowables):
+        super().__init__()
+        self._pending = iter(flowables)
 
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+    def __len__(self):
+        while list.__len__(self) < 2:
+            flowable = next(self._pending, None)
+            if flowable is None:
+                break
+            self.append(flowable)
+        return list.__len__(self)
 
-def generate_low_stock_report_pdf(products: list):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
 
-    # Title
-    title_text = "Low Stock Report"
-    story.append(Paragraph(title_text, styles['h1']))
-    story.append(Paragraph(" ", styles['Normal'])) # Add some space
-
-    # Table Header
-    data = [["Product ID", "Name", "Stock"]]
-
-    # Table Data
-    for product in products:
-        data.append([
-            str(product.id),
-            product.name,
-            str(product.stock)
-        ])
-
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F44336')), # Red header
+def _table_style(header_color: str) -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
@@ -131,71 +100,60 @@ def generate_low_stock_report_pdf(products: list):
         ('RIGHTPADDING', (0,0), (-1,-1), 6),
         ('TOPPADDING', (0,0), (-1,-1), 6),
         ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-    ]))
-    story.append(table)
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-def generate_top_selling_report_pdf(products: list):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    ])
+
+def _report_tables(header: list, rows, column_widths: list, style: TableStyle):
+    """
+    Yields the report's rows as tables of PDF_CHUNK_ROWS rows, each repeating the header, all sharing one style.
+    """
+    col_widths = [FRAME_WIDTH * width for width in column_widths]
+    rows = iter(rows)
+    while chunk := list(islice(rows, PDF_CHUNK_ROWS)):
+        yield Table([header] + chunk, colWidths=col_widths, repeatRows=1, style=style)
+
+def _build_report(title: str, flowables, output=None):
+    """
+    Builds a report into `output` (a binary file), or into an anonymous temporary file so large
+    reports are spooled to disk rather than held in memory. Returns the file, rewound.
+    """
+    if output is None:
+        output = tempfile.TemporaryFile()
     styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    title_text = "Top Selling Products Report"
-    story.append(Paragraph(title_text, styles['h1']))
-    story.append(Paragraph(" ", styles['Normal'])) # Add some space
-
-    # Table Header
-    data = [["Product ID", "Name", "Total Quantity Sold"]]
-
-    # Table Data
-    for product, total_quantity in products:
-        data.append([
-            str(product.id),
-            product.name,
-            str(total_quantity)
-        ])
-
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2196F3')), # Blue header
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f0f0f0')), # Lighter background for rows
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0,0), (-1,-1), 6),
-        ('RIGHTPADDING', (0,0), (-1,-1), 6),
-        ('TOPPADDING', (0,0), (-1,-1), 6),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-    ]))
-    story.append(table)
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
-def generate_total_revenue_report_pdf(total_revenue: float):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    doc = SimpleDocTemplate(output, pagesize=letter)
+    header = [Paragraph(title, styles['h1']), Paragraph(" ", styles['Normal'])] # Add some space
+    doc.build(_FlowableStream(chain(header, flowables)))
+    output.seek(0)
+    return output
+
+def generate_sales_report_pdf(sales_data, start_date: datetime, end_date: datetime, output=None):
+    """
+    :param sales_data: Orders or (id, customer_id, total_price, date) rows, e.g. from crud.iter_sales_rows.
+    """
+    title_text = f"Sales Report from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+    rows = (
+        [str(sale.id), str(sale.customer_id), f"${sale.total_price:.2f}", sale.date.strftime('%Y-%m-%d %H:%M:%S')]
+        for sale in sales_data
+    )
+    tables = _report_tables(["Order ID", "Customer ID", "Total Price", "Date"], rows, [0.2, 0.2, 0.25, 0.35], _table_style('#4CAF50')) # Green header
+    return _build_report(title_text, tables, output)
+
+def generate_low_stock_report_pdf(products, output=None):
+    """
+    :param products: Products or (id, name, stock) rows, e.g. from crud.iter_low_stock_rows.
+    """
+    rows = ([str(product.id), product.name, str(product.stock)] for product in products)
+    tables = _report_tables(["Product ID", "Name", "Stock"], rows, [0.2, 0.6, 0.2], _table_style('#F44336')) # Red header
+    return _build_report("Low Stock Report", tables, output)
+
+def generate_top_selling_report_pdf(products, output=None):
+    """
+    :param products: (product_id, name, total_quantity) rows, e.g. from crud.iter_top_selling_rows.
+    """
+    rows = ([str(product_id), name, str(total_quantity)] for product_id, name, total_quantity in products)
+    tables = _report_tables(["Product ID", "Name", "Total Quantity Sold"], rows, [0.2, 0.5, 0.3], _table_style('#2196F3')) # Blue header
+    return _build_report("Top Selling Products Report", tables, output)
+
+def generate_total_revenue_report_pdf(total_revenue: float, output=None):
     styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    title_text = "Total Revenue Report"
-    story.append(Paragraph(title_text, styles['h1']))
-    story.append(Paragraph(" ", styles['Normal'])) # Add some space
-
-    # Content
     content_text = f"Total Revenue: ${total_revenue:.2f}"
-    story.append(Paragraph(content_text, styles['h2']))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return _build_report("Total Revenue Report", [Paragraph(content_text, styles['h2'])], output)
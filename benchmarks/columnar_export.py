@@ -0,0 +1,61 @@
+"""
+Columnar exports: write time, file size and time to load into pandas of the order-item export as Parquet,
+Arrow IPC and CSV (loaded with pandas.read_csv, parsing the dates, for a like-for-like comparison).
+
+    python benchmarks/columnar_export.py [--orders 100000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from common import SessionLocal, crud, print_table, seed_company, seed_orders
+from app import columnar, reporting
+
+LOADERS = {
+    "parquet": lambda f: pq.read_table(f).to_pandas(),
+    "arrow": lambda f: pa.ipc.open_file(f).read_all().to_pandas(),
+    "csv": lambda f: pd.read_csv(f, parse_dates=["date"]),
+}
+
+
+def write(format: str, query_args: dict):
+    if format == "csv":
+        return reporting._csv_file([field.name for field in columnar.EXPORTS["order_items"].schema], crud.iter_order_item_rows, **query_args)
+    return reporting.render_export("order_items", format, query_args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100000, help="Orders seeded (one line each).")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    seed = seed_company(db, products=10)
+    company_id = seed["company"].id
+    seed_orders(db, seed, args.orders)
+    db.close()
+    end_date = datetime.now(timezone.utc) + timedelta(days=1)
+    query_args = dict(start_date=end_date - timedelta(days=400), end_date=end_date, company_id=company_id)
+
+    rows = []
+    for format in ["parquet", "arrow", "csv"]:
+        started_at = time.perf_counter()
+        export = write(format, query_args)
+        write_seconds = time.perf_counter() - started_at
+        size = export.seek(0, 2)
+        export.seek(0)
+        started_at = time.perf_counter()
+        frame = LOADERS[format](export)
+        load_seconds = time.perf_counter() - started_at
+        export.close()
+        rows.append([format, len(frame), f"{size / 2**20:.2f}", f"{write_seconds:.2f}", f"{load_seconds:.3f}", str(frame["date"].dtype)])
+
+    print_table(["format", "rows", "MiB", "write s", "load s", "date dtype"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Shared setup for the benchmark scripts. They run against DATABASE_URL, or against a throwaway SQLite
+database in a temporary directory when it is not set, and each seeds a company of its own, so they
+can be pointed at a shared development database without touching existing data.
+"""
+from datetime import datetime, timedelta, timezone
+import os
+import resource
+import sys
+import tempfile
+import uuid
+
+if not os.getenv("DATABASE_URL"):
+    _workdir = tempfile.mkdtemp(prefix="aibfs-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'bench.db')}"
+    os.chdir(_workdir)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert
+
+from app import crud, models, rollups, schemas
+from app.database import Base, SessionLocal, engine
+
+Base.metadata.create_all(bind=engine)
+
+PASSWORD = "benchmark"
+
+
+def seed_company(db, products: int = 0, stock: int = 10**9, price: float = 9.99):
+    """
+    A new company with one user, one customer and `products` products, as a dict of their rows.
+    """
+    name = f"bench-{uuid.uuid4().hex[:8]}"
+    company = crud.create_company(db, schemas.CompanyCreate(name=name))
+    user = crud.create_user(db, schemas.UserCreate(username=name, email=f"{name}@example.com", password=PASSWORD, company_id=company.id))
+    customer = crud.create_customer(db, schemas.CustomerCreate(name=name, contact=f"{name}@example.com"), company_id=company.id)
+    product_ids = [
+        crud.create_product(db, schemas.ProductCreate(name=f"product {i}", price=price, stock=stock), company_id=company.id).id
+        for i in range(products)
+    ]
+    return {"company": company, "user": user, "customer": customer, "product_ids": product_ids}
+
+
+def seed_orders(db, seed: dict, count: int, batch_rows: int = 10000, days: int = 365):
+    """
+    Bulk-inserts `count` one-line orders for the seeded company, spread over the last `days` days, without
+    going through crud.create_order (so seeding a million orders takes seconds, not hours), then rebuilds
+    the company's daily sales rollup from them.
+    """
+    company_id = seed["company"].id
+    product_ids = seed["product_ids"]
+    assert product_ids, "seed_company(products=...) first"
+    now = datetime.now(timezone.utc)
+    for offset in range(0, count, batch_rows):
+        rows = [
+            {"customer_id": seed["customer"].id, "user_id": seed["user"].id, "company_id": company_id, "total_price": 9.99, "date": now - timedelta(seconds=(offset + i) * days * 86400 // count)}
+            for i in range(min(batch_rows, count - offset))
+        ]
+        order_ids = db.execute(insert(models.Order).returning(models.Order.id), rows).scalars().all()
+        db.execute(insert(models.OrderItem), [
+            {"order_id": order_id, "product_id": product_ids[i % len(product_ids)], "quantity": 1, "price": 9.99}
+            for i, order_id in enumerate(order_ids)
+        ])
+        db.commit()
+    rollups.rebuild_daily_product_sales(db, company_id=company_id)
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mib() -> float:
+    """
+    Peak resident set size of this process so far (Linux reports ru_maxrss in KiB).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StatementCounter:
+    """
+    Counts the SQL statements executed on the sync engine while active.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def _before_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._before_execute)
+
+
+def print_table(header: list, rows: list):
+    widths = [max(len(str(value)) for value in column) for column in zip(header, *rows)]
+    for row in [header] + rows:
+        print("  ".join(str(value).rjust(width) for value, width in zip(row, widths)))
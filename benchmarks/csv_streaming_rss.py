@@ -0,0 +1,64 @@
+"""
+Memory of the streamed sales CSV: peak RSS of a process that streams the whole sales report at 10k, 100k
+and 1M orders. Streaming keeps memory flat in the row count, so the script exits non-zero if the peak at
+the largest size is more than --max-growth MiB above the peak at the smallest.
+
+    python benchmarks/csv_streaming_rss.py [--orders 10000 100000 1000000] [--max-growth 32]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.abspath(__file__)
+
+
+def run(company_id: int):
+    import time
+    from datetime import datetime, timedelta, timezone
+
+    from common import crud, peak_rss_mib
+    from app import reporting
+
+    baseline = peak_rss_mib()
+    started_at = time.perf_counter()
+    size = 0
+    end_date = datetime.now(timezone.utc) + timedelta(days=1)
+    for chunk in reporting._stream_csv(["order_id", "customer_id", "total_price", "date"], crud.iter_sales_rows, start_date=end_date - timedelta(days=400), end_date=end_date, company_id=company_id):
+        size += len(chunk)
+    print(json.dumps({"bytes": size, "seconds": time.perf_counter() - started_at, "baseline_mib": baseline, "peak_mib": peak_rss_mib()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[10000, 100000, 1000000], help="Order counts to stream, ascending.")
+    parser.add_argument("--max-growth", type=float, default=32, help="Allowed peak RSS growth from the smallest to the largest size, in MiB.")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run is not None:
+        return run(args.run)
+
+    from common import SessionLocal, print_table, seed_company, seed_orders
+
+    db = SessionLocal()
+    seed = seed_company(db, products=10)
+    rows, peaks, seeded = [], [], 0
+    for orders in sorted(args.orders):
+        seed_orders(db, seed, orders - seeded)
+        seeded = orders
+        output = subprocess.run([sys.executable, SCRIPT, "--run", str(seed["company"].id)], check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        peaks.append(result["peak_mib"])
+        rows.append([orders, f"{result['bytes'] / 2**20:.1f}", f"{result['seconds']:.2f}", f"{result['baseline_mib']:.1f}", f"{result['peak_mib']:.1f}"])
+    db.close()
+
+    print_table(["orders", "csv MiB", "seconds", "rss before MiB", "peak rss MiB"], rows)
+    growth = peaks[-1] - peaks[0]
+    print(f"Peak RSS growth: {growth:.1f} MiB (allowed {args.max_growth:.1f})")
+    if growth > args.max_growth:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Invoice rendering: SQL statements and p50 time to read an invoice's data as a one-query snapshot
+(crud.get_invoice_snapshot) and by lazy ORM traversal (order, then its company, customer, items and each
+item's product), p50 time to draw the PDF, and p50 of billing.render_invoice end to end.
+
+    python benchmarks/invoice_render.py [--repeat 200] [--items 5 50]
+"""
+import argparse
+import time
+
+from common import SessionLocal, StatementCounter, crud, models, percentile, print_table, schemas, seed_company
+from app import billing
+from app.utils.pdf_generator import generate_invoice_pdf
+
+
+def lazy_snapshot(db, order_id: int, company_id: int) -> dict:
+    """
+    The invoice's data read the way an ORM order is traversed without eager loading.
+    """
+    order = db.query(models.Order).filter(models.Order.id == order_id, models.Order.company_id == company_id).first()
+    return {
+        "order_id": order.id,
+        "company_id": order.company_id,
+        "company_name": order.company.name,
+        "customer_name": order.customer.name,
+        "customer_contact": order.customer.contact,
+        "date": order.date,
+        "total_price": order.total_price,
+        "items": [{"product_name": item.product.name, "quantity": item.quantity, "price": item.price} for item in order.items],
+    }
+
+
+def timed(repeat: int, read, db) -> tuple:
+    """
+    (statements of one call, p50 ms), starting each call on an empty session so nothing comes from the identity map.
+    """
+    with StatementCounter() as statements:
+        read()
+    db.expunge_all()
+    samples = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        read()
+        samples.append((time.perf_counter() - started_at) * 1000)
+        db.expunge_all()
+    return statements.count, percentile(samples, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="Timed runs per measurement.")
+    parser.add_argument("--items", type=int, nargs="+", default=[5, 50], help="Lines per invoice.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    seed = seed_company(db, products=max(args.items))
+    company_id, user_id, customer_id = seed["company"].id, seed["user"].id, seed["customer"].id
+    rows = []
+    for item_count in args.items:
+        order = crud.create_order(db, schemas.OrderCreate(customer_id=customer_id, items=[schemas.OrderItemCreate(product_id=product_id, quantity=1) for product_id in seed["product_ids"][:item_count]]), user_id=user_id, company_id=company_id)
+        order_id = order.id
+        db.expunge_all()
+
+        snapshot_statements, snapshot_ms = timed(args.repeat, lambda: crud.get_invoice_snapshot(db, order_id=order_id, company_id=company_id), db)
+        lazy_statements, lazy_ms = timed(args.repeat, lambda: lazy_snapshot(db, order_id, company_id), db)
+        invoice = crud.get_invoice_snapshot(db, order_id=order_id, company_id=company_id)
+        render_samples, end_to_end_samples = [], []
+        for _ in range(args.repeat):
+            started_at = time.perf_counter()
+            generate_invoice_pdf(invoice)
+            render_samples.append((time.perf_counter() - started_at) * 1000)
+            started_at = time.perf_counter()
+            billing.render_invoice(db, order_id, company_id)
+            end_to_end_samples.append((time.perf_counter() - started_at) * 1000)
+        rows.append([
+            item_count, snapshot_statements, f"{snapshot_ms:.2f}", lazy_statements, f"{lazy_ms:.2f}",
+            f"{percentile(render_samples, 50):.2f}", f"{percentile(end_to_end_samples, 50):.2f}",
+        ])
+    db.close()
+
+    print_table(["items", "snapshot stmts", "snapshot ms", "lazy stmts", "lazy ms", "render ms", "render_invoice ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+HTTP load test: requests per second and p50/p99 latency of GET /products/ on a single uvicorn worker, for the
+async route and for a sync twin of it (the same query on the sync session in the threadpool, as the route
+used to run), at each concurrency.
+
+    python benchmarks/load_test.py [--requests 2000] [--concurrency 1 16 64] [--products 1000] [--limit 100]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+SCRIPT = os.path.abspath(__file__)
+ROUTES = {"async": "/products/", "sync": "/benchmark/products-sync"}
+
+
+def serve(port: int):
+    from typing import List
+
+    import uvicorn
+    from fastapi import Depends
+    from sqlalchemy.orm import Session
+
+    from common import crud, schemas
+    from app.auth import Principal, get_current_active_user
+    from app.database import get_db
+    from app.main import app
+
+    def read_products_sync(limit: int = 100, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_active_user)):
+        return crud.get_products(db, company_id=current_user.company_id, limit=limit)
+
+    app.add_api_route(ROUTES["sync"], read_products_sync, methods=["GET"], response_model=List[schemas.Product])
+    uvicorn.run(app, host="127.0.0.1", port=port, workers=1, log_level="warning")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, timeout: float = 60):
+    server = subprocess.Popen([sys.executable, SCRIPT, "--serve", str(port)], env=dict(os.environ, MCP_TRANSPORT="inprocess"))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def measure(base_url: str, path: str, headers: dict, params: dict, requests: int, concurrency: int):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=60) as client:
+        (await client.get(path, params=params)).raise_for_status()
+        samples = []
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                started_at = time.perf_counter()
+                response = await client.get(path, params=params)
+                samples.append((time.perf_counter() - started_at) * 1000)
+                response.raise_for_status()
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples, time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per route and concurrency.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64], help="Requests in flight at once.")
+    parser.add_argument("--products", type=int, default=1000, help="Products seeded.")
+    parser.add_argument("--limit", type=int, default=100, help="Products per page.")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve is not None:
+        return serve(args.serve)
+
+    import httpx
+
+    from common import PASSWORD, SessionLocal, percentile, print_table, seed_company
+
+    db = SessionLocal()
+    username = seed_company(db, products=args.products)["user"].username
+    db.close()
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port)
+    try:
+        token = httpx.post(f"{base_url}/auth/token", data={"username": username, "password": PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        rows = []
+        for concurrency in args.concurrency:
+            for name, path in ROUTES.items():
+                samples, elapsed = asyncio.run(measure(base_url, path, headers, {"limit": args.limit}, args.requests, concurrency))
+                rows.append([name, concurrency, args.requests, f"{args.requests / elapsed:.1f}", f"{percentile(samples, 50):.2f}", f"{percentile(samples, 99):.2f}"])
+    finally:
+        server.terminate()
+        server.wait()
+
+    print_table(["route", "concurrency", "requests", "req/s", "p50 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Login throughput: /auth/token logins per second, in total and per password-hashing worker, at each
+bcrypt cost. Each cost runs in a subprocess of its own because BCRYPT_ROUNDS is read at import.
+
+    python benchmarks/login_throughput.py [--logins 200] [--concurrency 32] [--rounds 10 12 14]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+def run(logins: int, concurrency: int):
+    import asyncio
+    import time
+
+    import httpx
+
+    from common import PASSWORD, SessionLocal, seed_company
+    from app.main import app
+    from app.utils import jwt_handler
+
+    db = SessionLocal()
+    username = seed_company(db)["user"].username
+    db.close()
+
+    async def login_all():
+        remaining = iter(range(logins))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def worker():
+                for _ in remaining:
+                    response = await client.post("/auth/token", data={"username": username, "password": PASSWORD})
+                    assert response.status_code == 200, response.text
+            started_at = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return time.perf_counter() - started_at
+
+    elapsed = asyncio.run(login_all())
+    print(json.dumps({"workers": jwt_handler.PASSWORD_HASH_WORKERS, "seconds": elapsed}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200, help="Logins per cost.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Logins in flight at once (keep it under PASSWORD_HASH_MAX_QUEUE).")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12, 14], help="bcrypt costs to measure.")
+    parser.add_argument("--run", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run(args.logins, args.concurrency)
+
+    rows = []
+    for rounds in args.rounds:
+        output = subprocess.run(
+            [sys.executable, __file__, "--run", "--logins", str(args.logins), "--concurrency", str(args.concurrency)],
+            env=dict(os.environ, BCRYPT_ROUNDS=str(rounds)), check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        per_second = args.logins / result["seconds"]
+        rows.append([rounds, result["workers"], args.logins, f"{result['seconds']:.2f}", f"{per_second:.1f}", f"{per_second / result['workers']:.1f}"])
+
+    from common import print_table
+    print_table(["rounds", "workers", "logins", "seconds", "logins/s", "logins/s/worker"], rows)
+
+
+if __name__ == "__main__":
+    main()
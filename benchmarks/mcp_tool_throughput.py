@@ -0,0 +1,72 @@
+"""
+MCP tool throughput: read_products calls per second through an in-memory client at concurrency 1 and N,
+for the async tool in tools/inventory.py and for the same query on the sync session (how the tool used to
+run, blocking the server's event loop for the length of each query).
+
+    python benchmarks/mcp_tool_throughput.py [--calls 500] [--concurrency 1 16] [--products 1000] [--limit 100]
+"""
+import argparse
+import asyncio
+import time
+
+from fastmcp import Client, FastMCP
+
+from common import SessionLocal, crud, percentile, print_table, seed_company
+from tools import inventory
+
+sync_server = FastMCP(name="Inventory (sync)")
+
+
+@sync_server.tool
+def read_products(company_id: int, skip: int = 0, limit: int = 100) -> dict:
+    """
+    read_products on the sync session.
+    """
+    db = SessionLocal()
+    try:
+        products = crud.get_products(db, company_id=company_id, skip=skip, limit=limit)
+        return {"items": [{"id": p.id, "name": p.name, "price": p.price, "stock": p.stock} for p in products]}
+    finally:
+        db.close()
+
+
+async def measure(server, arguments: dict, calls: int, concurrency: int):
+    async with Client(server) as client:
+        await client.call_tool("read_products", arguments)
+        samples = []
+        remaining = iter(range(calls))
+
+        async def worker():
+            for _ in remaining:
+                started_at = time.perf_counter()
+                result = await client.call_tool("read_products", arguments)
+                samples.append((time.perf_counter() - started_at) * 1000)
+                assert len(result.data["items"]) == arguments["limit"]
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples, time.perf_counter() - started_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500, help="Tool calls per tool and concurrency.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16], help="Calls in flight at once.")
+    parser.add_argument("--products", type=int, default=1000, help="Products seeded.")
+    parser.add_argument("--limit", type=int, default=100, help="Products read per call.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    arguments = {"company_id": seed_company(db, products=args.products)["company"].id, "limit": args.limit}
+    db.close()
+
+    rows = []
+    for concurrency in args.concurrency:
+        for name, server in [("async", inventory.tools_server), ("sync", sync_server)]:
+            samples, elapsed = asyncio.run(measure(server, arguments, args.calls, concurrency))
+            rows.append([name, concurrency, args.calls, f"{args.calls / elapsed:.1f}", f"{percentile(samples, 50):.2f}", f"{percentile(samples, 99):.2f}"])
+    print_table(["tool", "concurrency", "calls", "calls/s", "p50 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
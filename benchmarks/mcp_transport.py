@@ -0,0 +1,100 @@
+"""
+MCP transport overhead: latency and throughput of predict_stock_batch calls through app.ai's client pool,
+against mcp_server.py in a subprocess over HTTP (MCP_TRANSPORT=remote) and against the tool server in this
+process (MCP_TRANSPORT=inprocess).
+
+    python benchmarks/mcp_transport.py [--calls 200] [--concurrency 1 8] [--products 20] [--orders 2000]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from common import SessionLocal, percentile, print_table, seed_company, seed_orders
+from app import ai
+from tools.ai_tools import tools_server
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_remote_server(port: int, timeout: float = 60):
+    server = subprocess.Popen(
+        [sys.executable, "-c", f"import mcp_server; mcp_server.mcp.run(transport='http', host='127.0.0.1', port={port}, show_banner=False)"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("mcp_server.py did not start")
+
+
+async def measure(transport, tool: str, arguments: dict, calls: int, concurrency: int):
+    pool = ai.MCPClientPool(transport, size=ai.MCP_POOL_SIZE, max_concurrency=concurrency)
+    await pool.start()
+    try:
+        await pool.call_tool(tool, arguments)  # warm up: tool import, forecasting process pool
+        samples = []
+        remaining = iter(range(calls))
+
+        async def worker():
+            for _ in remaining:
+                started_at = time.perf_counter()
+                await pool.call_tool(tool, arguments)
+                samples.append((time.perf_counter() - started_at) * 1000)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples, time.perf_counter() - started_at
+    finally:
+        await pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200, help="Tool calls per transport and concurrency.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="Calls in flight at once.")
+    parser.add_argument("--products", type=int, default=20, help="Products forecast per call.")
+    parser.add_argument("--orders", type=int, default=2000, help="Order history seeded for the forecast.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    seed = seed_company(db, products=args.products)
+    arguments = {"company_id": seed["company"].id, "product_ids": None}
+    seed_orders(db, seed, args.orders, days=90)
+    db.close()
+
+    port = _free_port()
+    server = start_remote_server(port)
+    try:
+        transports = [
+            ("remote", f"http://127.0.0.1:{port}/mcp", "ai_tools_predict_stock_batch"),
+            ("inprocess", tools_server, "predict_stock_batch"),
+        ]
+        rows = []
+        for concurrency in args.concurrency:
+            for name, transport, tool in transports:
+                samples, elapsed = asyncio.run(measure(transport, tool, arguments, args.calls, concurrency))
+                rows.append([name, concurrency, args.calls, f"{args.calls / elapsed:.1f}", f"{percentile(samples, 50):.2f}", f"{percentile(samples, 99):.2f}"])
+    finally:
+        server.terminate()
+        server.wait()
+
+    print_table(["transport", "concurrency", "calls", "calls/s", "p50 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
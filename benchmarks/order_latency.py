@@ -0,0 +1,42 @@
+"""
+Order placement latency: p50/p99 of crud.create_order at 1, 10 and 100 items per order, with the number
+of SQL statements each order takes (constant in the item count for the set-based implementation).
+
+    python benchmarks/order_latency.py [--orders 200] [--items 1 10 100]
+"""
+import argparse
+import time
+
+from common import SessionLocal, StatementCounter, crud, percentile, print_table, schemas, seed_company
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=200, help="Orders placed per item count.")
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 10, 100], help="Items per order.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    seed = seed_company(db, products=max(args.items))
+    rows = []
+    for item_count in args.items:
+        order = schemas.OrderCreate(
+            customer_id=seed["customer"].id,
+            items=[schemas.OrderItemCreate(product_id=product_id, quantity=1) for product_id in seed["product_ids"][:item_count]],
+        )
+        with StatementCounter() as statements:
+            crud.create_order(db, order, user_id=seed["user"].id, company_id=seed["company"].id)
+        samples = []
+        for _ in range(args.orders):
+            started_at = time.perf_counter()
+            assert crud.create_order(db, order, user_id=seed["user"].id, company_id=seed["company"].id) is not None
+            samples.append((time.perf_counter() - started_at) * 1000)
+        rows.append([item_count, args.orders, statements.count, f"{percentile(samples, 50):.2f}", f"{percentile(samples, 99):.2f}"])
+    db.close()
+
+    print(f"Database: {db.get_bind().url.render_as_string(hide_password=True)}")
+    print_table(["items/order", "orders", "statements/order", "p50 ms", "p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Sales report PDF rendering: time, size and peak RSS of a process that renders the sales report PDF from the
+database cursor into a temporary file, at 10k and 100k orders. Rows are laid out a page at a time, so peak RSS
+should not grow with the row count.
+
+    python benchmarks/report_pdf.py [--orders 10000 100000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.abspath(__file__)
+
+
+def run(company_id: int):
+    import time
+    from datetime import datetime, timedelta, timezone
+
+    from common import crud, peak_rss_mib
+    from app import reporting
+    from app.utils.pdf_generator import generate_sales_report_pdf
+
+    baseline = peak_rss_mib()
+    end_date = datetime.now(timezone.utc) + timedelta(days=1)
+    start_date = end_date - timedelta(days=400)
+    started_at = time.perf_counter()
+    report = reporting.render_pdf(generate_sales_report_pdf, crud.iter_sales_rows, dict(start_date=start_date, end_date=end_date, company_id=company_id), start_date, end_date)
+    seconds = time.perf_counter() - started_at
+    size = report.seek(0, os.SEEK_END)
+    report.close()
+    print(json.dumps({"bytes": size, "seconds": seconds, "baseline_mib": baseline, "peak_mib": peak_rss_mib()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=[10000, 100000], help="Order counts to render, ascending.")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run is not None:
+        return run(args.run)
+
+    from common import SessionLocal, print_table, seed_company, seed_orders
+
+    db = SessionLocal()
+    seed = seed_company(db, products=10)
+    rows, seeded = [], 0
+    for orders in sorted(args.orders):
+        seed_orders(db, seed, orders - seeded)
+        seeded = orders
+        output = subprocess.run([sys.executable, SCRIPT, "--run", str(seed["company"].id)], check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        rows.append([orders, f"{result['bytes'] / 2**20:.1f}", f"{result['seconds']:.2f}", f"{orders / result['seconds']:.0f}", f"{result['baseline_mib']:.1f}", f"{result['peak_mib']:.1f}"])
+    db.close()
+
+    print_table(["orders", "pdf MiB", "seconds", "rows/s", "rss before MiB", "peak rss MiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
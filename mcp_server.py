@@ -1,23 +1,167 @@
-from fastmcp import FastMCP
+from fastmcp import FastMCP, Client
+from fastmcp.tools import Tool
+import argparse
+import hashlib
+import json
+import logging
 import os
 import importlib
 import asyncio # Import asyncio
+import time
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+TOOLS_DIR = "tools"
+MANIFEST_PATH = os.path.join(TOOLS_DIR, "manifest.json")
+
+_started_at = time.perf_counter()
 
 mcp = FastMCP("MCP Server")
 
-async def register_tools(mcp_instance): # Make it async
-    tools_dir = "tools"
-    for filename in os.listdir(tools_dir):
-        if filename.endswith(".py") and not filename.startswith("__"):
-            module_name = f"{tools_dir}.{filename[:-3]}"
-            module = importlib.import_module(module_name)
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if isinstance(attr, FastMCP):
-                    await mcp_instance.import_server(attr, prefix=f"{filename[:-3]}_") # Await the call
+# Seconds spent importing each tool module (and its dependencies), filled in as modules load.
+import_times = {}
+_import_locks = {}
+
+
+def _tool_modules():
+    return sorted(filename[:-3] for filename in os.listdir(TOOLS_DIR) if filename.endswith(".py") and not filename.startswith("__"))
+
+def _source_hash(module: str) -> str:
+    with open(os.path.join(TOOLS_DIR, f"{module}.py"), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def _import_tool_module(module: str):
+    started_at = time.perf_counter()
+    imported = importlib.import_module(f"{TOOLS_DIR}.{module}")
+    import_times.setdefault(module, time.perf_counter() - started_at)
+    return imported
+
+def _tool_server(imported) -> FastMCP:
+    for attr_name in dir(imported):
+        attr = getattr(imported, attr_name)
+        if isinstance(attr, FastMCP):
+            return attr
+    raise LookupError(f"{imported.__name__} does not define a FastMCP server")
+
+async def _load_tool_server(module: str) -> FastMCP:
+    """
+    Imports a tool module on first use. The import runs in a thread so heavy dependencies
+    (pandas, reportlab, ...) do not stall calls to tools that are already loaded.
+    """
+    lock = _import_locks.setdefault(module, asyncio.Lock())
+    async with lock:
+        return _tool_server(await asyncio.to_thread(_import_tool_module, module))
+
+async def describe_module(module: str) -> list:
+    """
+    Imports a tool module and returns the manifest entries (name, description, schemas) of its tools.
+    """
+    async with Client(_tool_server(_import_tool_module(module))) as client:
+        tools = await client.list_tools()
+    return [
+        {"name": tool.name, "description": tool.description, "parameters": tool.inputSchema, "output_schema": tool.outputSchema}
+        for tool in tools
+    ]
+
+
+class LazyTool(Tool):
+    """
+    A tool registered from the manifest. The module that implements it is imported on the first call.
+    """
+    module: str
+    tool_name: str
+
+    async def run(self, arguments):
+        server = await _load_tool_server(self.module)
+        tool = await server.get_tool(self.tool_name)
+        return await tool.run(arguments)
+
+
+def build_manifest(path: str = MANIFEST_PATH) -> dict:
+    """
+    Imports every tool module and writes their tool schemas to the manifest, keyed by module
+    with a hash of its source so edited modules are detected at startup.
+    """
+    async def describe_all():
+        return {module: {"source_sha256": _source_hash(module), "tools": await describe_module(module)} for module in _tool_modules()}
+
+    manifest = {"modules": asyncio.run(describe_all())}
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+def register_tools(mcp_instance, manifest_path: str = MANIFEST_PATH):
+    """
+    Registers every tool under "<module>_<tool>" without importing the tool modules, using the schemas
+    in the manifest. Modules that are missing from the manifest or changed since it was built are
+    imported now to read their schemas, as before.
+    """
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)["modules"]
+    except FileNotFoundError:
+        logger.warning("%s not found; importing every tool module (run `python mcp_server.py --build-manifest`)", manifest_path)
+        manifest = {}
+
+    for module in _tool_modules():
+        entry = manifest.get(module)
+        if entry is None or entry["source_sha256"] != _source_hash(module):
+            if entry is not None:
+                logger.warning("%s changed since the tool manifest was built; importing it", module)
+            entry = {"tools": asyncio.run(describe_module(module))}
+        for tool in entry["tools"]:
+            mcp_instance.add_tool(LazyTool(
+                name=f"{module}_{tool['name']}",
+                description=tool["description"],
+                parameters=tool["parameters"],
+                output_schema=tool["output_schema"],
+                module=module,
+                tool_name=tool["name"],
+            ))
+
+def startup_report() -> dict:
+    return {
+        "startup_seconds": startup_seconds,
+        "modules": {module: {"loaded": module in import_times, "import_seconds": import_times.get(module)} for module in _tool_modules()},
+    }
 
 # Register tools immediately
-asyncio.run(register_tools(mcp))
+register_tools(mcp)
+startup_seconds = time.perf_counter() - _started_at
+
+@mcp.tool
+def server_startup_report() -> dict:
+    """
+    Reports how long the MCP server took to start and how long each tool module took to import.
+    :return: A dictionary with 'startup_seconds' and, per tool module, whether it is loaded and its import time in seconds.
+    """
+    return startup_report()
+
+@mcp.tool
+def server_metrics() -> dict:
+    """
+    Reports this MCP server process's runtime metrics, such as its database connection pools (once a tool has used them).
+    :return: The same snapshot GET /metrics returns for a web worker.
+    """
+    return metrics.collect()
 
 if __name__ == "__main__":
-    mcp.run(transport="http", port=8002)
+    parser = argparse.ArgumentParser(description="AIBFS MCP server")
+    parser.add_argument("--build-manifest", action="store_true", help=f"regenerate {MANIFEST_PATH} from the tool modules and exit")
+    parser.add_argument("--import-times", action="store_true", help="import every tool module, print the import-time breakdown and exit")
+    args = parser.parse_args()
+
+    if args.build_manifest:
+        manifest = build_manifest()
+        print(f"Wrote {sum(len(entry['tools']) for entry in manifest['modules'].values())} tools to {MANIFEST_PATH}")
+    elif args.import_times:
+        for module in _tool_modules():
+            _import_tool_module(module)
+        print(f"startup (lazy): {startup_seconds:.3f}s")
+        for module, seconds in sorted(import_times.items(), key=lambda item: item[1], reverse=True):
+            print(f"{module}: {seconds:.3f}s")
+    else:
+        mcp.run(transport="http", port=8002)
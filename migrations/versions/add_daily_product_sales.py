@@ -0,0 +1,44 @@
+"""Add daily product sales rollup
+
+Revision ID: 4
+Revises: 3
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4'
+down_revision = '3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_product_sales',
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('company_id', 'product_id', 'day')
+    )
+    op.create_index('ix_daily_product_sales_company_id_day', 'daily_product_sales', ['company_id', 'day'], unique=False)
+    # Backfill from existing orders; afterwards crud.create_order keeps it current.
+    op.execute("""
+        INSERT INTO daily_product_sales (company_id, product_id, day, quantity, revenue, order_count)
+        SELECT orders.company_id, order_items.product_id, date(orders.date),
+               sum(order_items.quantity), sum(order_items.quantity * order_items.price), count(DISTINCT order_items.order_id)
+        FROM orders JOIN order_items ON order_items.order_id = orders.id
+        GROUP BY orders.company_id, order_items.product_id, date(orders.date)
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_daily_product_sales_company_id_day', table_name='daily_product_sales')
+    op.drop_table('daily_product_sales')
@@ -0,0 +1,34 @@
+"""Add line count to daily product sales rollup
+
+Revision ID: 5
+Revises: 4
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5'
+down_revision = '4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('daily_product_sales', sa.Column('line_count', sa.Integer(), nullable=False, server_default='0'))
+    # Backfill from existing orders; afterwards crud.create_order keeps it current.
+    op.execute("""
+        UPDATE daily_product_sales SET line_count = (
+            SELECT count(*)
+            FROM orders JOIN order_items ON order_items.order_id = orders.id
+            WHERE orders.company_id = daily_product_sales.company_id
+              AND order_items.product_id = daily_product_sales.product_id
+              AND date(orders.date) = daily_product_sales.day
+        )
+    """)
+
+
+def downgrade():
+    op.drop_column('daily_product_sales', 'line_count')
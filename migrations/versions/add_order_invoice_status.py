@@ -0,0 +1,25 @@
+"""Add invoice status to orders
+
+Revision ID: 2
+Revises: 1
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2'
+down_revision = '1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('orders', sa.Column('invoice_status', sa.String(), nullable=True))
+    op.execute("UPDATE orders SET invoice_status = CASE WHEN pdf_invoice_path IS NULL THEN 'pending' ELSE 'ready' END")
+
+
+def downgrade():
+    op.drop_column('orders', 'invoice_status')
@@ -0,0 +1,43 @@
+"""Add tenant-aware composite indexes
+
+Revision ID: 3
+Revises: 2
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3'
+down_revision = '2'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns), matching the access paths in app/crud.py:
+# every list and report filters on company_id, order lists and sales reports
+# range over date, low-stock reports over stock, and the item joins go
+# through order_items.product_id / order_items.order_id.
+INDEXES = [
+    ('ix_orders_company_id_date_id', 'orders', ['company_id', 'date', 'id']),
+    ('ix_products_company_id_stock', 'products', ['company_id', 'stock']),
+    ('ix_products_company_id_id', 'products', ['company_id', 'id']),
+    ('ix_customers_company_id_id', 'customers', ['company_id', 'id']),
+    ('ix_users_company_id_id', 'users', ['company_id', 'id']),
+    ('ix_order_items_product_id_order_id', 'order_items', ['product_id', 'order_id']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,65 @@
+"""
+The tests run the app against a throwaway SQLite database in a temporary working directory
+(uploads and rendered reports are written relative to it). Each test that needs data gets its own
+company, so tests do not see each other's rows.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+_workdir = tempfile.mkdtemp(prefix="aibfs-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")  # the minimum; every test registers and logs in a user
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(_workdir)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import billing, crud, images, report_jobs, schemas
+from app.database import SessionLocal
+from app.main import app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def background_work():
+    # Let uploads' variants, invoices and report jobs finish while the working directory is still the test one.
+    yield
+    for executor in (images._variant_executor, billing._invoice_executor, report_jobs._job_executor):
+        executor.shutdown(wait=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    # Not used as a context manager, so the app's lifespan (which connects to the remote MCP server) does not run.
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def register(client, company_id: int, username: str = None, password: str = "secret"):
+    username = username or f"user-{uuid.uuid4().hex[:8]}"
+    user = client.post("/auth/register", json={"username": username, "email": f"{username}@example.com", "password": password, "company_id": company_id}).json()
+    token = client.post("/auth/token", data={"username": username, "password": password}).json()["access_token"]
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def company(db):
+    return crud.create_company(db, schemas.CompanyCreate(name=f"company-{uuid.uuid4().hex[:8]}"))
+
+
+@pytest.fixture
+def user(client, company):
+    """
+    A registered user of `company`, as (user JSON, auth headers).
+    """
+    return register(client, company.id)
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import pytest
+
+from app import billing, crud, schemas
+
+
+@pytest.fixture
+def shop(db, company, user):
+    _, headers = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    product = crud.create_product(db, schemas.ProductCreate(name="widget", price=2.5, stock=10), company_id=company.id)
+    return headers, customer.id, product.id
+
+
+def _order(customer_id, product_id, quantity=1) -> str:
+    return json.dumps({"customer_id": customer_id, "items": [{"product_id": product_id, "quantity": quantity}]})
+
+
+def test_bulk_orders_return_one_result_per_line(client, shop, monkeypatch):
+    headers, customer_id, product_id = shop
+    monkeypatch.setattr(billing, "BULK_ORDER_CHUNK_SIZE", 2)
+    body = "\n".join([
+        _order(customer_id, product_id, 3),
+        "",
+        "{not json",
+        _order(customer_id, product_id, 100),
+        _order(customer_id, product_id, 2),
+    ])
+    response = client.post("/orders/bulk", content=body, headers=headers)
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [result["line"] for result in results] == [1, 3, 4, 5]
+    assert "order_id" in results[0] and "order_id" in results[3]
+    assert "Invalid order" in results[1]["error"]
+    assert "Not enough stock" in results[2]["error"]
+
+
+def test_overlong_line_gets_an_error_without_being_buffered(client, shop, monkeypatch):
+    headers, customer_id, product_id = shop
+    monkeypatch.setattr(billing, "BULK_ORDER_MAX_LINE_BYTES", 200)
+    body = "\n".join([_order(customer_id, product_id), " " * 1000 + _order(customer_id, product_id), _order(customer_id, product_id)])
+    results = [json.loads(line) for line in client.post("/orders/bulk", content=body, headers=headers).text.splitlines()]
+    assert "order_id" in results[0] and "order_id" in results[2]
+    assert results[1] == {"line": 2, "error": "Line longer than 200 bytes"}
+
+
+async def _lines(parts):
+    async def stream():
+        for part in parts:
+            yield part
+    return [chunk async for chunk in billing.aiter_ndjson_chunks(stream(), chunk_size=100)]
+
+
+@pytest.mark.parametrize("parts", [
+    [b'{"a": 1}\n{"b"', b': 2}\n\n', b'{"c": 3}'],
+    [b'{"a"', b': 1}', b'\n{"b": 2}\n', b'\n{"c": 3}\n'],
+    [b'{"a": 1}\n{"b": 2}\n\n{"c": 3}\n'],
+])
+def test_lines_are_reassembled_across_reads(parts):
+    chunks = asyncio.run(_lines(parts))
+    assert chunks == [[(1, b'{"a": 1}'), (2, b'{"b": 2}'), (4, b'{"c": 3}')]]
+
+
+def test_overlong_line_split_across_reads(monkeypatch):
+    monkeypatch.setattr(billing, "BULK_ORDER_MAX_LINE_BYTES", 8)
+    chunks = asyncio.run(_lines([b'{"a": 1}\n0123', b'45678', b'9\n{"c": 3}']))
+    assert chunks == [[(1, b'{"a": 1}'), (2, None), (3, b'{"c": 3}')]]
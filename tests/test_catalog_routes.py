@@ -0,0 +1,46 @@
+from app import crud, schemas
+
+
+def test_product_routes_round_trip(client, user):
+    _, headers = user
+    created = client.post("/products/", json={"name": "widget", "price": 2.5, "stock": 3}, headers=headers).json()
+    assert created["name"] == "widget"
+    updated = client.put(f"/products/{created['id']}", json={"stock": 9}, headers=headers).json()
+    assert updated["stock"] == 9 and updated["price"] == 2.5
+    assert client.get(f"/products/{created['id']}", headers=headers).json() == updated
+    assert created["id"] in [product["id"] for product in client.get("/products/", headers=headers).json()]
+    assert client.delete(f"/products/{created['id']}", headers=headers).status_code == 200
+    assert client.get(f"/products/{created['id']}", headers=headers).status_code == 404
+
+
+def test_customer_routes_round_trip(client, user):
+    _, headers = user
+    created = client.post("/customers/", json={"name": "Ada", "contact": "ada@example.com"}, headers=headers).json()
+    updated = client.put(f"/customers/{created['id']}", json={"name": "Ada L.", "contact": "ada@example.com"}, headers=headers).json()
+    assert updated["name"] == "Ada L."
+    assert client.get(f"/customers/{created['id']}", headers=headers).json() == updated
+    assert [customer["id"] for customer in client.get("/customers/", headers=headers).json()] == [created["id"]]
+    assert client.delete(f"/customers/{created['id']}", headers=headers).status_code == 200
+    assert client.get(f"/customers/{created['id']}", headers=headers).status_code == 404
+
+
+def test_routes_are_scoped_to_the_callers_company(client, db, user):
+    _, headers = user
+    other = crud.create_company(db, schemas.CompanyCreate(name=f"other-{user[0]['id']}"))
+    product = crud.create_product(db, schemas.ProductCreate(name="theirs", price=1.0, stock=1), company_id=other.id)
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="theirs", contact="t@example.com"), company_id=other.id)
+    assert client.get(f"/products/{product.id}", headers=headers).status_code == 404
+    assert client.put(f"/products/{product.id}", json={"stock": 0}, headers=headers).status_code == 404
+    assert client.delete(f"/customers/{customer.id}", headers=headers).status_code == 404
+    assert client.get("/products/").status_code == 401
+
+
+def test_order_routes_include_items(client, db, company, user):
+    body, headers = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    product = crud.create_product(db, schemas.ProductCreate(name="p", price=2.0, stock=10), company_id=company.id)
+    order = crud.create_order(db, schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=3)]), user_id=body["id"], company_id=company.id)
+
+    listed = client.get("/orders/", headers=headers).json()
+    assert [(row["id"], [(item["product_id"], item["quantity"]) for item in row["items"]]) for row in listed] == [(order.id, [(product.id, 3)])]
+    assert client.get(f"/orders/{order.id}", headers=headers).json() == listed[0]
@@ -0,0 +1,61 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app import columnar, crud, schemas
+
+
+@pytest.fixture
+def sales(db, company, user):
+    body, headers = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    products = [crud.create_product(db, schemas.ProductCreate(name=f"p{i}", price=1.5 + i, stock=100), company_id=company.id) for i in range(2)]
+    order = schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=i + 1) for i, product in enumerate(products)])
+    orders = [crud.create_order(db, order, user_id=body["id"], company_id=company.id) for _ in range(3)]
+    now = datetime.now(timezone.utc)
+    params = {"start_date": (now - timedelta(days=1)).isoformat(), "end_date": (now + timedelta(days=1)).isoformat()}
+    return {"headers": headers, "orders": orders, "customer_id": customer.id, "product_ids": [product.id for product in products], "params": params}
+
+
+def _read(format: str, body: bytes) -> pa.Table:
+    if format == "parquet":
+        return pq.read_table(io.BytesIO(body))
+    return pa.ipc.open_file(pa.BufferReader(body)).read_all()
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_sales_export_round_trips_with_types(client, sales, format):
+    response = client.get("/reports/sales", params=dict(sales["params"], format=format), headers=sales["headers"])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == columnar.FORMATS[format][0]
+    table = _read(format, response.content)
+    assert table.schema.equals(columnar.EXPORTS["sales"].schema)
+    assert table.column("order_id").to_pylist() == [order.id for order in sales["orders"]]
+    assert table.column("total_price").to_pylist() == [1.5 + 2 * 2.5] * 3
+    assert all(date.tzinfo is not None for date in table.column("date").to_pylist())
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_order_items_export_round_trips_with_types(client, sales, format):
+    response = client.get("/reports/order-items", params=dict(sales["params"], format=format), headers=sales["headers"])
+    assert response.status_code == 200
+    table = _read(format, response.content)
+    assert table.schema.equals(columnar.EXPORTS["order_items"].schema)
+    rows = table.select(["order_id", "customer_id", "product_id", "quantity", "price"]).to_pylist()
+    first, second = sales["product_ids"]
+    assert rows == [
+        {"order_id": order.id, "customer_id": sales["customer_id"], "product_id": product_id, "quantity": quantity, "price": price}
+        for order in sales["orders"] for product_id, quantity, price in [(first, 1, 1.5), (second, 2, 2.5)]
+    ]
+
+
+def test_record_batches_split_rows():
+    schema = pa.schema([("n", pa.int64())])
+    batches = list(columnar.record_batches(([i] for i in range(5)), schema, batch_rows=2))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert pa.Table.from_batches(batches).column("n").to_pylist() == list(range(5))
+    with pytest.raises(ValueError):
+        columnar.write_export([], schema, "xlsx", io.BytesIO())
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+from app import data_version, rollups
+
+
+class _DictRedis:
+    """
+    Just enough of a Redis client for the data version backend, kept in a dict.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.threads = set()
+
+    def mget(self, *keys):
+        self.threads.add(threading.get_ident())
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, nx=False):
+        if not (nx and key in self.data):
+            self.data[key] = str(value).encode()
+
+    def incr(self, key):
+        self.threads.add(threading.get_ident())
+        self.data[key] = str(int(self.data.get(key, b"0")) + 1).encode()
+
+
+def _redis_backend(client):
+    backend = data_version._RedisBackend.__new__(data_version._RedisBackend)
+    backend._redis = client
+    backend._errors = ConnectionError
+    return backend
+
+
+def test_bump_changes_only_that_company():
+    before = data_version.get(1), data_version.get(2)
+    data_version.bump(1)
+    assert data_version.get(1) != before[0]
+    assert data_version.get(2) == before[1]
+
+
+def test_bump_all_changes_every_company():
+    before = data_version.get(1), data_version.get(2)
+    data_version.bump_all()
+    assert data_version.get(1) != before[0]
+    assert data_version.get(2) != before[1]
+
+
+def test_redis_versions_are_not_reused_after_a_flush():
+    client = _DictRedis()
+    backend = _redis_backend(client)
+    backend.bump(1)
+    seen = backend.get(1)
+    client.data.clear()  # Redis restarted without persistence
+    backend.bump(1)
+    assert backend.get(1) != seen
+
+
+def test_rollup_rebuild_bumps_the_company(db, company):
+    before = data_version.get(company.id)
+    rollups.rebuild_daily_product_sales(db, company_id=company.id)
+    assert data_version.get(company.id) != before
+
+
+def test_async_redis_calls_run_off_the_event_loop(monkeypatch):
+    client = _DictRedis()
+    monkeypatch.setattr(data_version, "_backend", _redis_backend(client))
+
+    async def bump_and_get():
+        await data_version.bump_async(7)
+        return await data_version.get_async(7), threading.get_ident()
+
+    version, loop_thread = asyncio.run(bump_and_get())
+    assert version.endswith(".1")
+    assert client.threads and loop_thread not in client.threads
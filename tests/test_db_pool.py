@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import database
+
+
+@pytest.fixture
+def small_engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=database.InstrumentedQueuePool, pool_size=2, max_overflow=1, pool_timeout=0.1)
+    monkeypatch.setattr(database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def test_checkouts_past_pool_size_show_in_metrics(client, small_engine):
+    connections = [small_engine.connect() for _ in range(3)]  # pool_size + max_overflow
+    try:
+        with pytest.raises(PoolTimeoutError):
+            small_engine.connect()
+        during = client.get("/metrics").json()["db_pool"]
+    finally:
+        for connection in connections:
+            connection.close()
+    after = client.get("/metrics").json()["db_pool"]
+
+    assert during["checkouts"] == 4 and during["timeouts"] == 1
+    assert during["pool_size"] == 2 and during["max_overflow"] == 1
+    assert during["in_use"] == 3 and during["overflow"] == 1
+    assert during["wait_seconds_max"] >= 0.1 and during["wait_seconds_total"] >= during["wait_seconds_max"]
+    assert after["in_use"] == 0 and after["checkouts"] == 4
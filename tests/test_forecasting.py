@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+from app import crud, forecasting, models, rollups, schemas
+
+
+def test_batch_forecast_matches_per_sale_forecast(db, company, user):
+    body, _ = user
+    product = crud.create_product(db, schemas.ProductCreate(name="widget", price=2.0, stock=1000), company_id=company.id)
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    # Several lines of the same product in one order, and sales less than 24 hours apart on different days.
+    orders = [
+        (datetime(2026, 1, 1, 20, 0), [3, 1]),
+        (datetime(2026, 1, 2, 8, 0), [5]),
+        (datetime(2026, 1, 2, 9, 0), [2, 2, 2]),
+        (datetime(2026, 1, 5, 23, 30), [7]),
+        (datetime(2026, 1, 9, 1, 0), [4, 6]),
+    ]
+    for date, quantities in orders:
+        order = crud.create_order(db, schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=q) for q in quantities]), user_id=body["id"], company_id=company.id)
+        db.query(models.Order).filter(models.Order.id == order.id).update({"date": date})
+    db.commit()
+    rollups.rebuild_daily_product_sales(db, company_id=company.id)
+
+    history = crud.get_product_sales_history(db, product_id=product.id, company_id=company.id)
+    single = forecasting.forecast_next_month([{"date": str(s.date), "quantity": s.quantity} for s in history])
+
+    days = crud.get_daily_sales_history(db, company_id=company.id, product_ids=[product.id])
+    batch = forecasting.forecast_next_month_batch(
+        [row.product_id for row in days],
+        [row.day.toordinal() for row in days],
+        [row.quantity for row in days],
+        [row.line_count for row in days],
+    )
+    assert single > 0
+    assert batch[product.id] == pytest.approx(single)
+
+
+def test_rollup_counts_order_lines(db, company, user):
+    body, _ = user
+    product = crud.create_product(db, schemas.ProductCreate(name="widget", price=2.0, stock=100), company_id=company.id)
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    crud.create_order(db, schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=1)] * 3), user_id=body["id"], company_id=company.id)
+
+    rollup = db.query(models.DailyProductSales.quantity, models.DailyProductSales.order_count, models.DailyProductSales.line_count).filter(models.DailyProductSales.product_id == product.id)
+    assert rollup.all() == [(3, 1, 3)]
+    rollups.rebuild_daily_product_sales(db, company_id=company.id)
+    assert rollup.all() == [(3, 1, 3)]
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from reportlab.pdfbase.pdfmetrics import getAscent, getDescent
+from reportlab.pdfgen import canvas
+
+from app import crud, schemas
+from app.utils import pdf_generator
+
+INVOICE = {
+    "order_id": 12345,
+    "company_id": 1,
+    "company_name": "A Company With A Rather Long Registered Name Ltd",
+    "customer_name": "Customer",
+    "customer_contact": "customer@example.com",
+    "date": datetime(2026, 1, 2, 3, 4, 5),
+    "total_price": 12.5,
+    "items": [{"product_name": "Widget", "quantity": 5, "price": 2.5}],
+}
+
+
+class _RecordingCanvas(canvas.Canvas):
+    """
+    Records the box of every string drawn, as (text, left, right, bottom, top).
+    """
+    boxes = []
+
+    def _record(self, text, left, y):
+        right = left + self.stringWidth(text, self._fontname, self._fontsize)
+        self.boxes.append((text, left, right, y + getDescent(self._fontname, self._fontsize), y + getAscent(self._fontname, self._fontsize)))
+
+    def drawString(self, x, y, text, *args, **kwargs):
+        self._record(text, x, y)
+        return super().drawString(x, y, text, *args, **kwargs)
+
+    def drawRightString(self, x, y, text, *args, **kwargs):
+        self._record(text, x - self.stringWidth(text, self._fontname, self._fontsize), y)
+        return super().drawRightString(x, y, text, *args, **kwargs)
+
+
+def test_invoice_text_does_not_overlap(monkeypatch):
+    _RecordingCanvas.boxes = []
+    monkeypatch.setattr(pdf_generator.canvas, "Canvas", _RecordingCanvas)
+    pdf_generator.generate_invoice_pdf(INVOICE)
+    boxes = _RecordingCanvas.boxes
+    assert any(text == INVOICE["company_name"] for text, *_ in boxes)
+    for i, (text, left, right, bottom, top) in enumerate(boxes):
+        for other, other_left, other_right, other_bottom, other_top in boxes[i + 1:]:
+            overlaps = left < other_right and other_left < right and bottom < other_top and other_bottom < top
+            assert not overlaps, (text, other)
+
+
+def test_invoice_page_is_compressed():
+    pdf = pdf_generator.generate_invoice_pdf(INVOICE).getvalue()
+    assert pdf.startswith(b"%PDF") and b"/FlateDecode" in pdf
+
+
+def test_invoice_endpoint_renders_on_demand(client, db, company, user):
+    body, headers = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    product = crud.create_product(db, schemas.ProductCreate(name="widget", price=2.0, stock=10), company_id=company.id)
+    order = client.post("/orders/", json={"customer_id": customer.id, "items": [{"product_id": product.id, "quantity": 2}]}, headers=headers).json()
+    response = client.get(f"/orders/{order['id']}/invoice", headers=headers)
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    snapshot = crud.get_invoice_snapshot(db, order_id=order["id"], company_id=company.id)
+    assert snapshot["company_name"] == company.name
+    assert snapshot["items"] == [{"product_name": "widget", "quantity": 2, "price": 2.0}]
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+import pytest
+from passlib.hash import bcrypt
+
+from app import crud, models
+from app.utils import jwt_handler
+from conftest import register
+
+
+def _rounds(hashed_password: str) -> int:
+    return int(hashed_password.split("$")[2])
+
+
+def test_login_issues_token_and_rejects_bad_password(client, company):
+    body, headers = register(client, company.id, password="right")
+    assert client.get("/users/users/", headers=headers).status_code == 200
+    response = client.post("/auth/token", data={"username": body["username"], "password": "wrong"})
+    assert response.status_code == 401
+
+
+def test_login_rehashes_to_configured_cost(client, db, company):
+    body, _ = register(client, company.id, password="secret")
+    old_rounds = jwt_handler.BCRYPT_ROUNDS + 1
+    db.query(models.User).filter(models.User.id == body["id"]).update({"hashed_password": bcrypt.using(rounds=old_rounds).hash("secret")})
+    db.commit()
+
+    assert client.post("/auth/token", data={"username": body["username"], "password": "secret"}).status_code == 200
+    db.expire_all()
+    stored = crud.get_user(db, body["id"]).hashed_password
+    assert _rounds(stored) == jwt_handler.BCRYPT_ROUNDS
+    assert jwt_handler.verify_password("secret", stored)
+
+
+def test_full_password_queue_returns_503(client, company, monkeypatch):
+    body, _ = register(client, company.id, password="secret")
+    monkeypatch.setattr(jwt_handler, "PASSWORD_HASH_MAX_QUEUE", 0)
+    rejected = jwt_handler.password_executor_stats()["rejected"]
+    response = client.post("/auth/token", data={"username": body["username"], "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert jwt_handler.password_executor_stats()["rejected"] == rejected + 1
+
+
+def test_password_executor_is_reported_in_metrics(client):
+    stats = client.get("/metrics").json()["password_executor"]
+    assert stats["rounds"] == jwt_handler.BCRYPT_ROUNDS
+    assert stats["completed"] > 0
+
+
+def test_cancelled_queued_check_leaves_the_queue(monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(jwt_handler, "_password_executor", executor)
+    release = threading.Event()
+    executor.submit(release.wait)  # occupies the only worker, so the check below stays queued
+    queued = jwt_handler.password_executor_stats()["queued"]
+
+    async def cancel_queued_check():
+        task = asyncio.ensure_future(jwt_handler.verify_password_async("secret", bcrypt.hash("secret")))
+        await asyncio.sleep(0.05)
+        assert jwt_handler.password_executor_stats()["queued"] == queued + 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(cancel_queued_check())
+    finally:
+        release.set()
+        executor.shutdown(wait=True)
+    assert jwt_handler.password_executor_stats()["queued"] == queued
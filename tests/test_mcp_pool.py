@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastmcp.exceptions import ToolError
+
+from app import ai
+
+
+class _FakeClient:
+    """
+    Stands in for fastmcp.Client: each instance is one session, and `behaviour` decides how its calls go.
+    """
+    instances = []
+    behaviour = "ok"
+
+    def __init__(self, transport):
+        self.connected = False
+        self.calls = 0
+        self.behaviour = _FakeClient.behaviour
+        _FakeClient.instances.append(self)
+
+    async def __aenter__(self):
+        self.connected = True
+        return self
+
+    async def __aexit__(self, *exc):
+        self.connected = False
+
+    def is_connected(self):
+        return self.connected
+
+    async def call_tool(self, name, arguments):
+        self.calls += 1
+        if self.behaviour == "hang":
+            await asyncio.Event().wait()
+        if self.behaviour == "raise":
+            raise ConnectionError("connection reset")
+        if self.behaviour == "tool_error":
+            raise ToolError("bad arguments")
+        return (name, arguments)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    monkeypatch.setattr(ai, "Client", _FakeClient)
+    monkeypatch.setattr(_FakeClient, "instances", [])
+    monkeypatch.setattr(_FakeClient, "behaviour", "ok")
+    return _FakeClient
+
+
+def test_calls_are_spread_round_robin(fake_client):
+    async def calls():
+        pool = ai.MCPClientPool("fake", size=3)
+        await pool.start()
+        results = await asyncio.gather(*(pool.call_tool("tool", {"n": n}) for n in range(6)))
+        stats = pool.stats()
+        await pool.close()
+        return results, stats
+
+    results, stats = asyncio.run(calls())
+    assert results == [("tool", {"n": n}) for n in range(6)]
+    assert [client.calls for client in fake_client.instances] == [2, 2, 2]
+    assert stats["calls"] == 6 and stats["connected"] == 3 and stats["errors"] == 0 and stats["in_flight"] == 0
+
+
+def test_hung_session_times_out_and_is_replaced(fake_client):
+    fake_client.behaviour = "hang"
+
+    async def calls():
+        pool = ai.MCPClientPool("fake", size=1, timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.call_tool("tool", {})
+        hung = fake_client.instances[0]
+        fake_client.behaviour = "ok"
+        result = await pool.call_tool("tool", {})
+        return hung, result, pool.stats()
+
+    hung, result, stats = asyncio.run(calls())
+    assert not hung.connected
+    assert len(fake_client.instances) == 2 and result == ("tool", {})
+    assert stats["timeouts"] == 1 and stats["reconnects"] == 1 and stats["calls"] == 2 and stats["connected"] == 1
+    assert stats["latency_seconds_max"] >= 0.05
+
+
+def test_transport_error_drops_session_and_reconnects(fake_client):
+    fake_client.behaviour = "raise"
+
+    async def calls():
+        pool = ai.MCPClientPool("fake", size=1)
+        with pytest.raises(ConnectionError):
+            await pool.call_tool("tool", {})
+        fake_client.behaviour = "ok"
+        await pool.call_tool("tool", {})
+        return pool.stats()
+
+    stats = asyncio.run(calls())
+    assert not fake_client.instances[0].connected and fake_client.instances[1].connected
+    assert stats["errors"] == 1 and stats["reconnects"] == 1 and stats["calls"] == 2
+
+
+def test_tool_error_keeps_the_session(fake_client):
+    fake_client.behaviour = "tool_error"
+
+    async def calls():
+        pool = ai.MCPClientPool("fake", size=1)
+        for _ in range(2):
+            with pytest.raises(ToolError):
+                await pool.call_tool("tool", {})
+        return pool.stats()
+
+    stats = asyncio.run(calls())
+    assert len(fake_client.instances) == 1
+    assert stats["errors"] == 2 and stats["reconnects"] == 0 and stats["connected"] == 1
@@ -0,0 +1,83 @@
+"""
+mcp_server.py registers its tools at import, relative to the repository root, so these tests run it in a
+subprocess there, where no tool module has been imported yet.
+"""
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code: str):
+    output = subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=ROOT, env=os.environ, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_tool_modules_are_imported_on_first_call():
+    result = _run("""
+        import asyncio, json, sys
+        import mcp_server
+        from fastmcp import Client
+
+        before = sorted(name for name in sys.modules if name.startswith("tools."))
+
+        async def call():
+            async with Client(mcp_server.mcp) as client:
+                tools = [tool.name for tool in await client.list_tools()]
+                greeting = (await client.call_tool("user_management_greet", {"name": "Ada"})).data
+            return tools, greeting
+
+        tools, greeting = asyncio.run(call())
+        after = sorted(name for name in sys.modules if name.startswith("tools."))
+        print(json.dumps({"before": before, "after": after, "tools": tools, "greeting": greeting}))
+    """)
+    assert result["before"] == []
+    assert result["after"] == ["tools.user_management"]
+    assert "inventory_read_products" in result["tools"] and "ai_tools_predict_stock_batch" in result["tools"]
+    assert "Ada" in result["greeting"]
+
+
+def test_stale_manifest_entry_falls_back_to_importing_that_module(tmp_path):
+    with open(os.path.join(ROOT, "tools", "manifest.json")) as f:
+        manifest = json.load(f)
+    manifest["modules"]["customers"]["source_sha256"] = "0" * 64
+    manifest["modules"]["customers"]["tools"] = []  # what the stale manifest says must not be used
+    stale_path = tmp_path / "manifest.json"
+    stale_path.write_text(json.dumps(manifest))
+
+    result = _run(f"""
+        import asyncio, json, sys
+        import mcp_server
+        from fastmcp import FastMCP
+
+        server = FastMCP("stale")
+        mcp_server.register_tools(server, manifest_path={str(stale_path)!r})
+        tools = [tool.name for tool in asyncio.run(server.list_tools())]
+        print(json.dumps({{"imported": sorted(name for name in sys.modules if name.startswith("tools.")), "tools": tools}}))
+    """)
+    assert result["imported"] == ["tools.customers"]
+    assert "customers_read_customers" in result["tools"]
+
+
+def test_checked_in_manifest_is_current():
+    result = _run("""
+        import asyncio, json
+        import mcp_server
+
+        with open(mcp_server.MANIFEST_PATH) as f:
+            manifest = json.load(f)["modules"]
+
+        async def describe_all():
+            return {module: await mcp_server.describe_module(module) for module in mcp_server._tool_modules()}
+
+        current = asyncio.run(describe_all())
+        stale = sorted(
+            module for module in mcp_server._tool_modules()
+            if module not in manifest or manifest[module]["source_sha256"] != mcp_server._source_hash(module) or manifest[module]["tools"] != current[module]
+        )
+        print(json.dumps({"stale": stale}))
+    """)
+    assert result["stale"] == [], "run `python mcp_server.py --build-manifest` and commit tools/manifest.json"
@@ -0,0 +1,78 @@
+import asyncio
+
+from fastmcp import Client
+
+from app import crud, schemas
+from tools import customers, inventory, orders, reports
+
+
+def _run(server, calls):
+    """
+    Runs `calls(client)` against the tool server over the in-memory transport.
+    """
+    async def run():
+        async with Client(server) as client:
+            return await calls(client)
+    return asyncio.run(run())
+
+
+def test_product_tools_round_trip(company):
+    async def calls(client):
+        created = (await client.call_tool("create_product", {"product": {"name": "widget", "price": 2.5, "stock": 3}, "company_id": company.id})).data
+        updated = (await client.call_tool("update_product", {"product_id": created["id"], "product": {"stock": 7}, "company_id": company.id})).data
+        read = (await client.call_tool("read_product", {"product_id": created["id"], "company_id": company.id})).data
+        deleted = (await client.call_tool("delete_product", {"product_id": created["id"], "company_id": company.id})).data
+        missing = (await client.call_tool("read_product", {"product_id": created["id"], "company_id": company.id})).data
+        return created, updated, read, deleted, missing
+
+    created, updated, read, deleted, missing = _run(inventory.tools_server, calls)
+    assert created["name"] == "widget" and created["stock"] == 3
+    assert updated["stock"] == 7 and read == updated == deleted
+    assert missing == {"error": "Product not found"}
+
+
+def test_list_tools_page_with_cursors(company):
+    async def calls(client):
+        for i in range(5):
+            await client.call_tool("create_customer", {"customer": {"name": f"c{i}", "contact": f"c{i}@example.com"}, "company_id": company.id})
+        pages, cursor = [], None
+        while True:
+            page = (await client.call_tool("read_customers", {"company_id": company.id, "limit": 2, "cursor": cursor})).data
+            pages.append(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages, (await client.call_tool("read_customers", {"company_id": company.id, "cursor": "garbage"})).data
+
+    pages, invalid = _run(customers.tools_server, calls)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [customer["name"] for page in pages for customer in page] == [f"c{i}" for i in range(5)]
+    assert pages[0][0]["contact"] == "c0@example.com"
+    assert invalid == {"error": "Invalid cursor"}
+
+
+def test_concurrent_tool_calls(db, company, user):
+    body, _ = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    product = crud.create_product(db, schemas.ProductCreate(name="p", price=2.0, stock=5), company_id=company.id)
+    order = crud.create_order(db, schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=2)]), user_id=body["id"], company_id=company.id)
+
+    async def calls(client):
+        return await asyncio.gather(*(client.call_tool("read_order", {"order_id": order.id, "company_id": company.id}) for _ in range(20)))
+
+    results = [result.data for result in _run(orders.tools_server, calls)]
+    assert all(result == results[0] for result in results)
+    assert results[0]["total_price"] == 4.0
+    assert results[0]["items"] == [{"product_id": product.id, "quantity": 2, "price": 2.0}]
+
+
+def test_report_tools_return_plain_data(db, company):
+    crud.create_product(db, schemas.ProductCreate(name="low", price=1.0, stock=1), company_id=company.id)
+
+    async def calls(client):
+        low_stock = (await client.call_tool("get_low_stock_report", {"company_id": company.id, "limit": 5})).data
+        revenue = (await client.call_tool("get_total_revenue_report", {"company_id": company.id})).data
+        return low_stock, revenue
+
+    low_stock, revenue = _run(reports.tools_server, calls)
+    assert [product["name"] for product in low_stock["products"]] == ["low"]
+    assert revenue == {"total_revenue": 0}
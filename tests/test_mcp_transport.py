@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from app import ai, crud, forecasting, schemas
+from tools.ai_tools import tools_server
+
+SALES = [{"date": "2026-01-01", "quantity": 4}, {"date": "2026-01-03", "quantity": 6}, {"date": "2026-01-08", "quantity": 5}]
+
+
+def test_transport_follows_mcp_transport(monkeypatch):
+    monkeypatch.setattr(ai, "MCP_TRANSPORT", "inprocess")
+    assert ai._mcp_transport() is tools_server
+    assert ai._tool_name("predict_stock") == "predict_stock"
+    monkeypatch.setattr(ai, "MCP_TRANSPORT", "remote")
+    assert ai._mcp_transport() == ai.MCP_SERVER_URL
+    assert ai._tool_name("predict_stock") == "ai_tools_predict_stock"
+    monkeypatch.setattr(ai, "MCP_TRANSPORT", "stdio")
+    with pytest.raises(ValueError):
+        ai._mcp_transport()
+
+
+def test_inprocess_pool_calls_tools(db, company, user, monkeypatch):
+    body, _ = user
+    product = crud.create_product(db, schemas.ProductCreate(name="widget", price=2.0, stock=100), company_id=company.id)
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    crud.create_order(db, schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=4)]), user_id=body["id"], company_id=company.id)
+    monkeypatch.setattr(ai, "MCP_TRANSPORT", "inprocess")
+
+    async def calls():
+        pool = ai.MCPClientPool(ai._mcp_transport(), size=2)
+        monkeypatch.setattr(ai, "mcp_pool", pool)
+        await pool.start()
+        try:
+            forecasts = await asyncio.gather(*(ai.predict_stock_batch_via_mcp(company.id, [product.id]) for _ in range(4)))
+            single = await ai.train_and_predict_stock_via_mcp(product.id, company.id, SALES)
+            return forecasts, single, pool.stats()
+        finally:
+            await pool.close()
+
+    forecasts, single, stats = asyncio.run(calls())
+    assert all(forecast == forecasts[0] for forecast in forecasts)
+    assert [forecast["product_id"] for forecast in forecasts[0]] == [product.id]
+    assert single == pytest.approx(forecasting.forecast_next_month(SALES)) and single > 0
+    assert stats["connected"] == 2 and stats["calls"] == 5 and stats["errors"] == 0
@@ -0,0 +1,82 @@
+import asyncio
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from app import ocr
+
+
+class _CountingPool(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """
+    Tesseract replaced by a stub that reports the size of the image it was given, run on an in-process pool.
+    """
+    pool = _CountingPool()
+    monkeypatch.setattr(ocr, "_get_process_pool", lambda: pool)
+    monkeypatch.setattr(ocr.pytesseract, "image_to_string", lambda image: f"{image.mode} {image.width}x{image.height}")
+    yield pool
+    pool.shutdown()
+
+
+def _png(width: int = 40, height: int = 20, **info) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), tuple(os.urandom(3))).save(output, "PNG", **info)
+    return output.getvalue()
+
+
+def test_repeated_image_is_served_from_the_cache(engine):
+    image = _png()
+    hits = ocr._text_cache.stats()["hits"]
+
+    async def extract_twice():
+        return await ocr.extract_text_async(image), await ocr.extract_text_async(image)
+
+    first, second = asyncio.run(extract_twice())
+    assert first == second == "L 40x20"
+    assert engine.submitted == 1
+    assert ocr._text_cache.stats()["hits"] == hits + 1
+
+
+def test_stored_image_shares_the_cache_by_digest(engine, tmp_path):
+    image = _png()
+    path = tmp_path / "label.png"
+    path.write_bytes(image)
+
+    async def extract():
+        return await ocr.extract_text_async(str(path), digest=ocr.image_digest(image)), await ocr.extract_text_async(image)
+
+    assert asyncio.run(extract()) == ("L 40x20", "L 40x20")
+    assert engine.submitted == 1
+
+
+def test_errors_are_not_cached(engine):
+    async def extract_twice():
+        return await ocr.extract_text_async(b"not an image"), await ocr.extract_text_async(b"not an image")
+
+    first, second = asyncio.run(extract_twice())
+    assert ocr._is_error(first) and ocr._is_error(second)
+    assert engine.submitted == 2
+
+
+def test_preprocessing_converts_to_grayscale_and_downscales(monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_TARGET_DPI", 300)
+    monkeypatch.setattr(ocr, "OCR_MAX_SIDE", 100)
+    by_dpi = ocr.preprocess_image(Image.open(io.BytesIO(_png(600, 300, dpi=(600, 600)))))
+    assert by_dpi.mode == "L" and by_dpi.size == (300, 150)
+    by_side = ocr.preprocess_image(Image.open(io.BytesIO(_png(400, 200))))
+    assert by_side.size == (100, 50)
+    small = ocr.preprocess_image(Image.open(io.BytesIO(_png(80, 40))))
+    assert small.size == (80, 40)
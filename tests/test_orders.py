@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import event
+
+from app import crud, models, schemas
+from app.database import engine
+
+
+@pytest.fixture
+def shop(db, company, user):
+    body, _ = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    products = [crud.create_product(db, schemas.ProductCreate(name=f"p{i}", price=2.0 + i, stock=10), company_id=company.id) for i in range(100)]
+    return {"company_id": company.id, "user_id": body["id"], "customer_id": customer.id, "product_ids": [product.id for product in products]}
+
+
+def _order(shop, quantities: dict) -> schemas.OrderCreate:
+    return schemas.OrderCreate(customer_id=shop["customer_id"], items=[schemas.OrderItemCreate(product_id=product_id, quantity=quantity) for product_id, quantity in quantities.items()])
+
+
+def _stock(db, product_ids) -> list:
+    return [stock for (stock,) in db.query(models.Product.stock).filter(models.Product.id.in_(product_ids)).order_by(models.Product.id)]
+
+
+def test_order_decrements_stock_and_totals_price(db, shop):
+    first, second = shop["product_ids"][:2]
+    order = crud.create_order(db, _order(shop, {first: 2, second: 3}), user_id=shop["user_id"], company_id=shop["company_id"])
+    assert order.total_price == pytest.approx(2 * 2.0 + 3 * 3.0)
+    assert [(item.product_id, item.quantity) for item in order.items] == [(first, 2), (second, 3)]
+    assert _stock(db, [first, second]) == [8, 7]
+
+
+def test_order_without_enough_stock_changes_nothing(db, shop):
+    first, second = shop["product_ids"][:2]
+    orders_before = db.query(models.Order).filter(models.Order.company_id == shop["company_id"]).count()
+    assert crud.create_order(db, _order(shop, {first: 1, second: 11}), user_id=shop["user_id"], company_id=shop["company_id"]) is None
+    assert _stock(db, [first, second]) == [10, 10]
+    assert db.query(models.Order).filter(models.Order.company_id == shop["company_id"]).count() == orders_before
+
+
+def test_order_for_another_companys_product_is_rejected(db, shop):
+    other = crud.create_company(db, schemas.CompanyCreate(name=f"other-{shop['company_id']}"))
+    foreign = crud.create_product(db, schemas.ProductCreate(name="foreign", price=1.0, stock=10), company_id=other.id)
+    assert crud.create_order(db, _order(shop, {foreign.id: 1}), user_id=shop["user_id"], company_id=shop["company_id"]) is None
+    assert _stock(db, [foreign.id]) == [10]
+
+
+def test_statement_count_does_not_grow_with_items(db, shop):
+    def statements_for(item_count):
+        count = 0
+
+        def before_execute(*args):
+            nonlocal count
+            count += 1
+
+        event.listen(engine, "before_cursor_execute", before_execute)
+        try:
+            crud.create_order(db, _order(shop, {product_id: 1 for product_id in shop["product_ids"][:item_count]}), user_id=shop["user_id"], company_id=shop["company_id"])
+        finally:
+            event.remove(engine, "before_cursor_execute", before_execute)
+        return count
+
+    assert statements_for(1) == statements_for(10) == statements_for(100)
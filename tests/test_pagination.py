@@ -0,0 +1,66 @@
+import base64
+import json
+
+import pytest
+
+from app import crud, schemas
+from app.utils import pagination
+
+
+def _cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _walk(client, headers, path, limit):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit} if cursor is None else {"limit": limit, "cursor": cursor}
+        response = client.get(path, params=params, headers=headers)
+        assert response.status_code == 200
+        ids.extend(row["id"] for row in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+
+@pytest.fixture
+def catalog(db, company, user):
+    body, headers = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    product = crud.create_product(db, schemas.ProductCreate(name="widget", price=1.0, stock=1000), company_id=company.id)
+    # Created within the same second, so their dates only differ below a second, or not at all.
+    for _ in range(7):
+        crud.create_order(db, schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=1)]), user_id=body["id"], company_id=company.id)
+    return headers
+
+
+def test_walks_every_order_page(client, catalog):
+    all_ids = [row["id"] for row in client.get("/orders/", headers=catalog).json()]
+    assert len(all_ids) == 7
+    for limit in (1, 2, 3, 7):
+        assert _walk(client, catalog, "/orders/", limit) == all_ids
+
+
+def test_walks_every_product_and_customer_page(client, db, company, catalog):
+    for i in range(4):
+        crud.create_product(db, schemas.ProductCreate(name=f"p{i}", price=1.0, stock=1), company_id=company.id)
+    products = _walk(client, catalog, "/products/", 2)
+    assert len(products) == 5 and products == sorted(products)
+    assert len(_walk(client, catalog, "/customers/", 2)) == 1
+
+
+@pytest.mark.parametrize("values", [["x"], [True], [1.5], [None], [[1]]])
+def test_mistyped_product_cursor_is_rejected(client, catalog, values):
+    response = client.get("/products/", params={"cursor": _cursor(values)}, headers=catalog)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("values", [[1, 1], ["not a date", 1], ["2026-01-01T00:00:00", "1"], ["2026-01-01T00:00:00"]])
+def test_mistyped_order_cursor_is_rejected(client, catalog, values):
+    response = client.get("/orders/", params={"cursor": _cursor(values)}, headers=catalog)
+    assert response.status_code == 400
+
+
+def test_cursor_round_trip():
+    values = pagination.decode_cursor(_cursor(["2026-01-01T10:00:00.250000", 5]), [c for c in crud.ORDER_KEYSET])
+    assert values[0].isoformat() == "2026-01-01T10:00:00.250000" and values[1] == 5
@@ -0,0 +1,57 @@
+import io
+import re
+from datetime import datetime
+from typing import NamedTuple
+
+from app.utils import pdf_generator
+
+
+class Sale(NamedTuple):
+    id: int
+    customer_id: int
+    total_price: float
+    date: datetime
+
+
+class Product(NamedTuple):
+    id: int
+    name: str
+    stock: int
+
+
+def _pages(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b(?!s)", pdf))
+
+
+def _sales(count: int, consumed: list):
+    for i in range(count):
+        consumed.append(i)
+        yield Sale(i, i % 7, i * 1.25, datetime(2026, 1, 1, 12, 0))
+
+
+def test_long_report_spans_pages_in_a_temp_file():
+    consumed = []
+    report = pdf_generator.generate_sales_report_pdf(_sales(1000, consumed), datetime(2026, 1, 1), datetime(2026, 1, 31))
+    assert not isinstance(report, io.BytesIO)
+    pdf = report.read()
+    report.close()
+    assert pdf.startswith(b"%PDF")
+    assert len(consumed) == 1000
+    assert _pages(pdf) >= 1000 // pdf_generator.PDF_CHUNK_ROWS
+
+
+def test_report_is_written_to_the_given_output():
+    output = io.BytesIO()
+    assert pdf_generator.generate_low_stock_report_pdf([Product(1, "widget", 2)], output=output) is output
+    assert output.getvalue().startswith(b"%PDF") and _pages(output.getvalue()) == 1
+
+
+def test_rows_are_laid_out_one_page_sized_table_at_a_time(monkeypatch):
+    monkeypatch.setattr(pdf_generator, "PDF_CHUNK_ROWS", 25)
+    consumed = []
+    tables = pdf_generator._report_tables(["a"], ([i] for i in _sales(60, consumed)), [1.0], pdf_generator._table_style("#000000"))
+    sizes = []
+    for table in tables:
+        sizes.append(len(table._cellvalues) - 1)
+        assert len(consumed) == sum(sizes)  # no rows read ahead of the table being laid out
+    assert sizes == [25, 25, 10]
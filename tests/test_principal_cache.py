@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+from app import principal_cache
+from app.principal_cache import Principal
+
+PRINCIPAL = Principal(id=1, username="u", company_id=1, is_active=True)
+
+
+class _RecordingBackend:
+    """
+    A blocking backend that records which thread each call ran on.
+    """
+    blocking = True
+
+    def __init__(self):
+        self.data = {}
+        self.threads = []
+
+    def get(self, key):
+        self.threads.append(threading.get_ident())
+        return self.data.get(key)
+
+    def set(self, key, principal, ttl):
+        self.threads.append(threading.get_ident())
+        self.data[key] = principal
+
+
+def test_blocking_backend_runs_off_the_event_loop(monkeypatch):
+    backend = _RecordingBackend()
+    monkeypatch.setattr(principal_cache, "_backend", backend)
+
+    async def main():
+        await principal_cache.put_async("token", PRINCIPAL, expires_at=time.time() + 60)
+        return await principal_cache.get_async("token"), threading.get_ident()
+
+    principal, loop_thread = asyncio.run(main())
+    assert principal == PRINCIPAL
+    assert len(backend.threads) == 2 and loop_thread not in backend.threads
+
+
+def test_expired_token_is_not_cached():
+    principal_cache.put("expired", PRINCIPAL, expires_at=time.time() - 1)
+    assert principal_cache.get("expired") is None
+
+
+def test_invalidate_user_drops_cached_principals():
+    principal_cache.put("token-a", PRINCIPAL, expires_at=time.time() + 60)
+    assert principal_cache.get("token-a") == PRINCIPAL
+    principal_cache.invalidate_user(PRINCIPAL.id)
+    assert principal_cache.get("token-a") is None
@@ -0,0 +1,77 @@
+import io
+import logging
+import os
+
+import pytest
+from PIL import Image
+
+from app import images, storage
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), tuple(os.urandom(3))).save(output, "JPEG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def product(client, user):
+    _, headers = user
+    product = client.post("/products/", json={"name": "p", "price": 1.0, "stock": 1}, headers=headers).json()
+    return product["id"], headers
+
+
+def _upload(client, product, content: bytes, filename: str = "photo.jpg", content_type: str = "image/jpeg"):
+    product_id, headers = product
+    response = client.post(f"/products/{product_id}/image", files={"file": (filename, content, content_type)}, headers=headers)
+    assert response.status_code == 200
+
+
+def test_variants_are_fitted_to_their_size(client, product):
+    content = _jpeg(1200, 900)
+    _upload(client, product, content)
+    product_id, headers = product
+    full = client.get(f"/products/{product_id}/image", headers=headers)
+    assert full.status_code == 200 and full.content == content
+    for size, longest_side in images.IMAGE_VARIANTS.items():
+        response = client.get(f"/products/{product_id}/image", params={"size": size}, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == images.MEDIA_TYPES[images.IMAGE_VARIANT_FORMAT]
+        with Image.open(io.BytesIO(response.content)) as variant:
+            assert max(variant.size) == longest_side
+
+
+def test_matching_etag_gets_304(client, product):
+    _upload(client, product, _jpeg(300, 200))
+    product_id, headers = product
+    for size in ("thumb", "full"):
+        etag = client.get(f"/products/{product_id}/image", params={"size": size}, headers=headers).headers["etag"]
+        response = client.get(f"/products/{product_id}/image", params={"size": size}, headers=dict(headers, **{"If-None-Match": etag}))
+        assert response.status_code == 304 and response.headers["etag"] == etag and not response.content
+    thumb_etag = client.get(f"/products/{product_id}/image", params={"size": "thumb"}, headers=headers).headers["etag"]
+    assert thumb_etag != client.get(f"/products/{product_id}/image", params={"size": "medium"}, headers=headers).headers["etag"]
+
+
+def test_range_request_gets_206(client, product):
+    content = _jpeg(300, 200)
+    _upload(client, product, content)
+    product_id, headers = product
+    response = client.get(f"/products/{product_id}/image", headers=dict(headers, Range="bytes=0-9"))
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-9/{len(content)}"
+    assert response.content == content[:10]
+
+
+def test_non_image_upload_gets_415_for_variants(client, product):
+    product_id, headers = product
+    _upload(client, product, b"not an image at all", filename="notes.jpg")
+    assert client.get(f"/products/{product_id}/image", params={"size": "thumb"}, headers=headers).status_code == 415
+    assert client.get(f"/products/{product_id}/image", headers=headers).status_code == 200  # the original is still served as is
+
+
+def test_variant_job_skips_non_images_without_a_traceback(caplog):
+    blob = storage.save_bytes(b"also not an image", "notes.png")
+    with caplog.at_level(logging.WARNING, logger="app.images"):
+        images._generate_variants_job(blob.path)
+    assert [record.levelno for record in caplog.records] == [logging.WARNING]
+    assert not any(record.exc_info for record in caplog.records)
@@ -0,0 +1,55 @@
+from app import reporting
+
+
+def _add_products(client, headers, count):
+    for i in range(count):
+        assert client.post("/products/", json={"name": f"widget {i}", "price": 1.5, "stock": i}, headers=headers).status_code == 200
+
+
+def test_report_is_served_from_cache_with_etag(client, user):
+    _, headers = user
+    _add_products(client, headers, 3)
+    first = client.get("/reports/low-stock?format=csv", headers=headers)
+    assert first.status_code == 200
+    assert first.text.splitlines()[0] == "product_id,name,stock"
+    etag = first.headers["etag"]
+
+    again = client.get("/reports/low-stock?format=csv", headers=headers)
+    assert again.headers["etag"] == etag and again.content == first.content
+    assert client.get("/reports/low-stock?format=csv", headers=dict(headers, **{"If-None-Match": etag})).status_code == 304
+
+
+def test_write_invalidates_cached_report(client, user):
+    _, headers = user
+    _add_products(client, headers, 1)
+    etag = client.get("/reports/low-stock", headers=headers).headers["etag"]
+    _add_products(client, headers, 1)
+    response = client.get("/reports/low-stock", headers=dict(headers, **{"If-None-Match": etag}))
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_large_report_is_streamed_and_only_its_etag_cached(client, company, user, monkeypatch):
+    _, headers = user
+    monkeypatch.setattr(reporting, "REPORT_CACHE_MAX_ENTRY_BYTES", 16)
+    _add_products(client, headers, 5)
+    first = client.get("/reports/low-stock?format=csv", headers=headers)
+    assert first.status_code == 200
+    assert len(first.text.splitlines()) == 6
+    assert client.get("/reports/low-stock?format=csv", headers=headers).content == first.content
+
+    cached = [value for (company_id, *_), (value, *_) in reporting._report_cache._data.items() if company_id == company.id]
+    assert cached and all(report.body is None for report in cached)
+
+    not_modified = client.get("/reports/low-stock?format=csv", headers=dict(headers, **{"If-None-Match": first.headers["etag"]}))
+    assert not_modified.status_code == 304
+
+
+def test_pdf_report_renders(client, user):
+    _, headers = user
+    _add_products(client, headers, 2)
+    response = client.get("/reports/low-stock/pdf", headers=headers)
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    total = client.get("/reports/total-revenue/pdf", headers=headers)
+    assert total.status_code == 200 and total.content.startswith(b"%PDF")
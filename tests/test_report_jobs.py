@@ -0,0 +1,46 @@
+import time
+
+from app import report_jobs
+
+
+def _wait(client, headers, job_id):
+    for _ in range(100):
+        status = client.get(f"/reports/jobs/{job_id}", headers=headers).json()
+        if status["status"] in (report_jobs.JOB_READY, report_jobs.JOB_FAILED):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish: {status}")
+
+
+def test_report_job_renders_and_reports_progress(client, user, monkeypatch):
+    _, headers = user
+    monkeypatch.setattr(report_jobs, "REPORT_JOB_PROGRESS_ROWS", 2)
+    for i in range(5):
+        client.post("/products/", json={"name": f"p{i}", "price": 1.0, "stock": i}, headers=headers)
+
+    job = client.post("/reports/jobs", json={"type": "low_stock", "format": "csv", "limit": 10}, headers=headers)
+    assert job.status_code == 202
+    assert job.json()["rows_total"] is None
+    status = _wait(client, headers, job.json()["job_id"])
+    assert status["status"] == report_jobs.JOB_READY
+    assert status["rows_done"] == status["rows_total"] == 5
+
+    download = client.get(f"/reports/jobs/{status['job_id']}/download", headers=headers)
+    assert download.status_code == 200
+    assert download.text.splitlines()[0] == "product_id,name,stock"
+    assert len(download.text.splitlines()) == 6
+
+
+def test_identical_job_is_reused_until_data_changes(client, user):
+    _, headers = user
+    request = {"type": "low_stock", "format": "pdf", "limit": 10}
+    first = client.post("/reports/jobs", json=request, headers=headers).json()
+    _wait(client, headers, first["job_id"])
+    assert client.post("/reports/jobs", json=request, headers=headers).json()["job_id"] == first["job_id"]
+    client.post("/products/", json={"name": "new", "price": 1.0, "stock": 1}, headers=headers)
+    assert client.post("/reports/jobs", json=request, headers=headers).json()["job_id"] != first["job_id"]
+
+
+def test_sales_job_needs_dates(client, user):
+    _, headers = user
+    assert client.post("/reports/jobs", json={"type": "sales"}, headers=headers).status_code == 422
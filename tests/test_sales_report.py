@@ -0,0 +1,41 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import crud, reporting, schemas
+
+HEADER = ["order_id", "customer_id", "total_price", "date"]
+
+
+@pytest.fixture
+def sales(db, company, user):
+    body, headers = user
+    customer = crud.create_customer(db, schemas.CustomerCreate(name="c", contact="c@example.com"), company_id=company.id)
+    product = crud.create_product(db, schemas.ProductCreate(name="p", price=2.5, stock=100), company_id=company.id)
+    order = schemas.OrderCreate(customer_id=customer.id, items=[schemas.OrderItemCreate(product_id=product.id, quantity=2)])
+    orders = [crud.create_order(db, order, user_id=body["id"], company_id=company.id) for _ in range(5)]
+    now = datetime.now(timezone.utc)
+    return {"company_id": company.id, "headers": headers, "orders": orders, "start_date": now - timedelta(days=1), "end_date": now + timedelta(days=1)}
+
+
+def test_sales_csv_is_streamed_in_chunks(sales, monkeypatch):
+    monkeypatch.setattr(reporting, "CSV_CHUNK_ROWS", 2)
+    chunks = list(reporting._stream_csv(HEADER, crud.iter_sales_rows, start_date=sales["start_date"], end_date=sales["end_date"], company_id=sales["company_id"]))
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == HEADER
+    assert [(int(order_id), float(total_price)) for order_id, _, total_price, _ in rows[1:]] == [(order.id, 5.0) for order in sales["orders"]]
+
+
+def test_sales_csv_route(client, sales, monkeypatch):
+    monkeypatch.setattr(reporting, "CSV_CHUNK_ROWS", 2)
+    params = {"start_date": sales["start_date"].isoformat(), "end_date": sales["end_date"].isoformat(), "format": "csv"}
+    with client.stream("GET", "/reports/sales", params=params, headers=sales["headers"]) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        body = b"".join(response.iter_bytes()).decode()
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0] == HEADER
+    assert [int(row[0]) for row in rows[1:]] == [order.id for order in sales["orders"]]
@@ -0,0 +1,102 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from app import storage
+
+
+def _png(color=None) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (40, 30), color or tuple(os.urandom(3))).save(output, "PNG")
+    return output.getvalue()
+
+
+def _leftover_temp_files() -> list:
+    return [name for name in os.listdir(storage.BLOBS_DIR) if name.startswith(".upload-")] if os.path.isdir(storage.BLOBS_DIR) else []
+
+
+def _call(middleware, headers: dict, chunks: list):
+    """
+    Sends a request through the middleware, returning (status, whether the app was reached, bytes the app read).
+    """
+    reached, read, statuses = [], [], []
+
+    async def app(scope, receive, send):
+        reached.append(True)
+        while True:
+            message = await receive()
+            read.append(len(message.get("body", b"")))
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+    asyncio.run(middleware(app)(scope, receive, send))
+    return statuses[0], bool(reached), sum(read)
+
+
+def _limited(app):
+    return storage.UploadSizeLimitMiddleware(app, max_bytes=100)
+
+
+def test_declared_content_length_over_the_limit_is_rejected_unread():
+    status, reached, _ = _call(_limited, {"content-type": "multipart/form-data; boundary=x", "content-length": "101"}, [b"x" * 101])
+    assert status == 413 and not reached
+
+
+def test_chunked_body_over_the_limit_is_rejected_while_streaming():
+    status, reached, read = _call(_limited, {"content-type": "multipart/form-data; boundary=x"}, [b"x" * 60] * 5)
+    assert status == 413 and reached
+    assert read <= 60  # the chunk that crossed the limit was never handed to the app
+
+
+def test_bodies_within_the_limit_and_other_content_types_pass():
+    assert _call(_limited, {"content-type": "multipart/form-data; boundary=x"}, [b"x" * 50, b"x" * 50])[0] == 200
+    assert _call(_limited, {"content-type": "application/json"}, [b"x" * 500])[0] == 200
+
+
+def test_rejected_upload_leaves_no_partial_blob(monkeypatch):
+    monkeypatch.setattr(storage, "UPLOAD_CHUNK_SIZE", 16)
+    before = set(_leftover_temp_files())
+    upload = UploadFile(io.BytesIO(b"x" * 100), filename="big.png")
+    with pytest.raises(storage.UploadTooLarge):
+        asyncio.run(storage.save_upload(upload, max_bytes=50))
+    assert set(_leftover_temp_files()) == before
+    assert not os.path.exists(storage.blob_path(hashlib.sha256(b"x" * 100).hexdigest(), ".png"))
+
+
+def test_oversized_upload_route_returns_413(client, user):
+    _, headers = user
+    product = client.post("/products/", json={"name": "p", "price": 1.0, "stock": 1}, headers=headers).json()
+    before = set(_leftover_temp_files())
+    # Within the middleware's allowance for multipart overhead, so it is the streaming write that rejects it.
+    response = client.post(f"/products/{product['id']}/image", files={"file": ("big.png", b"x" * (storage.MAX_UPLOAD_BYTES + 1), "image/png")}, headers=headers)
+    assert response.status_code == 413
+    assert set(_leftover_temp_files()) == before
+
+
+def test_identical_uploads_share_one_blob(client, user):
+    _, headers = user
+    content = _png()
+    digest = hashlib.sha256(content).hexdigest()
+    for name in ("a", "b"):
+        product = client.post("/products/", json={"name": name, "price": 1.0, "stock": 1}, headers=headers).json()
+        assert client.post(f"/products/{product['id']}/image", files={"file": (f"{name}.png", content, "image/png")}, headers=headers).status_code == 200
+    blob_dir = os.path.dirname(storage.blob_path(digest))
+    assert [name for name in os.listdir(blob_dir) if name == f"{digest}.png"] == [f"{digest}.png"]
+    assert len([name for name in os.listdir(blob_dir) if name.startswith(digest) and name.endswith(".png")]) == 1
@@ -0,0 +1,55 @@
+from app import principal_cache
+from conftest import register
+
+
+def test_update_user_requires_authentication(client, user):
+    body, _ = user
+    assert client.put(f"/users/users/{body['id']}", json={"email": "taken@example.com"}).status_code == 401
+    assert client.delete(f"/users/users/{body['id']}").status_code == 401
+
+
+def test_user_can_update_themself(client, user):
+    body, headers = user
+    response = client.put(f"/users/users/{body['id']}", json={"email": "new-" + body["email"]}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "new-" + body["email"]
+
+
+def test_user_cannot_update_another_user(client, company, user):
+    other, _ = register(client, company.id)
+    _, headers = user
+    assert client.put(f"/users/users/{other['id']}", json={"password": "x"}, headers=headers).status_code == 403
+    assert client.delete(f"/users/users/{other['id']}", headers=headers).status_code == 403
+
+
+def test_user_of_another_company_is_not_found(client, db, user):
+    from app import crud, schemas
+    other_company = crud.create_company(db, schemas.CompanyCreate(name=f"other-{user[0]['id']}"))
+    other, _ = register(client, other_company.id)
+    _, headers = user
+    assert client.delete(f"/users/users/{other['id']}", headers=headers).status_code == 404
+
+
+def test_active_status_cannot_be_changed_through_update(client, user):
+    body, headers = user
+    response = client.put(f"/users/users/{body['id']}", json={"is_active": False}, headers=headers)
+    assert response.status_code == 200 and response.json()["is_active"] is True
+    assert client.get("/users/users/", headers=headers).status_code == 200
+
+
+def test_update_invalidates_the_cached_principal(client, user):
+    body, headers = user
+    client.get("/users/users/", headers=headers)  # caches the token's principal
+    misses = principal_cache.stats()["misses"]
+    client.get("/users/users/", headers=headers)
+    assert principal_cache.stats()["misses"] == misses
+
+    assert client.put(f"/users/users/{body['id']}", json={"email": "changed-" + body["email"]}, headers=headers).status_code == 200
+    assert client.get("/users/users/", headers=headers).status_code == 200
+    assert principal_cache.stats()["misses"] == misses + 1  # looked up again after the update
+
+
+def test_deleted_user_token_stops_working(client, user):
+    body, headers = user
+    assert client.delete(f"/users/users/{body['id']}", headers=headers).status_code == 200
+    assert client.get("/users/users/", headers=headers).status_code == 401
@@ -1,14 +1,13 @@
+import asyncio
 from fastmcp import FastMCP
 from app.database import SessionLocal
-from app import crud
-
-import pandas as pd
-from sklearn.linear_model import LinearRegression
+from app import crud, forecasting
+from typing import List, Optional
 
 tools_server = FastMCP(name="AI_Tools")
 
 @tools_server.tool
-def predict_stock(product_id: int, company_id: int, sales_data: list) -> dict:
+async def predict_stock(product_id: int, company_id: int, sales_data: list) -> dict:
     """
     Predicts the stock needed for a product for the next month based on historical sales data.
     :param product_id: The ID of the product to predict stock for.
@@ -16,27 +15,33 @@ def predict_stock(product_id: int, company_id: int, sales_data: list) -> dict:
     :param sales_data: List of dictionaries containing 'date' and 'quantity' for historical sales.
     :return: A dictionary with the predicted stock for the next month.
     """
+    predicted_stock = await forecasting.run_in_process(forecasting.forecast_next_month, sales_data)
+    return {"product_id": product_id, "predicted_stock_next_month": predicted_stock}
+
+def _load_daily_sales_history(company_id: int, product_ids: Optional[List[int]]):
     db = SessionLocal()
     try:
-        if not sales_data or len(sales_data) < 2:
-            return {"product_id": product_id, "predicted_stock_next_month": 0.0}
-
-        df = pd.DataFrame(sales_data, columns=['date', 'quantity'])
-        df['date'] = pd.to_datetime(df['date'])
-        df['days_since_start'] = (df['date'] - df['date'].min()).dt.days
-
-        X = df[['days_since_start']]
-        y = df['quantity']
-
-        model = LinearRegression()
-        model.fit(X, y)
-
-        last_day = df['days_since_start'].max()
-        next_month_days = pd.DataFrame({'days_since_start': range(last_day + 1, last_day + 31)})
-        predicted_sales = model.predict(next_month_days)
-
-        predicted_stock = max(0, sum(predicted_sales))
-
-        return {"product_id": product_id, "predicted_stock_next_month": predicted_stock}
+        return crud.get_daily_sales_history(db, company_id=company_id, product_ids=product_ids)
     finally:
         db.close()
+
+@tools_server.tool
+async def predict_stock_batch(company_id: int, product_ids: Optional[List[int]] = None) -> dict:
+    """
+    Predicts next month's stock needs for many products in one pass, from the daily sales rollup.
+    :param company_id: The ID of the company the products belong to.
+    :param product_ids: The IDs of the products to forecast; omit to forecast the whole catalog.
+    :return: A dictionary with a 'forecasts' list of {'product_id', 'predicted_stock_next_month'}.
+    """
+    history = await asyncio.to_thread(_load_daily_sales_history, company_id, product_ids)
+
+    sales = [row for row in history if row.day is not None]
+    predicted = await forecasting.run_in_process(
+        forecasting.forecast_next_month_batch,
+        [row.product_id for row in sales],
+        [row.day.toordinal() for row in sales],
+        [row.quantity for row in sales],
+        [row.line_count for row in sales],
+    )
+    catalog = sorted({row.product_id for row in history})
+    return {"forecasts": [{"product_id": product_id, "predicted_stock_next_month": predicted.get(product_id, 0.0)} for product_id in catalog]}
@@ -1,44 +1,58 @@
 from fastmcp import FastMCP
 from app.database import SessionLocal
-from app import crud, schemas
-from app.utils.pdf_generator import generate_invoice_pdf
-import os
+from app import billing, crud, schemas
+from typing import List
+import asyncio
 
 tools_server = FastMCP(name="Billing")
 
-UPLOADS_DIR = "uploads"
+# Order creation locks product rows and writes several tables through the synchronous crud layer,
+# so the tools run it in a worker thread rather than on the server's event loop.
+
+def _create_order_and_invoice(order: dict, user_id: int, company_id: int) -> dict:
+    db = SessionLocal()
+    try:
+        order_schema = schemas.OrderCreate(**order)
+        db_order = crud.create_order(db, order=order_schema, user_id=user_id, company_id=company_id)
+        if not db_order:
+            return {"error": "Not enough stock or product not found"}
+
+        billing.enqueue_invoice(db_order.id, company_id)
+        return {"order_id": db_order.id, "invoice_status": db_order.invoice_status}
+    finally:
+        db.close()
 
 @tools_server.tool
-def create_order_and_invoice(order: dict, user_id: int, company_id: int) -> dict:
+async def create_order_and_invoice(order: dict, user_id: int, company_id: int) -> dict:
     """
-    Creates an order and generates an invoice PDF.
+    Creates an order and schedules generation of its invoice PDF.
 
     :param order: A dictionary representing the order, with keys 'items' (a list of dictionaries with 'product_id' and 'quantity') and 'customer_id'.
     :param user_id: The ID of the user creating the order.
     :param company_id: The ID of the company for which the order is being created.
-    :return: A dictionary with the order details and the path to the invoice PDF.
+    :return: A dictionary with the order ID and the invoice status (pending until the invoice worker has rendered it).
     """
+    return await asyncio.to_thread(_create_order_and_invoice, order, user_id, company_id)
+
+def _create_orders_bulk(orders_ndjson: str, user_id: int, company_id: int, generate_invoices: bool) -> List[dict]:
     db = SessionLocal()
     try:
-        order_schema = schemas.OrderCreate(**order)
-        db_order = crud.create_order(db, order=order_schema, user_id=user_id, company_id=company_id)
-        if not db_order:
-            return {"error": "Not enough stock or product not found"}
-
-        pdf_buffer = generate_invoice_pdf(db_order)
-        
-        invoice_dir = os.path.join(UPLOADS_DIR, "invoices", str(company_id))
-        os.makedirs(invoice_dir, exist_ok=True)
-        
-        invoice_path = os.path.join(invoice_dir, f"invoice_{db_order.id}.pdf")
-        
-        with open(invoice_path, "wb") as f:
-            f.write(pdf_buffer.getvalue())
-            
-        db_order.pdf_invoice_path = invoice_path
-        db.commit()
-        db.refresh(db_order)
-        
-        return {"order_id": db_order.id, "invoice_path": invoice_path}
+        results = []
+        for chunk in billing.iter_ndjson_chunks(orders_ndjson.splitlines()):
+            results.extend(billing.create_orders_chunk(db, chunk, user_id=user_id, company_id=company_id, generate_invoices=generate_invoices))
+        return results
     finally:
         db.close()
+
+@tools_server.tool
+async def create_orders_bulk(orders_ndjson: str, user_id: int, company_id: int, generate_invoices: bool = False) -> List[dict]:
+    """
+    Creates many orders at once from NDJSON text, validating and writing them in batches.
+
+    :param orders_ndjson: One order per line, each a JSON object with 'customer_id' and 'items' (a list of objects with 'product_id' and 'quantity').
+    :param user_id: The ID of the user creating the orders.
+    :param company_id: The ID of the company for which the orders are being created.
+    :param generate_invoices: Whether to schedule invoice PDFs for the new orders now instead of rendering them on demand.
+    :return: One result per input line, with either 'order_id' or 'error'.
+    """
+    return await asyncio.to_thread(_create_orders_bulk, orders_ndjson, user_id, company_id, generate_invoices)
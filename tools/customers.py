@@ -1,61 +1,60 @@
 from fastmcp import FastMCP
-from app.database import SessionLocal
-from app import crud, schemas
-from typing import List
+from app.database import AsyncSessionLocal
+from app import async_crud, crud, schemas
+from app.utils import pagination
+from typing import Optional
 
 tools_server = FastMCP(name="Customers")
 
 @tools_server.tool
-def create_customer(customer: dict, company_id: int) -> dict:
+async def create_customer(customer: dict, company_id: int) -> dict:
     """
     Creates a new customer.
-    :param customer: A dictionary with customer data (name, email, phone, address).
+    :param customer: A dictionary with customer data (name, contact).
     :param company_id: The ID of the company the customer belongs to.
     :return: The created customer data.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         customer_schema = schemas.CustomerCreate(**customer)
-        db_customer = crud.create_customer(db=db, customer=customer_schema, company_id=company_id)
-        return {"id": db_customer.id, "name": db_customer.name, "email": db_customer.email}
-    finally:
-        db.close()
+        db_customer = await async_crud.create_customer(db=db, customer=customer_schema, company_id=company_id)
+        return {"id": db_customer.id, "name": db_customer.name, "contact": db_customer.contact}
 
 @tools_server.tool
-def read_customers(company_id: int, skip: int = 0, limit: int = 100) -> List[dict]:
+async def read_customers(company_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> dict:
     """
-    Reads a list of customers.
+    Reads a page of customers.
     :param company_id: The ID of the company to fetch customers from.
-    :param skip: The number of customers to skip.
+    :param skip: The number of customers to skip (kept for backward compatibility; prefer cursor).
     :param limit: The maximum number of customers to return.
-    :return: A list of customer data.
+    :param cursor: The next_cursor returned by the previous page; omit it for the first page.
+    :return: A dictionary with the customer data under 'items' and the cursor of the next page under 'next_cursor' (null on the last page).
     """
-    db = SessionLocal()
-    try:
-        customers = crud.get_customers(db, company_id=company_id, skip=skip, limit=limit)
-        return [{"id": c.id, "name": c.name, "email": c.email} for c in customers]
-    finally:
-        db.close()
+    async with AsyncSessionLocal() as db:
+        try:
+            customers = await async_crud.get_customers(db, company_id=company_id, skip=skip, limit=limit, cursor=cursor)
+            return {
+                "items": [{"id": c.id, "name": c.name, "contact": c.contact} for c in customers],
+                "next_cursor": pagination.next_cursor(customers, limit, crud.CUSTOMER_KEYSET),
+            }
+        except pagination.InvalidCursor:
+            return {"error": "Invalid cursor"}
 
 @tools_server.tool
-def read_customer(customer_id: int, company_id: int) -> dict:
+async def read_customer(customer_id: int, company_id: int) -> dict:
     """
     Reads a single customer by ID.
     :param customer_id: The ID of the customer to read.
     :param company_id: The ID of the company the customer belongs to.
     :return: The customer data.
     """
-    db = SessionLocal()
-    try:
-        db_customer = crud.get_customer(db, customer_id=customer_id, company_id=company_id)
+    async with AsyncSessionLocal() as db:
+        db_customer = await async_crud.get_customer(db, customer_id=customer_id, company_id=company_id)
         if db_customer is None:
             return {"error": "Customer not found"}
-        return {"id": db_customer.id, "name": db_customer.name, "email": db_customer.email}
-    finally:
-        db.close()
+        return {"id": db_customer.id, "name": db_customer.name, "contact": db_customer.contact}
 
 @tools_server.tool
-def update_customer(customer_id: int, customer: dict, company_id: int) -> dict:
+async def update_customer(customer_id: int, customer: dict, company_id: int) -> dict:
     """
     Updates a customer.
     :param customer_id: The ID of the customer to update.
@@ -63,29 +62,23 @@ def update_customer(customer_id: int, customer: dict, company_id: int) -> dict:
     :param company_id: The ID of the company the customer belongs to.
     :return: The updated customer data.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         customer_schema = schemas.CustomerUpdate(**customer)
-        db_customer = crud.update_customer(db, customer_id=customer_id, customer=customer_schema, company_id=company_id)
+        db_customer = await async_crud.update_customer(db, customer_id=customer_id, customer=customer_schema, company_id=company_id)
         if db_customer is None:
             return {"error": "Customer not found"}
-        return {"id": db_customer.id, "name": db_customer.name, "email": db_customer.email}
-    finally:
-        db.close()
+        return {"id": db_customer.id, "name": db_customer.name, "contact": db_customer.contact}
 
 @tools_server.tool
-def delete_customer(customer_id: int, company_id: int) -> dict:
+async def delete_customer(customer_id: int, company_id: int) -> dict:
     """
     Deletes a customer.
     :param customer_id: The ID of the customer to delete.
     :param company_id: The ID of the company the customer belongs to.
     :return: The deleted customer data.
     """
-    db = SessionLocal()
-    try:
-        db_customer = crud.delete_customer(db, customer_id=customer_id, company_id=company_id)
+    async with AsyncSessionLocal() as db:
+        db_customer = await async_crud.delete_customer(db, customer_id=customer_id, company_id=company_id)
         if db_customer is None:
             return {"error": "Customer not found"}
-        return {"id": db_customer.id, "name": db_customer.name, "email": db_customer.email}
-    finally:
-        db.close()
+        return {"id": db_customer.id, "name": db_customer.name, "contact": db_customer.contact}
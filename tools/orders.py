@@ -1,39 +1,41 @@
 from fastmcp import FastMCP
-from app.database import SessionLocal
-from app import crud
-from typing import List
+from app.database import AsyncSessionLocal
+from app import async_crud, crud
+from app.utils import pagination
+from typing import Optional
 
 tools_server = FastMCP(name="Orders")
 
 @tools_server.tool
-def read_orders(company_id: int, skip: int = 0, limit: int = 100) -> List[dict]:
+async def read_orders(company_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> dict:
     """
-    Reads a list of orders.
+    Reads a page of orders, oldest first.
     :param company_id: The ID of the company to fetch orders from.
-    :param skip: The number of orders to skip.
+    :param skip: The number of orders to skip (kept for backward compatibility; prefer cursor).
     :param limit: The maximum number of orders to return.
-    :return: A list of order data.
+    :param cursor: The next_cursor returned by the previous page; omit it for the first page.
+    :return: A dictionary with the order data under 'items' and the cursor of the next page under 'next_cursor' (null on the last page).
     """
-    db = SessionLocal()
-    try:
-        orders = crud.get_orders(db, company_id=company_id, skip=skip, limit=limit)
-        return [{"id": o.id, "customer_id": o.customer_id, "date": o.date.isoformat(), "total_price": o.total_price} for o in orders]
-    finally:
-        db.close()
+    async with AsyncSessionLocal() as db:
+        try:
+            orders = await async_crud.get_orders(db, company_id=company_id, skip=skip, limit=limit, cursor=cursor)
+            return {
+                "items": [{"id": o.id, "customer_id": o.customer_id, "date": o.date.isoformat(), "total_price": o.total_price} for o in orders],
+                "next_cursor": pagination.next_cursor(orders, limit, crud.ORDER_KEYSET),
+            }
+        except pagination.InvalidCursor:
+            return {"error": "Invalid cursor"}
 
 @tools_server.tool
-def read_order(order_id: int, company_id: int) -> dict:
+async def read_order(order_id: int, company_id: int) -> dict:
     """
     Reads a single order by ID.
     :param order_id: The ID of the order to read.
     :param company_id: The ID of the company the order belongs to.
     :return: The order data.
     """
-    db = SessionLocal()
-    try:
-        db_order = crud.get_order(db, order_id=order_id, company_id=company_id)
+    async with AsyncSessionLocal() as db:
+        db_order = await async_crud.get_order(db, order_id=order_id, company_id=company_id)
         if db_order is None:
             return {"error": "Order not found"}
         return {"id": db_order.id, "customer_id": db_order.customer_id, "date": db_order.date.isoformat(), "total_price": db_order.total_price, "items": [{"product_id": i.product_id, "quantity": i.quantity, "price": i.price} for i in db_order.items]}
-    finally:
-        db.close()
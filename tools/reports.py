@@ -1,104 +1,161 @@
 from fastmcp import FastMCP
-from app.database import SessionLocal
-from app import reporting
+from app.database import AsyncSessionLocal
+from app import async_crud, columnar, crud, report_jobs, reporting, schemas
+from app.utils.pdf_generator import generate_sales_report_pdf, generate_low_stock_report_pdf, generate_top_selling_report_pdf, generate_total_revenue_report_pdf
 from datetime import datetime
 from typing import Optional
+import asyncio
 import os
+import threading
 
 tools_server = FastMCP(name="Reports")
 
 UPLOADS_DIR = "uploads"
 
+async def _write_report(company_id: int, filename: str, generate, *args) -> dict:
+    """
+    Renders a report (PDF or export) straight into its file, in a thread so rendering does not block other tool calls.
+    The file is written under a temporary name and moved into place, so readers never see a partial report.
+    """
+    report_path = os.path.join(UPLOADS_DIR, "reports", str(company_id), filename)
+
+    def render():
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        tmp_path = f"{report_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            generate(*args, output=f)
+        os.replace(tmp_path, report_path)
+
+    await asyncio.to_thread(render)
+    return {"report_path": report_path}
+
 @tools_server.tool
-def get_sales_report(start_date: str, end_date: str, company_id: int, format: Optional[str] = "json") -> dict:
+async def get_sales_report(start_date: str, end_date: str, company_id: int, format: Optional[str] = "json", background: bool = False) -> dict:
     """
     Generates a sales report.
     :param start_date: The start date of the report (YYYY-MM-DD).
     :param end_date: The end date of the report (YYYY-MM-DD).
     :param company_id: The ID of the company.
-    :param format: The format of the report (json or pdf).
-    :return: The sales report data or the path to the PDF file.
+    :param format: The format of the report (json or pdf; csv or pdf with background).
+    :param background: Whether to render the report as a background job (recommended for long ranges); poll it with get_report_job.
+    :return: The sales report data under 'sales', the path to the PDF file, or the report job's status.
     """
-    db = SessionLocal()
-    try:
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d")
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
-        report_data = reporting.get_sales_report(db, start_date=start_date_obj, end_date=end_date_obj, company_id=company_id, format=format)
-        if format == "pdf":
-            report_dir = os.path.join(UPLOADS_DIR, "reports", str(company_id))
-            os.makedirs(report_dir, exist_ok=True)
-            report_path = os.path.join(report_dir, f"sales_report_{start_date}_{end_date}.pdf")
-            with open(report_path, "wb") as f:
-                f.write(report_data)
-            return {"report_path": report_path}
-        return report_data
-    finally:
-        db.close()
+    start_date_obj = datetime.strptime(start_date, "%Y-%m-%d")
+    end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
+    if background:
+        return await _start_report_job("sales", company_id, format="pdf" if format == "pdf" else "csv", start_date=start_date, end_date=end_date)
+    if format == "pdf":
+        query_args = dict(start_date=start_date_obj, end_date=end_date_obj, company_id=company_id)
+        return await _write_report(company_id, f"sales_report_{start_date}_{end_date}.pdf", reporting.render_pdf, generate_sales_report_pdf, crud.iter_sales_rows, query_args, start_date_obj, end_date_obj)
+    async with AsyncSessionLocal() as db:
+        sales = await async_crud.get_sales_by_date(db, start_date=start_date_obj, end_date=end_date_obj, company_id=company_id)
+    return {"sales": [{"order_id": o.id, "customer_id": o.customer_id, "total_price": o.total_price, "date": o.date.isoformat()} for o in sales]}
+
+@tools_server.tool
+async def export_report(report: str, start_date: str, end_date: str, company_id: int, format: str = "parquet") -> dict:
+    """
+    Exports sales or order-item data with typed, compressed columns for analytics (e.g. pandas.read_parquet).
+    :param report: The data to export: sales (one row per order) or order_items (one row per order line).
+    :param start_date: The start date of the export (YYYY-MM-DD).
+    :param end_date: The end date of the export (YYYY-MM-DD).
+    :param company_id: The ID of the company.
+    :param format: The file format (parquet or arrow).
+    :return: The path to the exported file.
+    """
+    if report not in columnar.EXPORTS or format not in columnar.FORMATS:
+        return {"error": "Unknown report or format"}
+    query_args = dict(start_date=datetime.strptime(start_date, "%Y-%m-%d"), end_date=datetime.strptime(end_date, "%Y-%m-%d"), company_id=company_id)
+    return await _write_report(company_id, f"{report}_{start_date}_{end_date}.{columnar.FORMATS[format][1]}", reporting.render_export, report, format, query_args)
 
 @tools_server.tool
-def get_low_stock_report(company_id: int, limit: int = 10, format: Optional[str] = "json") -> dict:
+async def get_daily_sales_report(start_date: str, end_date: str, company_id: int) -> list:
+    """
+    Generates a per-day sales summary, read from the daily sales rollup.
+    :param start_date: The first day of the report (YYYY-MM-DD).
+    :param end_date: The day after the last day of the report (YYYY-MM-DD).
+    :param company_id: The ID of the company.
+    :return: A list of days with their total quantity sold and revenue.
+    """
+    start_date_obj = datetime.strptime(start_date, "%Y-%m-%d")
+    end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
+    async with AsyncSessionLocal() as db:
+        days = await async_crud.get_daily_sales(db, start_date=start_date_obj, end_date=end_date_obj, company_id=company_id)
+    return [{"day": str(day.day), "quantity": day.quantity, "revenue": day.revenue} for day in days]
+
+@tools_server.tool
+async def get_low_stock_report(company_id: int, limit: int = 10, format: Optional[str] = "json") -> dict:
     """
     Generates a low stock report.
     :param company_id: The ID of the company.
-    :param limit: The maximum number of products to include in the report.
+    :param limit: The stock level below which a product is included in the report.
     :param format: The format of the report (json or pdf).
-    :return: The low stock report data or the path to the PDF file.
+    :return: The low stock products under 'products' or the path to the PDF file.
     """
-    db = SessionLocal()
-    try:
-        report_data = reporting.get_low_stock_report(db, company_id=company_id, limit=limit, format=format)
-        if format == "pdf":
-            report_dir = os.path.join(UPLOADS_DIR, "reports", str(company_id))
-            os.makedirs(report_dir, exist_ok=True)
-            report_path = os.path.join(report_dir, "low_stock_report.pdf")
-            with open(report_path, "wb") as f:
-                f.write(report_data)
-            return {"report_path": report_path}
-        return report_data
-    finally:
-        db.close()
+    if format == "pdf":
+        return await _write_report(company_id, "low_stock_report.pdf", reporting.render_pdf, generate_low_stock_report_pdf, crud.iter_low_stock_rows, dict(company_id=company_id, limit=limit))
+    async with AsyncSessionLocal() as db:
+        products = await async_crud.get_low_stock_products(db, company_id=company_id, limit=limit)
+    return {"products": [{"product_id": p.id, "name": p.name, "stock": p.stock} for p in products]}
 
 @tools_server.tool
-def get_top_selling_report(company_id: int, limit: int = 10, format: Optional[str] = "json") -> dict:
+async def get_top_selling_report(company_id: int, limit: int = 10, format: Optional[str] = "json") -> dict:
     """
     Generates a top selling products report.
     :param company_id: The ID of the company.
     :param limit: The maximum number of products to include in the report.
     :param format: The format of the report (json or pdf).
-    :return: The top selling products report data or the path to the PDF file.
+    :return: The top selling products under 'products' or the path to the PDF file.
     """
-    db = SessionLocal()
-    try:
-        report_data = reporting.get_top_selling_report(db, company_id=company_id, limit=limit, format=format)
-        if format == "pdf":
-            report_dir = os.path.join(UPLOADS_DIR, "reports", str(company_id))
-            os.makedirs(report_dir, exist_ok=True)
-            report_path = os.path.join(report_dir, "top_selling_report.pdf")
-            with open(report_path, "wb") as f:
-                f.write(report_data)
-            return {"report_path": report_path}
-        return report_data
-    finally:
-        db.close()
+    if format == "pdf":
+        return await _write_report(company_id, "top_selling_report.pdf", reporting.render_pdf, generate_top_selling_report_pdf, crud.iter_top_selling_rows, dict(company_id=company_id, limit=limit))
+    async with AsyncSessionLocal() as db:
+        products = await async_crud.get_top_selling_products(db, company_id=company_id, limit=limit)
+    return {"products": [{"product_id": product.id, "name": product.name, "total_quantity": total_quantity} for product, total_quantity in products]}
 
 @tools_server.tool
-def get_total_revenue_report(company_id: int, format: Optional[str] = "json") -> dict:
+async def get_total_revenue_report(company_id: int, format: Optional[str] = "json") -> dict:
     """
     Generates a total revenue report.
     :param company_id: The ID of the company.
     :param format: The format of the report (json or pdf).
     :return: The total revenue report data or the path to the PDF file.
     """
-    db = SessionLocal()
+    async with AsyncSessionLocal() as db:
+        total_revenue = await async_crud.get_total_revenue(db, company_id=company_id)
+    if format == "pdf":
+        return await _write_report(company_id, "total_revenue_report.pdf", generate_total_revenue_report_pdf, total_revenue or 0)
+    return {"total_revenue": total_revenue or 0}
+
+async def _start_report_job(type: str, company_id: int, format: str = "csv", start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 10) -> dict:
     try:
-        report_data = reporting.get_total_revenue_report(db, company_id=company_id, format=format)
-        if format == "pdf":
-            report_dir = os.path.join(UPLOADS_DIR, "reports", str(company_id))
-            os.makedirs(report_dir, exist_ok=True)
-            report_path = os.path.join(report_dir, "total_revenue_report.pdf")
-            with open(report_path, "wb") as f:
-                f.write(report_data)
-            return {"report_path": report_path}
-        return report_data
-    finally:
-        db.close()
+        job = schemas.ReportJobCreate(type=type, format=format, start_date=start_date, end_date=end_date, limit=limit)
+        return await asyncio.to_thread(report_jobs.submit_job, company_id, job)
+    except ValueError as e:
+        return {"error": str(e)}
+
+@tools_server.tool
+async def start_report_job(type: str, company_id: int, format: str = "csv", start_date: Optional[str] = None, end_date: Optional[str] = None, limit: int = 10) -> dict:
+    """
+    Starts rendering a report in the background, or returns the existing job for an identical report.
+    :param type: The report to render (sales, low_stock or top_selling).
+    :param company_id: The ID of the company.
+    :param format: The format of the report (csv or pdf).
+    :param start_date: The start date of a sales report (YYYY-MM-DD).
+    :param end_date: The end date of a sales report (YYYY-MM-DD).
+    :param limit: The stock threshold (low_stock) or number of products (top_selling).
+    :return: The job's status: its job_id, status (queued, running, ready or failed), progress in rows and, once ready, the artifact path.
+    """
+    return await _start_report_job(type, company_id, format, start_date, end_date, limit)
+
+@tools_server.tool
+async def get_report_job(job_id: str, company_id: int) -> dict:
+    """
+    Reads the status of a report job.
+    :param job_id: The job_id returned when the job was started.
+    :param company_id: The ID of the company.
+    :return: The job's status, including progress and, once ready, the artifact path.
+    """
+    status = await asyncio.to_thread(report_jobs.get_job, company_id, job_id)
+    if status is None:
+        return {"error": "Report job not found"}
+    return status